@@ -1,63 +1,41 @@
+import argparse
 import json
-
-# Load your data
-with open('../../processed_data/cleaned_extracted_relationships.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
-
-# Prepare nodes and edges
-html_nodes = []
-html_edges = []
-node_ids = set()
-
-# Extract data for nodes and edges
-for record in data:
-    entity1 = record.get("Entity 1")
-    entity2 = record.get("Entity 2")
-    relationship = record.get("Relationship Summary", "Unknown relationship")
-    threat_level = record.get("Threat Assessment", {}).get("Threat Level", 1)
-    threat_type = record.get("Threat Assessment", {}).get("Type", "Unknown Type")
-    location1 = record.get("Origin Location 1", "Unknown Location")
-    location2 = record.get("Origin Location 2", "Unknown Location")
-
-    # Add Entity 1 node if not already added
-    if entity1 not in node_ids:
-        node_ids.add(entity1)
-        html_nodes.append({
-            "id": entity1,
-            "label": entity1,
-            "shape": "dot",
-            "color": "#97c2fc",
-            "title": f"{entity1}: Threat Level {threat_level}, Threat Type: {threat_type}, Origin: {location1}",
-            "threat_level": threat_level,
-            "location": location1,
-            "threat_type": threat_type
-        })
-
-    # Add Entity 2 node if not already added
-    if entity2 not in node_ids:
-        node_ids.add(entity2)
-        html_nodes.append({
-            "id": entity2,
-            "label": entity2,
-            "shape": "dot",
-            "color": "#97c2fc",
-            "title": f"{entity2}: Threat Level {threat_level}, Threat Type: {threat_type}, Origin: {location2}",
-            "threat_level": threat_level,
-            "location": location2,
-            "threat_type": threat_type
-        })
-
-    # Add edge with threat level information
-    html_edges.append({
-        "from": entity1,
-        "to": entity2,
-        "title": relationship,
-        "threat_level": threat_level
-    })
-
-# Save nodes and edges as JavaScript
-with open('graph_data2.js', 'w', encoding='utf-8') as js_file:
-    js_file.write(f"const allNodes = {json.dumps(html_nodes, indent=2)};\n")
-    js_file.write(f"const allEdges = {json.dumps(html_edges, indent=2)};\n")
-
-print("Data extracted and saved to 'graph_data.js'.")
+import os
+import sys
+
+# Make the src/ modules importable when running from src/assets
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from relationship_store import open_store, apply_delta, store_version
+from graph_export import write_graph_data
+from graph_incremental import read_json, update_graph_data
+
+OUTPUT_DIR = 'graph_data'
+
+parser = argparse.ArgumentParser(description="Generate the graph_data files for entity_relationship_graph.html.")
+parser.add_argument('--delta', help="JSON file with a list of new or changed relationship records to apply "
+                                    "incrementally (records with a \"Record ID\" replace that record)")
+args = parser.parse_args()
+
+# Load your data through the indexed relationship store
+store = open_store()
+
+if args.delta:
+    with open(args.delta, 'r', encoding='utf-8') as f:
+        delta_records = json.load(f)
+    built_version = read_json(os.path.join(OUTPUT_DIR, 'nodes.json'), {}).get("version")
+    # The files can only be patched if they were generated from the store as it is before this delta
+    up_to_date = built_version == store_version(store)
+    affected = apply_delta(store, delta_records)
+    print(f"Applied {len(delta_records)} relationship records touching {len(affected)} entity pairs.")
+    if up_to_date:
+        written = update_graph_data(store, affected, OUTPUT_DIR)
+        print(f"Updated {len(written)} files in '{OUTPUT_DIR}/'.")
+        sys.exit(0)
+    print(f"'{OUTPUT_DIR}/' was not generated from the current store, rebuilding it in full.")
+
+# Collapse the records into one node per entity and one weighted edge per entity pair, lay them out and
+# save them in the compact, sharded format read by entity_relationship_graph.html (see graph_export)
+summary = write_graph_data(store, OUTPUT_DIR)
+
+print(f"Data extracted and saved to '{OUTPUT_DIR}/' ({summary['nodes']} nodes, {summary['edges']} edges from "
+      f"{summary['relationships']} relationships in {summary['shards']} shards, {summary['clusters']} clusters).")
@@ -0,0 +1,378 @@
+import argparse
+import json
+import math
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(BASE_DIR, "..", "processed_data", "benchmarks")
+HISTORY_FILE = os.path.join(BENCHMARK_DIR, "history.jsonl")
+
+# Benchmarks run in a throwaway copy of the repo (src/ plus a synthetic processed_data/), so every script
+# reads and writes the synthetic data through its usual relative paths and the real data is never touched
+PROCESSED = os.path.join("..", "processed_data")
+RESULT_PREFIX = "BENCHMARK_RESULT "
+
+DEFAULT_SCALES = (1, 10)
+STAGE_TIMEOUT = 600  # Seconds; a stage that times out is skipped at larger scales
+REGRESSION_RATIO = 1.2  # Flag a stage that got this much slower than the previous run at the same scale
+ENCODER_DIM = 384  # all-MiniLM-L6-v2
+
+
+def processed(name):
+    return os.path.join(PROCESSED, name)
+
+
+def read(name):
+    with open(processed(name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def document_texts():
+    """filename -> text of every synthetic document."""
+    texts = {}
+    for folder in ("news_texts", "wikileaks_texts"):
+        for name in os.listdir(processed(folder)):
+            with open(os.path.join(processed(folder), name), "r", encoding="utf-8") as f:
+                texts[name] = f.read()
+    return texts
+
+
+def entity_pairs_by_document(entities):
+    grouped = defaultdict(list)
+    for entity in entities:
+        grouped[entity["filename"]].append(entity["text"])
+    return {
+        filename: [(e1, e2) for i, e1 in enumerate(names) for e2 in names[i + 1:] if e1 != e2]
+        for filename, names in grouped.items()
+    }
+
+
+class StubEncoder:
+    """Stands in for the sentence encoder: random unit vectors, so only the HNSW index cost is measured."""
+
+    def get_sentence_embedding_dimension(self):
+        return ENCODER_DIM
+
+    def encode(self, texts, batch_size=64, normalize_embeddings=True):
+        import numpy as np
+        vectors = np.random.default_rng(len(texts)).standard_normal((len(texts), ENCODER_DIM)).astype("float32")
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def stub_relationship(entity1, entity2, text):
+    """Stands in for the LLM call: a well-formed answer about the pair."""
+    return {
+        "Entity 1": entity1, "Entity 2": entity2,
+        "Relationship Summary": f"{entity1} is mentioned with {entity2}.", "Confidence Score": "85%",
+        "Relevant Context": text[:300],
+        "Threat Assessment": {"Threat Level": 2, "Type": "Economic", "Explanation": "Unknown",
+                              "Impact level on Singapore": 1, "Explanation (Singapore)": "Unknown"},
+        "Origin Location 1": "Unknown", "Origin Location 2": "Unknown",
+    }
+
+
+# Each stage does its setup, then runs the measured part inside measure() and returns the number of items
+@contextmanager
+def measure(result):
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    yield
+    result["wall_seconds"] = round(time.perf_counter() - wall_start, 3)
+    result["cpu_seconds"] = round(time.process_time() - cpu_start, 3)
+
+
+def bench_extract_entities(result):
+    from model_registry import register
+    import extract_entities
+    # NER stub: the synthetic NER output of each document, looked up by its text
+    texts = document_texts()
+    by_file = defaultdict(list)
+    for entity in read("combined_entities.json"):
+        by_file[entity["filename"]].append({"word": entity["text"], "entity_group": entity["label"], "score": entity["score"]})
+    by_text = {texts[filename]: results for filename, results in by_file.items()}
+    register("ner", lambda: lambda text: by_text.get(text, []))
+    with measure(result):
+        entities = (extract_entities.process_text_files(processed("wikileaks_texts"))
+                    + extract_entities.process_text_files(processed("news_texts")))
+        extract_entities.deduplicate_entities(entities)
+    return len(texts)
+
+
+def bench_clean_entities(result):
+    from clean_entities import clean_entities
+    entities = read("combined_entities.json")
+    with measure(result):
+        clean_entities(entities)
+    return len(entities)
+
+
+def bench_filter_redundant_entities(result):
+    from clean_entities import filter_redundant_entities
+    entities = read("cleaned_filtered_entities.json")
+    with measure(result):
+        filter_redundant_entities(entities)
+    return len(entities)
+
+
+def bench_extract_relevant_sentences(result):
+    from extract_relationships_Local import extract_relevant_sentences
+    texts = document_texts()
+    pairs = entity_pairs_by_document(read("cleaned_filtered_entities.json"))
+    with measure(result):
+        for filename, document_pairs in pairs.items():
+            for entity1, entity2 in document_pairs:
+                extract_relevant_sentences(texts[filename], entity1, entity2)
+    return sum(map(len, pairs.values()))
+
+
+def bench_extract_relationships(result):
+    """The relationship extraction loop of extract_relationships_Local.py, with the model call stubbed."""
+    from extract_relationships_Local import extract_relevant_sentences, initialize_json, append_to_json, finalize_json
+    texts = document_texts()
+    pairs = entity_pairs_by_document(read("cleaned_filtered_entities.json"))
+    output_file = processed("benchmark_relationships.json")
+    items = 0
+    with measure(result):
+        initialize_json(output_file)
+        first_result = True
+        for filename, document_pairs in pairs.items():
+            for entity1, entity2 in document_pairs:
+                relevant_text = extract_relevant_sentences(texts[filename], entity1, entity2)
+                if not relevant_text.strip():
+                    continue
+                append_to_json(stub_relationship(entity1, entity2, relevant_text), output_file, first_result)
+                first_result = False
+                items += 1
+        finalize_json(output_file)
+    return items
+
+
+def bench_standardize_json(result):
+    with measure(result):
+        runpy.run_path("standardize_json.py", run_name="__main__")
+    return len(read("extracted_relationships.json"))
+
+
+def bench_relationship_store(result):
+    from relationship_store import build_store
+    with measure(result):
+        build_store()
+    return len(read("cleaned_extracted_relationships.json"))
+
+
+def bench_graph_analytics(result):
+    from relationship_store import open_store
+    from graph_analytics import load_analytics
+    with measure(result):
+        analytics = load_analytics(open_store())
+    return len(analytics["labels"])
+
+
+def bench_graph_data(result):
+    os.chdir("assets")
+    sys.argv = ["nodeGenerator2.0.py"]
+    with measure(result):
+        runpy.run_path("nodeGenerator2.0.py", run_name="__main__")
+    with open(os.path.join("graph_data", "nodes.json"), "r", encoding="utf-8") as f:
+        return len(json.load(f)["nodes"]["label"])
+
+
+def bench_search_index(result):
+    from relationship_store import open_store
+    from text_search import load_index
+    with measure(result):
+        index = load_index(open_store())
+    return int(index["alive"].sum())
+
+
+def bench_dashboard_startup(result):
+    with measure(result):
+        import dashboard
+    return len(dashboard.relationships_df)
+
+
+# In pipeline order: later stages read what earlier ones wrote (the store, analytics cache, ...)
+STAGES = {
+    "extract_entities": bench_extract_entities,
+    "clean_entities": bench_clean_entities,
+    "filter_redundant_entities": bench_filter_redundant_entities,
+    "extract_relevant_sentences": bench_extract_relevant_sentences,
+    "extract_relationships": bench_extract_relationships,
+    "standardize_json": bench_standardize_json,
+    "relationship_store": bench_relationship_store,
+    "graph_analytics": bench_graph_analytics,
+    "graph_data": bench_graph_data,
+    "search_index": bench_search_index,
+    "dashboard_startup": bench_dashboard_startup,
+}
+
+
+def run_stage(name):
+    """Run one stage in this process (inside a sandbox) and print its result for the parent."""
+    from model_registry import register
+    from instrumentation import peak_rss_mb
+    register("sentence_encoder", StubEncoder)
+    result = {}
+    items = STAGES[name](result)
+    result.update({
+        "items": items,
+        "items_per_second": round(items / result["wall_seconds"], 1) if result["wall_seconds"] else None,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+
+
+def make_sandbox(root):
+    """Copy src/ (without the generated graph data and caches) to root/src; the corpus goes in root/processed_data."""
+    shutil.copytree(BASE_DIR, os.path.join(root, "src"),
+                    ignore=shutil.ignore_patterns("__pycache__", "graph_data", "lib"))
+    os.makedirs(os.path.join(root, "processed_data"), exist_ok=True)
+    return os.path.join(root, "src")
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, stages=tuple(STAGES), seed=0, timeout=STAGE_TIMEOUT, keep=False):
+    """
+    Generate a synthetic corpus at every scale and time each stage on it in a separate process.
+
+    Returns:
+        list: One result per (scale, stage): wall and CPU seconds, items, items per second, peak RSS
+            and a status ("ok", "error", "timeout" or "skipped" after timing out at a smaller scale).
+    """
+    from synthetic_data import generate_corpus, load_profile
+
+    profile = load_profile()
+    results = []
+    too_slow = set()
+    for scale in scales:
+        root = tempfile.mkdtemp(prefix=f"sentinel_benchmark_{scale}x_")
+        try:
+            sandbox = make_sandbox(root)
+            start = time.perf_counter()
+            corpus = generate_corpus(os.path.join(root, "processed_data"), scale, seed, profile)
+            print(f"Scale {scale}x: {corpus['documents']} documents, {corpus['entities']} entity mentions, "
+                  f"{corpus['relationships']} relationships (generated in {time.perf_counter() - start:.1f}s)")
+            for name in stages:
+                result = {"scale": scale, "stage": name, **{f"corpus_{key}": value for key, value in corpus.items()}}
+                if name in too_slow:
+                    results.append({**result, "status": "skipped"})
+                    continue
+                try:
+                    process = subprocess.run(
+                        [sys.executable, "benchmark.py", "--run-stage", name],
+                        cwd=sandbox, capture_output=True, text=True, timeout=timeout
+                    )
+                except subprocess.TimeoutExpired:
+                    too_slow.add(name)
+                    result.update(status="timeout", wall_seconds=timeout)
+                else:
+                    lines = [line for line in process.stdout.splitlines() if line.startswith(RESULT_PREFIX)]
+                    if process.returncode == 0 and lines:
+                        result.update(status="ok", **json.loads(lines[-1][len(RESULT_PREFIX):]))
+                    else:
+                        error = (process.stderr.strip().splitlines() or ["no output"])[-1]
+                        result.update(status="error", error=error)
+                results.append(result)
+                print(f"  {format_result(result)}")
+        finally:
+            if keep:
+                print(f"  Sandbox kept at {root}")
+            else:
+                shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def format_result(result):
+    if result["status"] != "ok":
+        detail = f" ({result['error']})" if result.get("error") else ""
+        return f"{result['stage']:<28} {result['status']}{detail}"
+    return (f"{result['stage']:<28} {result['wall_seconds']:>9.2f}s {result['items']:>9} items "
+            f"{result['items_per_second'] or 0:>11.1f}/s {result['peak_rss_mb'] or 0:>8.1f} MB")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_run(results, history_path=HISTORY_FILE):
+    """Append a benchmark run to the history and write it as latest.json."""
+    run = {"finished": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "results": results}
+    os.makedirs(os.path.dirname(history_path), exist_ok=True)
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    with open(os.path.join(os.path.dirname(history_path), "latest.json"), "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    return run
+
+
+def previous_run(history_path=HISTORY_FILE):
+    if not os.path.exists(history_path):
+        return None
+    with open(history_path, "r", encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    return runs[-1] if runs else None
+
+
+def report(results, previous=None):
+    """
+    Print how each stage scales (the exponent k in time ~ size^k between consecutive scales: about 1 is
+    linear, 2 quadratic) and flag stages more than REGRESSION_RATIO slower than in the previous run.
+    """
+    before = {
+        (r["scale"], r["stage"]): r["wall_seconds"]
+        for r in (previous or {}).get("results", []) if r["status"] == "ok"
+    }
+    by_stage = defaultdict(list)
+    for result in results:
+        if result["status"] == "ok":
+            by_stage[result["stage"]].append(result)
+    print(f"\n{'stage':<28} {'scaling':>12}  change vs previous run")
+    for name in dict.fromkeys(result["stage"] for result in results):
+        runs = sorted(by_stage.get(name, []), key=lambda r: r["scale"])
+        exponents = [
+            math.log(b["wall_seconds"] / a["wall_seconds"]) / math.log(b["scale"] / a["scale"])
+            for a, b in zip(runs, runs[1:]) if a["wall_seconds"] > 0 and b["wall_seconds"] > 0
+        ]
+        changes = []
+        for run in runs:
+            old = before.get((run["scale"], name))
+            if old:
+                ratio = run["wall_seconds"] / old
+                flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+                changes.append(f"{run['scale']}x {ratio - 1:+.0%}{flag}")
+        scaling = " ".join(f"n^{k:.2f}" for k in exponents) or "-"
+        print(f"{name:<28} {scaling:>12}  {', '.join(changes) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the pipeline stages, dashboard startup included, on synthetic corpora of several sizes "
+                    "(NER, LLM and sentence encoder stubbed).")
+    parser.add_argument("--scales", type=float, nargs="+", default=list(DEFAULT_SCALES),
+                        help="corpus sizes relative to the shipped dataset (e.g. 1 10 100)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--timeout", type=int, default=STAGE_TIMEOUT, help="seconds allowed per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the sandbox folders")
+    parser.add_argument("--run-stage", choices=list(STAGES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage(args.run_stage)
+        sys.exit(0)
+    previous = previous_run()
+    results = run_benchmarks([int(s) if s == int(s) else s for s in args.scales], args.stages, args.seed,
+                             args.timeout, args.keep)
+    save_run(results)
+    report(results, previous)
+    print(f"\nResults appended to {HISTORY_FILE}")
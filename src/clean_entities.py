@@ -1,5 +1,8 @@
 import json
 import unicodedata
+from instrumentation import get_logger, stage, count, export_metrics
+
+log = get_logger("clean_entities")
 
 
 def is_acronym(full_form, acronym):
@@ -53,7 +56,7 @@ def clean_entities(entities, score_threshold=0.80):
     for entity in entities:
         # Skip entities with low scores
         if entity["score"] < score_threshold:
-            print(f"Skipping entity due to low score: {entity}")
+            log.debug("Skipping entity due to low score: %s", entity)
             continue
 
         # Normalize Unicode to composed form (NFC)
@@ -61,12 +64,12 @@ def clean_entities(entities, score_threshold=0.80):
 
         # Skip single-character entities (all labels)
         if len(normalized_text) < 2:
-            print(f"Skipping single-character entity: {entity}")
+            log.debug("Skipping single-character entity: %s", entity)
             continue
 
         # Skip single-word entities only for PER labels
         if entity["label"] == "PER" and " " not in normalized_text:
-            print(f"Skipping single-word PER entity: {entity}")
+            log.debug("Skipping single-word PER entity: %s", entity)
             continue
 
         # Deduplicate based on normalized text
@@ -79,7 +82,7 @@ def clean_entities(entities, score_threshold=0.80):
                 if key in existing_text or existing_text in key:
                     # Replace shorter entity with the longer one
                     if len(key) > len(existing_text):
-                        print(f"Replacing shorter entity: {existing_entity} with {entity}")
+                        log.debug("Replacing shorter entity: %s with %s", existing_entity, entity)
                         cleaned_entities.remove(existing_entity)
                         seen.remove(existing_text)
                     else:
@@ -100,23 +103,29 @@ if __name__ == "__main__":
     output_file = "../processed_data/cleaned_filtered_entities.json"  # Path to save final cleaned and filtered entities
 
     # Load the entities from the JSON file
-    print(f"Loading entities from: {input_file}")
+    log.info("Loading entities from: %s", input_file)
     with open(input_file, "r", encoding="utf-8") as f:
         entities = json.load(f)
 
     # Step 1: Clean entities
-    print("Cleaning entities...")
-    cleaned_entities = clean_entities(entities)
+    log.info("Cleaning entities...")
+    with stage("clean_entities"):
+        cleaned_entities = clean_entities(entities)
+        count("clean_entities", "items", len(entities))
 
     # Step 2: Filter redundant acronyms
-    print("Filtering redundant acronyms...")
-    filtered_entities, removed_acronyms = filter_redundant_entities(cleaned_entities)
+    log.info("Filtering redundant acronyms...")
+    with stage("filter_acronyms"):
+        filtered_entities, removed_acronyms = filter_redundant_entities(cleaned_entities)
+        count("filter_acronyms", "items", len(cleaned_entities))
 
     # Save the cleaned and filtered entities to a new file
-    print(f"Saving cleaned and filtered entities to: {output_file}")
+    log.info("Saving cleaned and filtered entities to: %s", output_file)
     with open(output_file, "w", encoding="utf-8") as out_f:
         json.dump(filtered_entities, out_f, indent=4, ensure_ascii=False)
 
     # Log the removed acronyms
-    print(f"Removed acronyms: {removed_acronyms}")
-    print(f"Cleaned and filtered entities saved to: {output_file}")
+    log.debug("Removed acronyms: %s", removed_acronyms)
+    log.info("Kept %d of %d entities (%d redundant acronyms removed). Saved to: %s",
+             len(filtered_entities), len(entities), len(removed_acronyms), output_file)
+    export_metrics("clean_entities")
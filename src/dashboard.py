@@ -1,103 +1,101 @@
 import json
+import os
+import threading
+import time
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, State, ctx
+from dash.exceptions import PreventUpdate
+from flask import request, jsonify
 import dash_bootstrap_components as dbc
-from wordcloud import WordCloud
-import io
-import base64
-import re
+from functools import lru_cache
+from relationship_store import open_store, load_relationships_frame, query_relationships, store_version, all_relationships
+from pair_search import build_label_index, search_labels
+import wordcloud_cache
+from graph_analytics import load_analytics
+from graph_index import build_graph_index, load_graph_ids, ego_network, EGO_MAX_NODES
+from graph_paths import build_path_finder, find_paths
+from pair_heatmap import build_pair_matrix, select_block, block_cells, HEATMAP_TOP_K, HEATMAP_MAX_K
+from geocode import geocode_locations
+from text_search import load_index, search
+from serving import install_serving
 
-# Load the cleaned relationships JSON file
-file_path = '../processed_data/cleaned_extracted_relationships.json'
-with open(file_path, 'r', encoding='utf-8') as file:
-    data = json.load(file)
+# Load the cleaned relationships through the indexed relationship store as one flat frame
+store = open_store()
+relationships_df = load_relationships_frame(store)
+
+def stack_entities(frame, columns):
+    """
+    Stack 'Entity 1' and 'Entity 2' into a single 'Entity' column, carrying the given columns
+    along for each side. Rows stay interleaved in record order (Entity 1, Entity 2, ...).
+    """
+    sides = [
+        frame[['Entity 1'] + columns].rename(columns={'Entity 1': 'Entity'}),
+        frame[['Entity 2'] + columns].rename(columns={'Entity 2': 'Entity'})
+    ]
+    return pd.concat(sides).sort_index(kind='stable').reset_index(drop=True)
 
 # -----------------------------------------------
 # Prepare Data for Threat Level Distribution (Bar Chart)
-entity_list = []
-threat_level_list = []
-for record in data:
-    entity_list.append(record['Entity 1'])
-    threat_level_list.append(record['Threat Assessment']['Threat Level'])
-    entity_list.append(record['Entity 2'])
-    threat_level_list.append(record['Threat Assessment']['Threat Level'])
-df = pd.DataFrame({'Entity': entity_list, 'Threat Level': threat_level_list})
+df = stack_entities(relationships_df, ['Threat Level'])
 grouped_df = df.groupby(['Entity', 'Threat Level']).size().reset_index(name='Collaboration Count')
 
 # -----------------------------------------------
 # Prepare Data for Threat Origins Geo Map
-locations = []
-impact_levels = []
-threat_types = []
-for entry in data:
-    impact = entry.get("Threat Assessment", {}).get("Impact level on Singapore", 0)
-    ttype = entry.get("Threat Assessment", {}).get("Type", "Unknown")
-    loc1 = entry.get("Origin Location 1")
-    loc2 = entry.get("Origin Location 2")
-    if loc1:
-        locations.append(loc1)
-        impact_levels.append(impact)
-        threat_types.append(ttype)
-    if loc2 and loc1 != loc2:
-        locations.append(loc2)
-        impact_levels.append(impact)
-        threat_types.append(ttype)
-df_geo = pd.DataFrame({'Location': locations, 'Impact Level': impact_levels, 'Threat Type': threat_types})
-df_geo = df_geo.dropna()
+geo_columns = ['Impact Level', 'Threat Type']
+loc1 = relationships_df['Origin Location 1']
+loc2 = relationships_df['Origin Location 2']
+geo_sides = [
+    relationships_df.loc[loc1.fillna('') != '', ['Origin Location 1'] + geo_columns]
+        .rename(columns={'Origin Location 1': 'Location'}),
+    relationships_df.loc[(loc2.fillna('') != '') & (loc1 != loc2), ['Origin Location 2'] + geo_columns]
+        .rename(columns={'Origin Location 2': 'Location'})
+]
+df_geo = pd.concat(geo_sides).sort_index(kind='stable').reset_index(drop=True)
+df_geo['Threat Type'] = df_geo['Threat Type'].fillna('Unknown')
+df_geo = df_geo[['Location', 'Impact Level', 'Threat Type']].dropna()
 df_geo = df_geo[df_geo['Impact Level'] > 0]
 
+# Free-text locations are resolved offline against the bundled gazetteer (cached in processed_data),
+# then aggregated to one marker per place so city-level origins are plotted too
+places = geocode_locations(df_geo['Location'].unique())
+df_places = pd.DataFrame(
+    [place for place in places.values() if place],
+    index=[location for location, place in places.items() if place],
+    columns=['Latitude', 'Longitude', 'ISO3', 'Place']
+)
+df_map = df_geo.join(df_places, on='Location', how='inner').groupby(
+    ['Place', 'Latitude', 'Longitude'], as_index=False
+).agg(
+    ISO3=('ISO3', 'first'),
+    Relationships=('Impact Level', 'size'),
+    **{
+        'Average Impact Level': ('Impact Level', 'mean'),
+        'Highest Impact Level': ('Impact Level', 'max'),
+        'Main Threat Type': ('Threat Type', lambda types: types.mode().iloc[0]),
+    }
+).round({'Average Impact Level': 1})
+
 # -----------------------------------------------
-# Prepare Data for Heatmap Visualization (Old Heatmap for Threat Levels 5-10)
-entity_1_list_heat = []
-entity_2_list_heat = []
-threat_level_list_heat = []
-for record in data:
-    tlevel = record['Threat Assessment'].get('Threat Level', 0)
-    # Only include threat levels 5 to 10 for the heatmap
-    if 5 <= tlevel <= 10:
-        ent1 = record.get('Entity 1', '').strip()
-        ent2 = record.get('Entity 2', '').strip()
-        if ent1 and ent2:
-            entity_1_list_heat.append(ent1)
-            entity_2_list_heat.append(ent2)
-            threat_level_list_heat.append(tlevel)
+# Prepare Data for Heatmap Visualization (sparse entity x entity matrix of pair threat levels)
 df_heatmap = pd.DataFrame({
-    'Entity 1': entity_1_list_heat,
-    'Entity 2': entity_2_list_heat,
-    'Threat Level': threat_level_list_heat
+    'Entity 1': relationships_df['Entity 1'].fillna('').str.strip(),
+    'Entity 2': relationships_df['Entity 2'].fillna('').str.strip(),
+    'Threat Level': relationships_df['Threat Level'].fillna(0)
 })
-
-# Pivot the data: if duplicate (Entity 1, Entity 2) pairs exist, take the max threat level
-heatmap_data = df_heatmap.pivot_table(
-    index='Entity 1',
-    columns='Entity 2',
-    values='Threat Level',
-    aggfunc='max'
-).fillna(0)
-# Remove rows and columns that are entirely zeros
-heatmap_data = heatmap_data.loc[(heatmap_data != 0).any(axis=1), (heatmap_data != 0).any(axis=0)]
-# Create the old heatmap using px.imshow; fixing the color scale to 5-10 so that nonzero values stand out
-old_heatmap_fig = px.imshow(
-    heatmap_data,
-    labels={'x': 'Entity 2', 'y': 'Entity 1', 'color': 'Threat Level'},
-    title='Visualise the Entity Pair and its Threat Level (Levels 5-10)',
-    color_continuous_scale='Oranges',
-    template="plotly_dark",
-    zmin=5,
-    zmax=10
-)
-old_heatmap_fig.update_layout(
-    plot_bgcolor="rgba(0,0,0,0)",
-    paper_bgcolor="rgba(0,0,0,0)",
-    height=800,
-    xaxis=dict(tickangle=-45)
-)
+df_heatmap = df_heatmap[(df_heatmap['Entity 1'] != '') & (df_heatmap['Entity 2'] != '')].reset_index(drop=True)
+pair_matrix = build_pair_matrix(df_heatmap['Entity 1'], df_heatmap['Entity 2'], df_heatmap['Threat Level'])
 
 # -----------------------------------------------
 # Bar Chart Data Preparation (Impact Levels)
 df_bar = df_geo.groupby(['Threat Type', 'Impact Level'], as_index=False).size()
+
+# Slider figures are memoized per slider value as serialized figure dicts, so moving a slider
+# back to a value already seen skips the filtering and px.bar construction entirely
+FIGURE_CACHE_SIZE = 32
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
 def create_bar_chart(threat_level_filter):
     filtered_df = df_bar[df_bar['Impact Level'] >= threat_level_filter]
     filtered_df = filtered_df.sort_values(by='Impact Level', ascending=False)
@@ -110,25 +108,11 @@ def create_bar_chart(threat_level_filter):
         template="plotly_dark"
     )
     fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)")
-    return fig
+    return fig.to_dict()
 
 # -----------------------------------------------
 # Prepare Data for Treemap (Entity Threat Levels by Threat Type)
-entity_list_treemap = []
-threat_level_list_treemap = []
-threat_type_list_treemap = []
-for record in data:
-    entity_list_treemap.append(record['Entity 1'])
-    threat_level_list_treemap.append(record['Threat Assessment']['Threat Level'])
-    threat_type_list_treemap.append(record['Threat Assessment'].get('Type'))
-    entity_list_treemap.append(record['Entity 2'])
-    threat_level_list_treemap.append(record['Threat Assessment']['Threat Level'])
-    threat_type_list_treemap.append(record['Threat Assessment'].get('Type'))
-df_treemap = pd.DataFrame({
-    'Entity': entity_list_treemap,
-    'Threat Level': threat_level_list_treemap,
-    'Threat Type': threat_type_list_treemap
-})
+df_treemap = stack_entities(relationships_df, ['Threat Level', 'Threat Type'])
 
 # Replace missing threat types with "Unknown" and filter out zero-threat entries
 df_treemap['Threat Type'] = df_treemap['Threat Type'].fillna("Unknown")
@@ -148,36 +132,151 @@ treemap_fig.update_layout(
 )
 
 # -----------------------------------------------
-# Prepare Data for Word Cloud (for Selected Entity Pair)
-entity_list_wc = []
-entity_2_list_wc = []
-relationship_summary_list = []
-relevant_context_list = []
-for record in data:
-    entity_list_wc.append(record['Entity 1'])
-    entity_2_list_wc.append(record['Entity 2'])
-    relationship_summary_list.append(record['Relationship Summary'])
-    relevant_context_list.append(record['Relevant Context'])
-df_wordcloud = pd.DataFrame({
-    'Entity 1': entity_list_wc,
-    'Entity 2': entity_2_list_wc,
-    'Relationship Summary': relationship_summary_list,
-    'Relevant Context': relevant_context_list
+# Prepare Data for Entity Centrality (precomputed graph analytics, cached on disk)
+analytics = load_analytics(store)
+df_centrality = pd.DataFrame({
+    'Entity': analytics['labels'],
+    'Degree': analytics['degree'],
+    'Weighted Degree': analytics['weighted_degree'],
+    'PageRank': analytics['pagerank'],
+    'Betweenness': analytics['betweenness'],
+    'Community': analytics['community']
 })
+CENTRALITY_TOP_N = 25
+centrality_fig = px.bar(
+    df_centrality.nlargest(CENTRALITY_TOP_N, 'PageRank'),
+    x='Entity',
+    y='PageRank',
+    color='Betweenness',
+    hover_data=['Degree', 'Weighted Degree', 'Community'],
+    title=f'Visualise the {CENTRALITY_TOP_N} most central entities in the relationship graph (PageRank)',
+    color_continuous_scale='Oranges',
+    template="plotly_dark"
+)
+centrality_fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)")
+
+# -----------------------------------------------
+# Threat Level Heatmap: only a block of at most HEATMAP_MAX_K entities is drawn, and only its non-empty
+# cells, as WebGL squares, so the figure stays the same size however many entities there are
+HEATMAP_PLOT_PX = 900
+pair_communities = pd.Series(pair_matrix['labels']).map(
+    dict(zip(analytics['labels'], analytics['community']))
+).fillna(-1).to_numpy()
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def create_pair_heatmap(min_threat_level, k, order, focus=None):
+    """
+    Heatmap of the pairs among the top k entities (or, with focus, a pair's entities and their neighbours).
+
+    Args:
+        min_threat_level (int): Lowest threat level drawn (and counted when picking the entities).
+        order (str): "weighted_degree" or "community", see select_block.
+        focus (tuple): Entity names to drill into, or None for the whole graph.
+    """
+    ids = select_block(pair_matrix, k, min_threat_level, order, pair_communities, focus)
+    rows, cols, levels, counts = block_cells(pair_matrix, ids, min_threat_level)
+    names = pair_matrix['labels'][ids]
+    fig = go.Figure(go.Scattergl(
+        x=cols,
+        y=rows,
+        mode='markers',
+        marker=dict(
+            symbol='square',
+            size=max(2, HEATMAP_PLOT_PX // max(len(ids), 1) - 1),
+            color=levels,
+            colorscale='Oranges',
+            cmin=min_threat_level,
+            cmax=10,
+            colorbar=dict(title='Threat Level')
+        ),
+        customdata=list(zip(names[rows], names[cols], counts.astype(int))),
+        hovertemplate='%{customdata[0]} & %{customdata[1]}<br>Threat Level: %{marker.color}'
+                      '<br>Relationships: %{customdata[2]}<extra></extra>'
+    ))
+    axis = dict(
+        tickmode='array', tickvals=list(range(len(ids))), ticktext=list(names),
+        range=[-0.5, len(ids) - 0.5], showgrid=False, zeroline=False, fixedrange=True
+    )
+    if focus:
+        title = f'Pairs around {" & ".join(focus)} (threat level {min_threat_level} and above)'
+    else:
+        title = f'Visualise the Entity Pair and its Threat Level among the {len(ids)} busiest entities (Levels {min_threat_level}-10)'
+    fig.update_layout(
+        title=title,
+        template="plotly_dark",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        height=HEATMAP_PLOT_PX + 200,
+        xaxis=dict(axis, tickangle=-45),
+        yaxis=dict(axis, range=[len(ids) - 0.5, -0.5], scaleanchor='x'),
+        clickmode='event'
+    )
+    return fig.to_dict()
+
+# -----------------------------------------------
+# Prepare Data for Word Cloud (for Selected Entity Pair)
+df_wordcloud = relationships_df[['Entity 1', 'Entity 2', 'Relationship Summary', 'Relevant Context']]
 valid_pairs = df_wordcloud[
     (df_wordcloud['Relationship Summary'].str.strip() != '') |
     (df_wordcloud['Relevant Context'].str.strip() != '')
 ]
-entity_pairs = valid_pairs[['Entity 1', 'Entity 2']].drop_duplicates()
-dropdown_options = [
-    {'label': f'{e1} & {e2}', 'value': f'{e1} & {e2}'}
-    for e1, e2 in zip(entity_pairs['Entity 1'], entity_pairs['Entity 2'])
-]
+# Most frequent pairs first (ties keep record order), so the top search matches are the busiest pairs
+entity_pairs = valid_pairs.groupby(['Entity 1', 'Entity 2'], sort=False).size()
+entity_pairs = entity_pairs.sort_values(ascending=False, kind='stable')
+pair_labels = [f'{e1} & {e2}' for e1, e2 in entity_pairs.index]
+data_version = store_version(store)
+
+# Number of most frequent pairs whose word clouds are rendered in the background at startup (0 disables)
+WORDCLOUD_PRERENDER_TOP_N = 20
+
+# The dropdown only ever holds one page of options; typing searches the server-side index,
+# so the layout stays the same size however many pairs there are
+DROPDOWN_PAGE_SIZE = 50
+pair_index = build_label_index(pair_labels)
+dropdown_options = [{'label': label, 'value': label} for label in pair_labels[:DROPDOWN_PAGE_SIZE]]
+
+# -----------------------------------------------
+# Full-text search over relationship summaries, contexts and threat explanations (index kept in processed_data)
+SEARCH_RESULTS = 20
+# The dashboard only reads the saved index (updating it in memory); stream_ingest.py and the pipeline write it
+search_index = load_index(store, save=False)
+threat_type_options = sorted(relationships_df['Threat Type'].dropna().unique())
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def search_relationships(query, k=SEARCH_RESULTS, min_threat_level=None, threat_type=None):
+    """Run a search and return the matching records (best first) as plain dicts for the panel and API."""
+    hits = search(search_index, query, k, min_threat_level, threat_type)
+    if not hits:
+        return []
+    ids = [record_id for record_id, _ in hits]
+    rows = {
+        row['id']: row for row in store.execute(
+            f"SELECT id, entity1, entity2, summary, threat_level, threat_type FROM relationships "
+            f"WHERE id IN ({', '.join('?' * len(ids))})", ids
+        )
+    }
+    results = []
+    for record_id, score in hits:
+        # The index can lag the store until the next refresh; skip hits whose record is gone
+        row = rows.get(record_id)
+        if row is None:
+            continue
+        results.append({
+            'id': record_id,
+            'score': score,
+            'entity1': row['entity1'],
+            'entity2': row['entity2'],
+            'summary': row['summary'],
+            'threat_level': row['threat_level'],
+            'threat_type': row['threat_type'],
+        })
+    return results
 
 # -----------------------------------------------
 # Dash App Layout and Callbacks using Darkly Theme
 app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY])
 app.title = "Sentinel View"
+server = app.server  # WSGI entry point for production serving (see gunicorn.conf.py)
 
 
 app.layout = dbc.Container([
@@ -195,6 +294,26 @@ dbc.NavbarSimple(
             html.H2("Entity Relationship Graph"),
             html.Iframe(src='/assets/entity_relationship_graph.html', width='98%', height='850px', style={'border': 'none', 'margin-left': 'auto', 'margin-right': 'auto', 'display': 'block'})
         ], width=12)
+    ], className="mb-4"),
+    dbc.Row([
+        dbc.Col([
+            html.H2("Search Relationships"),
+            dbc.Row([
+                dbc.Col(dbc.Input(
+                    id='search-input',
+                    type='search',
+                    debounce=True,
+                    placeholder="Search summaries, context and threat explanations (press Enter)..."
+                ), width=8),
+                dbc.Col(dcc.Dropdown(
+                    id='search-threat-type',
+                    options=[{'label': t, 'value': t} for t in threat_type_options],
+                    placeholder="Any threat type",
+                    style={'color': 'black'}
+                ), width=4)
+            ], className="mb-3"),
+            html.Div(id='search-results', children=[])
+        ], width=12)
     ], className="mb-4"),
         dbc.Row([
         dbc.Col([
@@ -222,18 +341,26 @@ dbc.NavbarSimple(
         ], width=12)
     ], className="mb-4"),
     
+    dbc.Row([
+        dbc.Col([
+            html.H2("Most Central Entities"),
+            dcc.Graph(id='centrality-bar', figure=centrality_fig, style={'height': '600px', 'width': '100%'})
+        ], width=12)
+    ], className="mb-4"),
     dbc.Row([
         dbc.Col([
             html.H2("Threat Origins and Impact Levels to Singapore"),
             dcc.Graph(
                 id='geo-map',
                 figure=px.scatter_geo(
-                    df_geo,
-                    locations="Location",
-                    locationmode="country names",
-                    size="Impact Level",
-                    color="Impact Level",
-                    hover_name="Location",
+                    df_map,
+                    lat="Latitude",
+                    lon="Longitude",
+                    size="Relationships",
+                    color="Average Impact Level",
+                    hover_name="Place",
+                    hover_data={"Latitude": False, "Longitude": False, "ISO3": True,
+                                "Highest Impact Level": True, "Main Threat Type": True},
                     title="Visualise the origin of the threat and its impact to Singapore",
                     projection="natural earth",
                     color_continuous_scale="Reds",
@@ -271,16 +398,38 @@ dbc.NavbarSimple(
             )
         ], width=12)
     ], className="mb-4"),
-    # dbc.Row([
-    #     dbc.Col([
-    #         html.H2("Threat Level Heatmap"),
-    #         dcc.Graph(
-    #             id='heatmap',
-    #             figure=old_heatmap_fig,
-    #             style={'height': '1000px', 'width': '100%'}
-    #         )
-    #     ], width=12)
-    # ], className="mb-4"),
+    dbc.Row([
+        dbc.Col([
+            html.H2("Threat Level Heatmap"),
+            dbc.Row([
+                dbc.Col([
+                    html.H5("Minimum Threat Level", style={'color': 'white', 'font-weight': 'bold'}),
+                    dcc.Slider(id='heatmap-threat-slider', min=0, max=10, value=5, step=1,
+                               marks={i: str(i) for i in range(11)})
+                ], width=5),
+                dbc.Col([
+                    html.H5("Entities Shown", style={'color': 'white', 'font-weight': 'bold'}),
+                    dcc.Slider(id='heatmap-k-slider', min=20, max=HEATMAP_MAX_K, value=HEATMAP_TOP_K, step=10,
+                               marks={i: str(i) for i in range(20, HEATMAP_MAX_K + 1, 20)})
+                ], width=4),
+                dbc.Col([
+                    html.H5("Order By", style={'color': 'white', 'font-weight': 'bold'}),
+                    dbc.RadioItems(
+                        id='heatmap-order',
+                        options=[{'label': 'Weighted Degree', 'value': 'weighted_degree'},
+                                 {'label': 'Community', 'value': 'community'}],
+                        value='weighted_degree',
+                        inline=True
+                    ),
+                    dbc.Button("Show All Entities", id='heatmap-reset', color='secondary', size='sm', className="mt-2")
+                ], width=3)
+            ], className="mb-3"),
+            html.P("Click a cell to drill into the neighbourhood of that pair.", style={'color': 'white'}),
+            dcc.Store(id='heatmap-focus'),
+            dcc.Graph(id='pair-heatmap', style={'height': '1100px', 'width': '100%'}),
+            html.Div(id='heatmap-pair-details')
+        ], width=12)
+    ], className="mb-4"),
     dbc.Row([
         dbc.Col([
             html.H2("Word Cloud for Selected Entities"),
@@ -292,6 +441,8 @@ dbc.NavbarSimple(
                     value=dropdown_options[0]['value'],
                     multi=False,
                     clearable=False,
+                    searchable=True,
+                    placeholder="Type to search entity pairs...",
                     style={'color': 'black'}
                 )
             ], className="mb-3"),
@@ -302,11 +453,8 @@ dbc.NavbarSimple(
 
 # -----------------------------------------------
 # Callbacks
-@app.callback(
-    Output('threat-level-bar', 'figure'),
-    Input('threat-slider', 'value')
-)
-def update_threat_level_chart(threat_level):
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def create_threat_level_chart(threat_level):
     filtered_df = grouped_df[grouped_df['Threat Level'] >= threat_level]
     fig = px.bar(
         filtered_df,
@@ -319,9 +467,36 @@ def update_threat_level_chart(threat_level):
         template="plotly_dark"
     )
     fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(0,0,0,0)")
-    return fig
+    return fig.to_dict()
 
-import re
+@app.callback(
+    Output('threat-level-bar', 'figure'),
+    Input('threat-slider', 'value')
+)
+def update_threat_level_chart(threat_level):
+    return create_threat_level_chart(threat_level)
+
+@app.callback(
+    Output('entity-dropdown', 'options'),
+    Input('entity-dropdown', 'search_value'),
+    State('entity-dropdown', 'value')
+)
+def update_dropdown_options(search_value, value):
+    if not search_value:
+        raise PreventUpdate
+    matches = search_labels(pair_index, search_value, limit=DROPDOWN_PAGE_SIZE)
+    # Keep the current selection in the options so the dropdown does not clear it
+    if value and value not in matches:
+        matches.append(value)
+    return [{'label': label, 'value': label} for label in matches]
+
+def load_pair_text(entity_1, entity_2):
+    """Look up the word cloud text for a pair through the store's (Entity 1, Entity 2) index."""
+    pair_records = query_relationships(store, pair=(entity_1, entity_2))
+    return " ".join(
+        [r['Relationship Summary'] or '' for r in pair_records] +
+        [r['Relevant Context'] or '' for r in pair_records]
+    )
 
 @app.callback(
     Output('wordcloud-output', 'children'),
@@ -330,25 +505,39 @@ import re
 def update_wordcloud(selected_pair):
     entity_1, entity_2 = selected_pair.split(' & ')
     
-    filtered_data = df_wordcloud[(df_wordcloud['Entity 1'] == entity_1) & (df_wordcloud['Entity 2'] == entity_2)]
+    # Rendered PNGs are cached in memory and on disk; misses render on the word cloud thread pool
+    img_b64 = wordcloud_cache.get_wordcloud_b64(entity_1, entity_2, load_pair_text, version=data_version)
     
-    text = " ".join(filtered_data['Relationship Summary'].tolist() + filtered_data['Relevant Context'].tolist())
-    
-    if not text.strip():
+    if img_b64 is None:
         return html.Div("No relevant text available for the selected entity pair.", style={'color': 'white'})
     
-    text = re.sub(r'\b' + re.escape(entity_1) + r'\b', '', text)
-    text = re.sub(r'\b' + re.escape(entity_2) + r'\b', '', text)
-    
-    wordcloud = WordCloud(width=800, height=400, background_color='black', colormap='viridis').generate(text)
-    
-    img = io.BytesIO()
-    wordcloud.to_image().save(img, format='PNG')
-    img.seek(0)
-    img_b64 = base64.b64encode(img.getvalue()).decode('utf-8')
-    
     return html.Img(src=f'data:image/png;base64,{img_b64}', style={'width': '80%', 'height': '80%'})
 
+@app.callback(
+    Output('search-results', 'children'),
+    Input('search-input', 'value'),
+    Input('search-threat-type', 'value')
+)
+def update_search_results(query, threat_type):
+    if not query or not query.strip():
+        return []
+    results = search_relationships(query.strip(), SEARCH_RESULTS, None, threat_type)
+    if not results:
+        return html.Div("No relationships match this search.", style={'color': 'white'})
+    return dbc.Table(
+        [html.Thead(html.Tr([html.Th("Entities"), html.Th("Threat Level"), html.Th("Threat Type"), html.Th("Relationship Summary")]))] +
+        [html.Tbody([
+            html.Tr([
+                html.Td(f"{r['entity1']} & {r['entity2']}"),
+                html.Td(r['threat_level']),
+                html.Td(r['threat_type']),
+                html.Td(r['summary'])
+            ])
+            for r in results
+        ])],
+        bordered=False, hover=True, size='sm', color='dark'
+    )
+
 @app.callback(
     Output('bar-chart', 'figure'),
     Input('impact-level-slider', 'value')
@@ -356,5 +545,172 @@ def update_wordcloud(selected_pair):
 def update_bar_chart(threat_level):
     return create_bar_chart(threat_level)
 
+@app.callback(
+    Output('heatmap-focus', 'data'),
+    Input('pair-heatmap', 'clickData'),
+    Input('heatmap-reset', 'n_clicks'),
+    prevent_initial_call=True
+)
+def update_heatmap_focus(click_data, _):
+    if ctx.triggered_id == 'heatmap-reset' or not click_data:
+        return None
+    entity_1, entity_2, _ = click_data['points'][0]['customdata']
+    return [entity_1, entity_2]
+
+@app.callback(
+    Output('pair-heatmap', 'figure'),
+    Input('heatmap-threat-slider', 'value'),
+    Input('heatmap-k-slider', 'value'),
+    Input('heatmap-order', 'value'),
+    Input('heatmap-focus', 'data')
+)
+def update_pair_heatmap(min_threat_level, k, order, focus):
+    return create_pair_heatmap(min_threat_level, min(k, HEATMAP_MAX_K), order, tuple(focus) if focus else None)
+
+@app.callback(
+    Output('heatmap-pair-details', 'children'),
+    Input('heatmap-focus', 'data')
+)
+def update_heatmap_pair_details(focus):
+    if not focus:
+        return []
+    entity_1, entity_2 = focus
+    records = query_relationships(store, pair=(entity_1, entity_2)) + query_relationships(store, pair=(entity_2, entity_1))
+    if not records:
+        return html.Div("No relationships recorded for this pair.", style={'color': 'white'})
+    return dbc.Table(
+        [html.Thead(html.Tr([html.Th("Entities"), html.Th("Threat Level"), html.Th("Threat Type"), html.Th("Relationship Summary")]))] +
+        [html.Tbody([
+            html.Tr([
+                html.Td(f"{r['Entity 1']} & {r['Entity 2']}"),
+                html.Td(r['Threat Assessment']['Threat Level']),
+                html.Td(r['Threat Assessment']['Type']),
+                html.Td(r['Relationship Summary'])
+            ])
+            for r in records
+        ])],
+        bordered=False, hover=True, size='sm', color='dark'
+    )
+
+# -----------------------------------------------
+# Ego-network API for the graph page: it asks for the neighbourhood of the entities the user searches
+# for instead of downloading the whole graph. Answered from an in-memory adjacency index.
+# Node and edge ids are taken from graph_data when it matches the store, so they agree with the page
+EGO_CACHE_SIZE = 256
+GRAPH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'graph_data')
+
+def load_graph_index():
+    return build_graph_index(all_relationships(store), load_graph_ids(GRAPH_DATA_DIR, store_version(store)))
+
+graph_index = load_graph_index()
+
+def optional_int(name, default=None):
+    value = request.args.get(name)
+    return int(value) if value not in (None, '') else default
+
+@lru_cache(maxsize=EGO_CACHE_SIZE)
+def get_ego_network(entity, hops, min_threat_level, max_threat_level, threat_type, max_nodes):
+    return ego_network(graph_index, entity, hops, min_threat_level, max_threat_level, threat_type, max_nodes)
+
+@app.server.route('/api/ego-network')
+def ego_network_api():
+    entity = request.args.get('entity', '').strip()
+    if not entity:
+        return jsonify({'error': 'Missing entity parameter'}), 400
+    try:
+        result = get_ego_network(
+            entity,
+            optional_int('hops', 1),
+            optional_int('min_threat_level'),
+            optional_int('max_threat_level'),
+            request.args.get('threat_type') or None,
+            optional_int('max_nodes', EGO_MAX_NODES)
+        )
+    except ValueError:
+        return jsonify({'error': 'hops, max_nodes and threat levels must be integers'}), 400
+    if result is None:
+        return jsonify({'error': f'Unknown entity: {entity}'}), 404
+    return jsonify(result)
+
+# Connection finder: the k best paths between two entities, weighted by threat level unless weighted=0
+path_finder = build_path_finder(graph_index)
+
+@lru_cache(maxsize=EGO_CACHE_SIZE)
+def get_paths(source, target, k, weighted):
+    return find_paths(path_finder, source, target, k, weighted)
+
+@app.server.route('/api/paths')
+def paths_api():
+    source = request.args.get('source', '').strip()
+    target = request.args.get('target', '').strip()
+    if not source or not target:
+        return jsonify({'error': 'Missing source or target parameter'}), 400
+    try:
+        result = get_paths(source, target, optional_int('k') or 1, request.args.get('weighted', '1') != '0')
+    except ValueError:
+        return jsonify({'error': 'k must be an integer'}), 400
+    if result is None:
+        return jsonify({'error': 'Unknown entity'}), 404
+    return jsonify({'paths': result})
+
+@app.server.route('/api/search')
+def search_api():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing q parameter'}), 400
+    try:
+        results = search_relationships(
+            query,
+            optional_int('k') or SEARCH_RESULTS,
+            optional_int('min_threat_level'),
+            request.args.get('threat_type') or None
+        )
+    except ValueError:
+        return jsonify({'error': 'k and min_threat_level must be integers'}), 400
+    return jsonify({'results': results})
+
+# -----------------------------------------------
+# Relationships appended while the dashboard runs (stream_ingest.py) reach the search panel and the graph
+# APIs within LIVE_REFRESH_SECONDS; the overview charts are rebuilt when the dashboard restarts
+LIVE_REFRESH_SECONDS = 5
+live_state = {'version': data_version, 'checked': time.monotonic()}
+live_lock = threading.Lock()
+
+def refresh_live_data():
+    global search_index, graph_index, path_finder
+    search_index = load_index(store, save=False)
+    graph_index = load_graph_index()
+    path_finder = build_path_finder(graph_index)
+    for cached in (search_relationships, get_ego_network, get_paths):
+        cached.cache_clear()
+
+@server.before_request
+def follow_store():
+    now = time.monotonic()
+    if now - live_state['checked'] < LIVE_REFRESH_SECONDS or not live_lock.acquire(blocking=False):
+        return
+    try:
+        live_state['checked'] = now
+        version = store_version(store)
+        if version != live_state['version']:
+            refresh_live_data()
+            live_state['version'] = version
+    finally:
+        live_lock.release()
+
+def reopen_store():
+    """Give a forked server worker its own SQLite connection; connections must not cross a fork."""
+    global store
+    store = open_store()
+
+def health_check():
+    store.execute('SELECT 1').fetchone()
+    return {'relationships': len(relationships_df), 'search_documents': int(search_index['alive'].sum())}
+
+install_serving(server, data_version, health_check)
+
 if __name__ == '__main__':
+    if WORDCLOUD_PRERENDER_TOP_N:
+        top_pairs = list(entity_pairs.index[:WORDCLOUD_PRERENDER_TOP_N])
+        wordcloud_cache.prerender(top_pairs, load_pair_text, version=data_version)
     app.run_server(debug=True)
@@ -1,29 +1,40 @@
 import os
 import json
 from tqdm import tqdm  # Progress bar library
-from transformers import pipeline
-
-# Load BERT NER pipeline
-print("Loading BERT NER pipeline...")
-ner_pipeline = pipeline(
-    "ner",
-    model="dbmdz/bert-large-cased-finetuned-conll03-english",
-    aggregation_strategy="simple",
-    device=0  # Use CPU (-1) or GPU (0 if available)
-)
-print("NER pipeline loaded.")
+from instrumentation import get_logger, stage, count, timed, export_metrics
+from model_registry import register, get_model, warm_up
+from near_duplicates import load_duplicate_clusters, duplicate_of, expand_to_members
+
+log = get_logger("extract_entities")
+
+NER_MODEL = "dbmdz/bert-large-cased-finetuned-conll03-english"
+
+
+def load_ner_pipeline():
+    """Build the BERT NER pipeline. Called by the model registry on first use, not at import."""
+    from transformers import pipeline
+    return pipeline(
+        "ner",
+        model=NER_MODEL,
+        aggregation_strategy="simple",
+        device=0  # Use CPU (-1) or GPU (0 if available)
+    )
+
+
+register("ner", load_ner_pipeline)
 
 # Define relevant labels and confidence threshold
 RELEVANT_LABELS = {"ORG", "PER"}
 SCORE_THRESHOLD = 0.80
 
+@timed
 def extract_entities_bert(text, filename):
     """
     Extract entities using a BERT-based NER model.
     Handles and removes subword tokens (## prefixes).
     """
     entities = []
-    ner_results = ner_pipeline(text)
+    ner_results = get_model("ner")(text)
     for result in ner_results:
         entity_text = result["word"].strip()
 
@@ -45,14 +56,19 @@ def extract_entities_bert(text, filename):
     return entities
 
 
-def process_text_files(input_dir):
+def process_text_files(input_dir, duplicates=None):
     """
     Process text files from a directory and extract entities.
     Adds filename to each extracted entity for traceability.
+    Files in duplicates (near-copies of another document) are skipped; their entities are
+    copied from the representative afterwards.
     Returns a list of all extracted entities.
     """
     all_entities = []
-    text_files = [f for f in os.listdir(input_dir) if f.endswith("_text.txt")]
+    duplicates = duplicates or {}
+    all_files = [f for f in os.listdir(input_dir) if f.endswith("_text.txt")]
+    text_files = [f for f in all_files if f not in duplicates]
+    count("extract_entities", "duplicates_skipped", len(all_files) - len(text_files))
     
     # Use tqdm to show a progress bar
     for text_file in tqdm(text_files, desc="Processing files"):
@@ -65,6 +81,8 @@ def process_text_files(input_dir):
         # Extract entities with filename included
         entities = extract_entities_bert(text, text_file)
         all_entities.extend(entities)
+        count("extract_entities", "items")
+        log.debug("%d entities in %s", len(entities), text_file)
     return all_entities
 
 def deduplicate_entities(entities):
@@ -87,20 +105,31 @@ if __name__ == "__main__":
     news_text_dir = "../processed_data/news_texts"  # Path to extracted News texts
     combined_entities_file = "../processed_data/combined_entities.json"  # Combined output file
 
+    # Load the NER model up front so its loading time is not counted in the first file
+    warm_up("ner")
+
+    # Near-identical documents (see near_duplicates.py) are run through NER only once
+    clusters = load_duplicate_clusters()
+    duplicates = duplicate_of(clusters)
+
     # Extract entities from PDFs
-    print("Starting entity extraction for PDFs...")
-    pdf_entities = process_text_files(pdf_text_dir)
+    log.info("Starting entity extraction for PDFs...")
+    with stage("extract_entities"):
+        pdf_entities = process_text_files(pdf_text_dir, duplicates)
 
-    # Extract entities from News
-    print("\nStarting entity extraction for News...")
-    news_entities = process_text_files(news_text_dir)
+        # Extract entities from News
+        log.info("Starting entity extraction for News...")
+        news_entities = process_text_files(news_text_dir, duplicates)
 
     # Combine and deduplicate entities
-    print("\nCombining and deduplicating entities...")
-    all_entities = pdf_entities + news_entities
-    deduplicated_entities = deduplicate_entities(all_entities)
+    log.info("Combining and deduplicating entities...")
+    with stage("deduplicate_entities"):
+        all_entities = expand_to_members(pdf_entities + news_entities, clusters)
+        deduplicated_entities = deduplicate_entities(all_entities)
+        count("deduplicate_entities", "items", len(all_entities))
 
     # Save deduplicated entities to a single JSON file
     with open(combined_entities_file, 'w', encoding='utf-8') as out_f:
         json.dump(deduplicated_entities, out_f, indent=4)
-    print(f"All entities saved to: {combined_entities_file}")
+    log.info("%d entities saved to: %s", len(deduplicated_entities), combined_entities_file)
+    export_metrics("extract_entities")
@@ -6,6 +6,11 @@ import time
 from collections import defaultdict
 from nltk.tokenize import sent_tokenize
 from tqdm import tqdm
+from instrumentation import get_logger, stage, count, timed, export_metrics
+from near_duplicates import load_duplicate_clusters, duplicate_of
+from pair_triage import load_triage_model, entity_info_from, worth_extracting
+
+log = get_logger("extract_relationships")
 
 # Set OpenAI API key
 openai.api_key = "YOUR_API_KEY"
@@ -26,6 +31,7 @@ def clean_relevant_context(text):
     cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
     return cleaned_text
 
+@timed
 def extract_relevant_sentences(text, entity1, entity2):
     """Extract sentences containing both entities or combine if no overlap."""
     sentences = sent_tokenize(text)
@@ -41,10 +47,11 @@ def validate_json_response(parsed_result):
         return False
     missing_keys = REQUIRED_KEYS - parsed_result.keys()
     if missing_keys:
-        print("Validation Error: Missing keys in response:", missing_keys)
+        log.warning("Validation Error: Missing keys in response: %s", missing_keys)
         return False
     return True
 
+@timed
 def extract_relationship(entity1, entity2, text):
     """Extract relationships using OpenAI's API with retries and error handling."""
     while True:
@@ -153,21 +160,27 @@ Text: Entity_A collaborated with Entity_B to conduct sensitive operations that i
                 temperature=0.7
             )
 
+            usage = response.get("usage", {})
+            count("extract_relationships", "tokens_in", usage.get("prompt_tokens", 0))
+            count("extract_relationships", "tokens_out", usage.get("completion_tokens", 0))
+
             # Extract the raw response content
             raw_result = response["choices"][0]["message"]["content"].strip()
-            print("Raw Result Content:", raw_result)
+            log.debug("Raw Result Content: %s", raw_result)
 
             # Ensure the response is valid JSON
             parsed_result = json.loads(raw_result)
 
             if not validate_json_response(parsed_result):
-                print("Error: Response does not meet the expected structure.")
+                log.warning("Response does not meet the expected structure, retrying.")
+                count("extract_relationships", "retries")
                 continue  # Retry if validation fails
 
             return parsed_result
 
         except (json.JSONDecodeError, openai.error.APIError) as e:
-            print(f"Error occurred: {str(e)}. Retrying...")
+            log.warning("Error occurred: %s. Retrying...", e)
+            count("extract_relationships", "retries")
             time.sleep(5)
 
 def append_to_json(result, output_path):
@@ -203,30 +216,45 @@ if __name__ == "__main__":
     with open(input_json_file, "r", encoding="utf-8") as f:
         entities = json.load(f)
 
+    # Near-copies of a document share its entities and text, so their pairs are only sent once
+    duplicates = duplicate_of(load_duplicate_clusters())
+    # Pairs the triage model scores below its threshold are not worth an LLM call (see pair_triage.py)
+    triage = load_triage_model()
+    entity_info = entity_info_from(entities)
     grouped_entities = defaultdict(list)
     for entity in entities:
+        if entity["filename"] in duplicates:
+            continue
         grouped_entities[entity["filename"]].append(entity["text"])
 
-    for filename, entity_list in tqdm(grouped_entities.items(), desc="Processing files"):
-        file_path = os.path.join(news_dir if filename.startswith("news_row") else wikileaks_dir, filename)
+    with stage("extract_relationships"):
+        for filename, entity_list in tqdm(grouped_entities.items(), desc="Processing files"):
+            file_path = os.path.join(news_dir if filename.startswith("news_row") else wikileaks_dir, filename)
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        except FileNotFoundError:
-            print(f"File not found: {file_path}")
-            continue
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                log.warning("File not found: %s", file_path)
+                count("extract_relationships", "errors")
+                continue
 
-        entity_pairs = [(entity1, entity2) for i, entity1 in enumerate(entity_list) for entity2 in entity_list[i + 1:] if entity1 != entity2]
+            entity_pairs = [(entity1, entity2) for i, entity1 in enumerate(entity_list) for entity2 in entity_list[i + 1:] if entity1 != entity2]
 
-        for entity1, entity2 in entity_pairs:
-            relevant_text = extract_relevant_sentences(text, entity1, entity2)
+            for entity1, entity2 in entity_pairs:
+                relevant_text = extract_relevant_sentences(text, entity1, entity2)
 
-            if not relevant_text.strip():
-                continue
+                if not relevant_text.strip():
+                    continue
+
+                if not worth_extracting(triage, entity1, entity2, relevant_text, entity_info):
+                    count("extract_relationships", "triage_skipped")
+                    continue
 
-            result = extract_relationship(entity1, entity2, relevant_text)
-            append_to_json(result, output_file)
+                result = extract_relationship(entity1, entity2, relevant_text)
+                append_to_json(result, output_file)
+                count("extract_relationships", "items")
 
     finalize_json(output_file)
-    print(f"Results saved progressively to {output_file}.")
+    log.info("Results saved progressively to %s.", output_file)
+    export_metrics("extract_relationships")
@@ -1,26 +1,39 @@
 import json
-import torch
+import logging
 import re
 import os
 from tqdm import tqdm
 from collections import defaultdict
-from nltk.tokenize import sent_tokenize
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+from instrumentation import get_logger, stage, count, timed, export_metrics
+from model_registry import register, get_model, warm_up
+from near_duplicates import load_duplicate_clusters, duplicate_of
+from pair_triage import load_triage_model, entity_info_from, worth_extracting
+
+log = get_logger("extract_relationships_local")
 
-print(torch.version.cuda)  # Should match your installed CUDA version
-print(torch.backends.cudnn.version()) 
 # Load Hugging Face Model (Replace with your DeepSeek-R1-Distill model)
 MODEL_NAME = "deepseek-ai/deepseek-r1-distill-qwen-7b"
-# Enable 4-bit quantization
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,  
-    bnb_4bit_compute_dtype=torch.float16,  
-    bnb_4bit_use_double_quant=True,  
-    bnb_4bit_quant_type="nf4"
-)
-
-print("🔄 Loading Model...")
-try:
+
+
+def load_relationship_model():
+    """
+    Load the 4-bit quantized model and its tokenizer. torch and transformers are only imported here,
+    so importing this module's helpers stays cheap; the registry calls this on first inference.
+
+    Returns:
+        tuple: (model, tokenizer)
+    """
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
+
+    log.info("CUDA %s, cuDNN %s", torch.version.cuda, torch.backends.cudnn.version())  # Should match your installed CUDA version
+    # Enable 4-bit quantization
+    bnb_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_compute_dtype=torch.float16,
+        bnb_4bit_use_double_quant=True,
+        bnb_4bit_quant_type="nf4"
+    )
     model = AutoModelForCausalLM.from_pretrained(
         MODEL_NAME,
         quantization_config=bnb_config,
@@ -28,17 +41,16 @@ try:
         max_memory={"cuda": "6GB", "cpu": "8GB"},  # Prevents out-of-memory errors
     )
     tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-    model = torch.compile(model)
-
-    print("✅ Model loaded successfully!")
 
     # Debug: Check if uint8 issue still exists
-    for name, param in model.named_parameters():
-        print(f"{name}: {param.dtype}")  # Should print "torch.float16"
+    if log.isEnabledFor(logging.DEBUG):
+        for name, param in model.named_parameters():
+            log.debug("%s: %s", name, param.dtype)  # Should print "torch.float16"
+
+    return torch.compile(model), tokenizer
+
 
-except Exception as e:
-    print(f"❌ Model loading failed: {e}")
-    exit()
+register("relationship_llm", load_relationship_model)
 
 # File Paths
 input_json_file = "../processed_data/cleaned_filtered_entities.json"
@@ -57,6 +69,7 @@ def clean_relevant_context(text):
 
 # Extract Relevant Sentences
 def extract_relevant_sentences(text, entity1, entity2):
+    from nltk.tokenize import sent_tokenize  # Imported on first use; nltk is slow to import
     sentences = sent_tokenize(text)
     sentences_with_entity1 = [s for s in sentences if re.search(rf"\b{re.escape(entity1)}\b", s, re.IGNORECASE)]
     sentences_with_entity2 = [s for s in sentences if re.search(rf"\b{re.escape(entity2)}\b", s, re.IGNORECASE)]
@@ -68,6 +81,7 @@ def extract_relevant_sentences(text, entity1, entity2):
 
 
 # Extract Relationship Using Local Model (No Batch Processing)
+@timed
 def extract_relationship(entity1, entity2, text):
     """
     Uses a local Hugging Face model to extract relationships for a single entity pair.
@@ -129,6 +143,9 @@ def extract_relationship(entity1, entity2, text):
         ### Expected JSON Output(Summarize within 300 tokens and your output should only include the JSON OUTPUT):
         """
 
+        import torch
+        model, tokenizer = get_model("relationship_llm")
+
         # Tokenize and run inference
         inputs = tokenizer(formatted_prompt, return_tensors="pt").to(model.device)
         # Generate output
@@ -141,21 +158,26 @@ def extract_relationship(entity1, entity2, text):
                     # repetition_penalty=1.2,  # ✅ Prevent repeating phrases
                     pad_token_id=tokenizer.eos_token_id    )
 
+        count("extract_relationships", "tokens_in", inputs["input_ids"].shape[1])
+        count("extract_relationships", "tokens_out", output.shape[1] - inputs["input_ids"].shape[1])
+
         # Decode output
         response_text = tokenizer.decode(output[0], skip_special_tokens=True)
-        print(response_text)
+        log.debug("%s", response_text)
         # Extract JSON response
         json_match = re.search(r"\{.*?\}", response_text, re.DOTALL)
         if json_match:
             parsed_result = json.loads(json_match.group())
             if "Relevant Context" in parsed_result:
                 parsed_result["Relevant Context"] = clean_relevant_context(parsed_result["Relevant Context"])
-            print(parsed_result)
+            log.debug("%s", parsed_result)
             return parsed_result
 
     except Exception as e:
+        count("extract_relationships", "errors")
         return {"Entity 1": entity1, "Entity 2": entity2, "Error": str(e)}
 
+    count("extract_relationships", "errors")
     return {}
 
 
@@ -194,37 +216,59 @@ def finalize_json(output_path):
 
 # Main Execution
 if __name__ == "__main__":
+    log.info("🔄 Loading Model...")
+    try:
+        warm_up("relationship_llm")
+        log.info("✅ Model loaded successfully!")
+    except Exception as e:
+        log.error("❌ Model loading failed: %s", e)
+        exit()
+
     initialize_json(output_file)
 
     with open(input_json_file, "r", encoding="utf-8") as f:
         entities = json.load(f)
 
+    # Near-copies of a document share its entities and text, so their pairs are only sent once
+    duplicates = duplicate_of(load_duplicate_clusters())
+    # Pairs the triage model scores below its threshold are not worth an LLM call (see pair_triage.py)
+    triage = load_triage_model()
+    entity_info = entity_info_from(entities)
     grouped_entities = defaultdict(list)
     for entity in entities:
+        if entity["filename"] in duplicates:
+            continue
         grouped_entities[entity["filename"]].append(entity["text"])
 
     first_result = True
-    for filename, entity_list in tqdm(grouped_entities.items(), desc="Processing files"):
-        file_path = os.path.join(news_dir, filename) if filename.startswith("news_row") else os.path.join(wikileaks_dir, filename)
-
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        except FileNotFoundError:
-            print(f"File not found: {file_path}")
-            continue
+    with stage("extract_relationships"):
+        for filename, entity_list in tqdm(grouped_entities.items(), desc="Processing files"):
+            file_path = os.path.join(news_dir, filename) if filename.startswith("news_row") else os.path.join(wikileaks_dir, filename)
+
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                log.warning("File not found: %s", file_path)
+                continue
 
-        entity_pairs = [(e1, e2) for i, e1 in enumerate(entity_list) for e2 in entity_list[i + 1:] if e1 != e2]
+            entity_pairs = [(e1, e2) for i, e1 in enumerate(entity_list) for e2 in entity_list[i + 1:] if e1 != e2]
 
-        for entity1, entity2 in entity_pairs:
-            relevant_text = extract_relevant_sentences(text, entity1, entity2)
+            for entity1, entity2 in entity_pairs:
+                relevant_text = extract_relevant_sentences(text, entity1, entity2)
 
-            if not relevant_text.strip():
-                continue
+                if not relevant_text.strip():
+                    continue
+
+                if not worth_extracting(triage, entity1, entity2, relevant_text, entity_info):
+                    count("extract_relationships", "triage_skipped")
+                    continue
 
-            result = extract_relationship(entity1, entity2, relevant_text)
-            append_to_json(result, output_file, first_result)
-            first_result = False
+                result = extract_relationship(entity1, entity2, relevant_text)
+                append_to_json(result, output_file, first_result)
+                first_result = False
+                count("extract_relationships", "items")
 
     finalize_json(output_file)
-    print(f"Results saved progressively to {output_file}.")
\ No newline at end of file
+    log.info("Results saved progressively to %s.", output_file)
+    export_metrics("extract_relationships_local")
\ No newline at end of file
@@ -0,0 +1,130 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from instrumentation import count
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GAZETTEER_FILE = os.path.join(BASE_DIR, "gazetteer.csv")
+GEOCODE_CACHE_FILE = os.path.join(BASE_DIR, "..", "processed_data", "geocode_cache.json")
+
+
+def normalize_location(text):
+    """Lowercase, strip accents and punctuation, and collapse spaces ("U.S." -> "u s", "Türkiye" -> "turkiye")."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def gazetteer_signature(path=GAZETTEER_FILE):
+    """Hash of the gazetteer file, so cached results are dropped when it is edited."""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_gazetteer(path=GAZETTEER_FILE):
+    """
+    Load the bundled gazetteer (countries, their common aliases, and the cities and regions that
+    appear in the extracted relationships).
+
+    Returns:
+        dict: normalized name -> (latitude, longitude, ISO3 country code or None, canonical name).
+        A row is its own canonical name unless its alias_of column names another row ("UK" -> "United
+        Kingdom"); distinct places that happen to share coordinates keep their own names.
+    """
+    gazetteer = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            coords = (float(row["lat"]), float(row["lon"]), row["iso3"] or None)
+            gazetteer[normalize_location(row["name"])] = coords + (row.get("alias_of") or row["name"],)
+    return gazetteer
+
+
+def scan_names(normalized, gazetteer, max_words=4):
+    """
+    Find gazetteer names inside a longer location string ("National University Heart Centre Singapore").
+    Longer names win, then the earliest one.
+    """
+    words = normalized.split()
+    for size in range(min(max_words, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            match = gazetteer.get(" ".join(words[start:start + size]))
+            if match:
+                return match
+    return None
+
+
+def geocode(location, gazetteer):
+    """
+    Resolve a free-text "Origin Location" to a gazetteer place.
+    Tries the whole string, then without parenthesised notes, then each comma-separated part from the
+    most specific ("Kiel, Germany" -> Kiel), then any place name contained in the text.
+
+    Returns:
+        tuple: (latitude, longitude, ISO3, canonical name), or None if nothing matches.
+    """
+    if not location:
+        return None
+    without_notes = re.sub(r"\([^)]*\)", " ", location)
+    candidates = [location, without_notes] + without_notes.split(",")
+    for candidate in candidates:
+        match = gazetteer.get(normalize_location(candidate))
+        if match:
+            return match
+    for candidate in candidates[1:]:
+        match = scan_names(normalize_location(candidate), gazetteer)
+        if match:
+            return match
+    return None
+
+
+def geocode_locations(locations, gazetteer_path=GAZETTEER_FILE, cache_path=GEOCODE_CACHE_FILE):
+    """
+    Geocode a collection of location strings offline, reusing the persistent cache
+    (location -> [lat, lon, ISO3, name] or null) and saving any new results to it.
+
+    Returns:
+        dict: location -> (latitude, longitude, ISO3, canonical name) or None.
+    """
+    signature = gazetteer_signature(gazetteer_path)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("gazetteer") == signature:
+            cache = cached["locations"]
+
+    missing = [location for location in set(locations) if location not in cache]
+    count("geocode", "cache_hits", len(set(locations)) - len(missing))
+    count("geocode", "cache_misses", len(missing))
+    if missing:
+        gazetteer = load_gazetteer(gazetteer_path)
+        for location in missing:
+            match = geocode(location, gazetteer)
+            cache[location] = list(match) if match else None
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"gazetteer": signature, "locations": cache}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+
+    return {location: tuple(cache[location]) if cache[location] else None for location in locations}
+
+
+if __name__ == "__main__":
+    from collections import Counter
+    from relationship_store import open_store, all_relationships
+    from instrumentation import stage, export_metrics
+
+    mentions = Counter(
+        record[key] for record in all_relationships(open_store())
+        for key in ("Origin Location 1", "Origin Location 2") if record[key]
+    )
+    with stage("geocode"):
+        results = geocode_locations(mentions)
+        count("geocode", "items", len(mentions))
+    resolved = sum(count for location, count in mentions.items() if results[location])
+    print(f"Resolved {sum(1 for r in results.values() if r)} of {len(results)} distinct locations "
+          f"({resolved} of {sum(mentions.values())} mentions).")
+    export_metrics("geocode")
@@ -0,0 +1,224 @@
+import json
+import os
+from collections import deque
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from relationship_store import BASE_DIR, open_store, all_relationships, store_version
+from graph_model import aggregate_relationships
+from graph_layout import build_adjacency
+
+ANALYTICS_FILE = os.path.join(BASE_DIR, "..", "processed_data", "graph_analytics.json")
+
+PAGERANK_DAMPING = 0.85
+BETWEENNESS_EXACT_LIMIT = 5000  # Above this many nodes, betweenness is estimated from sampled sources
+BETWEENNESS_SAMPLES = 1000
+LOUVAIN_RESOLUTION = 1.0
+
+
+def pagerank(adjacency, damping=PAGERANK_DAMPING, tol=1e-10, max_iter=200):
+    """Weighted PageRank by power iteration on the sparse adjacency matrix."""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inv_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    transition = sp.diags(inv_out) @ adjacency
+    transition_t = transition.T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new_rank = damping * (transition_t @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(new_rank - rank).sum() < tol:
+            return new_rank
+        rank = new_rank
+    return rank
+
+
+def betweenness(adjacency, samples=None, seed=42):
+    """
+    Unweighted betweenness centrality (Brandes), normalized like networkx for undirected graphs.
+    If samples is given, only that many random source nodes are used and the result is extrapolated.
+    """
+    n = adjacency.shape[0]
+    indptr, indices = adjacency.indptr, adjacency.indices
+    centrality = np.zeros(n)
+    sources = range(n)
+    if samples is not None and samples < n:
+        sources = np.random.default_rng(seed).choice(n, size=samples, replace=False)
+
+    for s in sources:
+        stack = []
+        predecessors = {s: []}
+        sigma = {s: 1.0}
+        distance = {s: 0}
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            stack.append(v)
+            for w in indices[indptr[v]:indptr[v + 1]]:
+                if w not in distance:
+                    distance[w] = distance[v] + 1
+                    sigma[w] = 0.0
+                    predecessors[w] = []
+                    queue.append(w)
+                if distance[w] == distance[v] + 1:
+                    sigma[w] += sigma[v]
+                    predecessors[w].append(v)
+        delta = dict.fromkeys(stack, 0.0)
+        while stack:
+            w = stack.pop()
+            for v in predecessors[w]:
+                delta[v] += sigma[v] / sigma[w] * (1 + delta[w])
+            if w != s:
+                centrality[w] += delta[w]
+
+    if n > 2:
+        centrality /= (n - 1) * (n - 2)
+        if samples is not None and samples < n:
+            centrality *= n / samples
+    return centrality
+
+
+def louvain_level(graph, total_weight, resolution, rng):
+    """One Louvain pass: greedily move nodes to the neighbouring community with the best modularity gain."""
+    n = graph.shape[0]
+    indptr, indices, data = graph.indptr, graph.indices, graph.data
+    degrees = np.asarray(graph.sum(axis=1)).ravel()
+    community = np.arange(n)
+    totals = degrees.copy()
+    improved = False
+    moved = True
+    order = rng.permutation(n)
+    while moved:
+        moved = False
+        for i in order:
+            current = community[i]
+            k_i = degrees[i]
+            links = {}
+            for p in range(indptr[i], indptr[i + 1]):
+                j = indices[p]
+                if j != i:
+                    links[community[j]] = links.get(community[j], 0.0) + data[p]
+            totals[current] -= k_i
+            best = current
+            best_gain = links.get(current, 0.0) - resolution * totals[current] * k_i / total_weight
+            for c, weight in links.items():
+                gain = weight - resolution * totals[c] * k_i / total_weight
+                if gain > best_gain:
+                    best, best_gain = c, gain
+            totals[best] += k_i
+            if best != current:
+                community[i] = best
+                moved = True
+                improved = True
+    return community, improved
+
+
+def louvain_communities(adjacency, resolution=LOUVAIN_RESOLUTION, seed=42, max_levels=10):
+    """
+    Louvain community detection on a symmetric sparse adjacency matrix.
+    Each level's communities are collapsed into single nodes (C^T A C) before the next pass.
+    Returns an array with the community id of every node, numbered from 0.
+    """
+    n = adjacency.shape[0]
+    membership = np.arange(n)
+    total_weight = adjacency.sum()
+    if total_weight == 0:
+        return membership
+    rng = np.random.default_rng(seed)
+    graph = adjacency.tocsr()
+    for _ in range(max_levels):
+        community, improved = louvain_level(graph, total_weight, resolution, rng)
+        if not improved:
+            break
+        _, community = np.unique(community, return_inverse=True)
+        membership = community[membership]
+        indicator = sp.csr_matrix(
+            (np.ones(len(community)), (np.arange(len(community)), community)),
+            shape=(len(community), community.max() + 1)
+        )
+        graph = (indicator.T @ graph @ indicator).tocsr()
+    return membership
+
+
+def modularity(adjacency, membership, resolution=LOUVAIN_RESOLUTION):
+    """Newman modularity of a partition, computed with sparse matrices."""
+    total_weight = adjacency.sum()
+    if total_weight == 0:
+        return 0.0
+    indicator = sp.csr_matrix(
+        (np.ones(len(membership)), (np.arange(len(membership)), membership)),
+        shape=(len(membership), membership.max() + 1)
+    )
+    internal = (indicator.T @ adjacency @ indicator).diagonal().sum()
+    community_degree = indicator.T @ np.asarray(adjacency.sum(axis=1)).ravel()
+    return float(internal / total_weight - resolution * ((community_degree / total_weight) ** 2).sum())
+
+
+def compute_analytics(nodes, edges):
+    """
+    Compute structural metrics for the aggregated relationship graph.
+
+    Args:
+        nodes (list): Nodes from graph_model.aggregate_relationships.
+        edges (list): Edges from graph_model.aggregate_relationships (weighted by relationship count).
+    Returns:
+        dict: Per-node columns (labels, degree, weighted_degree, pagerank, betweenness, component,
+        community) in node id order, plus graph-level counts and modularity.
+    """
+    n = len(nodes)
+    weighted = build_adjacency(n, [(e["from"], e["to"]) for e in edges], [e["count"] for e in edges])
+    unweighted = weighted.copy()
+    unweighted.data[:] = 1.0
+
+    component_count, components = connected_components(unweighted, directed=False)
+    samples = BETWEENNESS_SAMPLES if n > BETWEENNESS_EXACT_LIMIT else None
+    communities = louvain_communities(weighted)
+
+    return {
+        "labels": [node["label"] for node in nodes],
+        "degree": np.asarray(unweighted.sum(axis=1)).ravel().astype(int).tolist(),
+        "weighted_degree": np.asarray(weighted.sum(axis=1)).ravel().astype(int).tolist(),
+        "pagerank": pagerank(weighted).tolist(),
+        "betweenness": betweenness(unweighted, samples).tolist(),
+        "betweenness_sampled": samples is not None,
+        "component": components.tolist(),
+        "community": communities.tolist(),
+        "component_count": int(component_count),
+        "community_count": int(communities.max() + 1) if n else 0,
+        "modularity": modularity(weighted, communities),
+    }
+
+
+def load_analytics(conn=None, path=ANALYTICS_FILE):
+    """
+    Return the graph analytics for the current relationship store, from the disk cache when it was
+    computed from the same store version, otherwise recomputing and caching them.
+    """
+    conn = conn or open_store()
+    version = store_version(conn)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == version:
+            return cached
+
+    print("Computing graph analytics...")
+    nodes, edges = aggregate_relationships(all_relationships(conn))
+    analytics = compute_analytics(nodes, edges)
+    analytics["version"] = version
+    # Written next to the cache and swapped in, so a reader never loads a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(analytics, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"Graph analytics saved to: {path}")
+    return analytics
+
+
+if __name__ == "__main__":
+    result = load_analytics()
+    print(f"{len(result['labels'])} entities, {result['component_count']} components, "
+          f"{result['community_count']} communities (modularity {result['modularity']:.3f})")
@@ -0,0 +1,226 @@
+import os
+from relationship_store import all_relationships, store_version
+from graph_layout import compute_layout
+from graph_model import aggregate_relationships
+from graph_analytics import load_analytics, ANALYTICS_FILE
+from graph_incremental import intern, write_json
+
+# Level-of-detail groups: the LOD_MAX_CLUSTERS largest communities get their own super-node and the
+# remaining small communities are dealt round-robin into LOD_OVERFLOW_BINS shared super-nodes, so the
+# coarse graph never has more than LOD_MAX_CLUSTERS + LOD_OVERFLOW_BINS nodes
+LOD_MAX_CLUSTERS = 200
+LOD_OVERFLOW_BINS = 50
+
+
+def write_graph_data(conn, output_dir, analytics_path=ANALYTICS_FILE):
+    """
+    Build every graph_data file for entity_relationship_graph.html from the relationships in the store,
+    replacing what is in output_dir. graph_incremental.update_graph_data patches the same files in place.
+
+    Args:
+        conn: Connection returned by open_store.
+        output_dir (str): The graph_data folder (created if needed).
+        analytics_path (str): Cache file of the graph analytics (see graph_analytics.load_analytics).
+    Returns:
+        dict: Number of relationships, nodes, edges, edge shards and clusters written.
+    """
+    data = all_relationships(conn)
+
+    # Collapse the records into one node per entity and one weighted edge per entity pair,
+    # with threat level / type / location aggregated over all of their relationships
+    graph_nodes, graph_edges = aggregate_relationships(data)
+
+    # Precompute node coordinates so the page can render with physics disabled
+    print("Computing graph layout...")
+    positions = compute_layout(
+        len(graph_nodes),
+        [(edge["from"], edge["to"]) for edge in graph_edges],
+        weights=[edge["count"] for edge in graph_edges]
+    )
+    for node, (x, y) in zip(graph_nodes, positions):
+        node["x"] = int(round(x))
+        node["y"] = int(round(y))
+
+    # Attach the cached graph analytics (PageRank, betweenness, community) to every node
+    analytics = load_analytics(conn, analytics_path)
+    analytics_index = {label: i for i, label in enumerate(analytics["labels"])}
+    for node in graph_nodes:
+        i = analytics_index[node["label"]]
+        node["pagerank"] = analytics["pagerank"][i]
+        node["betweenness"] = analytics["betweenness"][i]
+        node["community"] = analytics["community"][i]
+
+    # Save nodes and edges in the compact, sharded format read by entity_relationship_graph.html:
+    #   graph_data/nodes.json      node columns indexed by integer node id, plus a shared string table
+    #                              for threat types and locations, and the edge count of every shard
+    #   graph_data/edges_<N>.json  columns of the pair edges whose highest threat level is N (id, from, to,
+    #                              title, count, mean level, type histogram as [string id, count]), fetched on demand
+    #   graph_data/adjacency.json  adjacency list in CSR form (offsets/neighbors/edges per node id) and the
+    #                              threat level of every edge id, so lookups on the page cost O(degree)
+    #   graph_data/clusters.json   level-of-detail view: one super-node per community plus super-edges
+    #   graph_data/cluster_<K>.json  members and incident edges of super-node K, fetched when it is expanded
+    # nodes.json also records the store version it was built from, so that "--delta" runs
+    # (graph_incremental.update_graph_data) can patch these files instead of regenerating them
+
+    os.makedirs(output_dir, exist_ok=True)
+    strings = []
+    string_ids = {}
+    node_columns = {
+        "label": [node["label"] for node in graph_nodes],
+        "x": [node["x"] for node in graph_nodes],
+        "y": [node["y"] for node in graph_nodes],
+        "threat_level": [node["threat_level"] for node in graph_nodes],
+        "mean_threat_level": [round(node["mean_threat_level"], 2) for node in graph_nodes],
+        "relationship_count": [node["relationship_count"] for node in graph_nodes],
+        "pagerank": [float(f'{node["pagerank"]:.4g}') for node in graph_nodes],
+        "betweenness": [float(f'{node["betweenness"]:.4g}') for node in graph_nodes],
+        "community": [node["community"] for node in graph_nodes],
+        "threat_type": [intern(strings, string_ids, node["threat_type"]) for node in graph_nodes],
+        "location": [intern(strings, string_ids, node["location"]) for node in graph_nodes],
+    }
+
+    shards = {}
+    for edge_id, edge in enumerate(graph_edges):
+        shard = shards.setdefault(edge["max_level"], {
+            "id": [], "from": [], "to": [], "title": [], "count": [], "mean_level": [], "types": []
+        })
+        shard["id"].append(edge_id)
+        shard["from"].append(edge["from"])
+        shard["to"].append(edge["to"])
+        shard["title"].append(edge["title"])
+        shard["count"].append(edge["count"])
+        shard["mean_level"].append(round(edge["mean_level"], 2))
+        shard["types"].append([[intern(strings, string_ids, t), n] for t, n in edge["types"].items()])
+
+    # Adjacency list in CSR form: the neighbours of node i are neighbors[offsets[i]:offsets[i + 1]],
+    # reached through the edge ids at the same positions in "edges" (in edge id order)
+    incident = [[] for _ in graph_nodes]
+    for edge_id, edge in enumerate(graph_edges):
+        source, target = edge["from"], edge["to"]
+        incident[source].append((target, edge_id))
+        if target != source:
+            incident[target].append((source, edge_id))
+    offsets = [0]
+    neighbors = []
+    neighbor_edges = []
+    for entries in incident:
+        for neighbor, edge_id in entries:
+            neighbors.append(neighbor)
+            neighbor_edges.append(edge_id)
+        offsets.append(len(neighbors))
+
+    # Level-of-detail groups (see LOD_MAX_CLUSTERS)
+    communities = {}
+    for node_id, node in enumerate(graph_nodes):
+        communities.setdefault(node["community"], []).append(node_id)
+    ranked_communities = sorted(
+        communities.values(),
+        key=lambda members: (len(members), sum(graph_nodes[m]["pagerank"] for m in members)),
+        reverse=True
+    )
+    groups = ranked_communities[:LOD_MAX_CLUSTERS]
+    group_labels = []
+    for members in groups:
+        top = max(members, key=lambda m: graph_nodes[m]["pagerank"])
+        group_labels.append(f'{graph_nodes[top]["label"]} (+{len(members) - 1})')
+    overflow = ranked_communities[LOD_MAX_CLUSTERS:]
+    if overflow:
+        bins = [[] for _ in range(min(LOD_OVERFLOW_BINS, len(overflow)))]
+        bin_counts = [0] * len(bins)
+        for i, members in enumerate(overflow):
+            bins[i % len(bins)].extend(members)
+            bin_counts[i % len(bins)] += 1
+        groups += bins
+        group_labels += [f'{count} small clusters ({len(members)} entities)' for members, count in zip(bins, bin_counts)]
+
+    node_group = [0] * len(graph_nodes)
+    for group_id, members in enumerate(groups):
+        for m in members:
+            node_group[m] = group_id
+    node_columns["cluster"] = node_group
+
+    super_edges = {}
+    group_edges = [[] for _ in groups]
+    for edge_id, edge in enumerate(graph_edges):
+        a, b = node_group[edge["from"]], node_group[edge["to"]]
+        group_edges[a].append(edge_id)
+        if a != b:
+            group_edges[b].append(edge_id)
+            key = (min(a, b), max(a, b))
+            count, level = super_edges.get(key, (0, 0))
+            super_edges[key] = (count + edge["count"], max(level, edge["max_level"]))
+
+    cluster_view = {
+        "total_nodes": len(graph_nodes),
+        "total_edges": len(graph_edges),
+        "clusters": {
+            "label": group_labels,
+            "size": [len(members) for members in groups],
+            "x": [int(round(sum(graph_nodes[m]["x"] for m in members) / len(members))) for members in groups],
+            "y": [int(round(sum(graph_nodes[m]["y"] for m in members) / len(members))) for members in groups],
+            "threat_level": [max(graph_nodes[m]["threat_level"] for m in members) for members in groups],
+        },
+        "edges": {
+            "from": [a for a, _ in super_edges],
+            "to": [b for _, b in super_edges],
+            "count": [count for count, _ in super_edges.values()],
+            "max_level": [level for _, level in super_edges.values()],
+        },
+    }
+
+    def cluster_shard(group_id):
+        """Members of a super-node and every edge touching them, with the group of each endpoint."""
+        members = groups[group_id]
+        edge_ids = group_edges[group_id]
+        return {
+            "nodes": {
+                "id": members,
+                "label": [graph_nodes[m]["label"] for m in members],
+                "x": [graph_nodes[m]["x"] for m in members],
+                "y": [graph_nodes[m]["y"] for m in members],
+                "threat_level": [graph_nodes[m]["threat_level"] for m in members],
+                "threat_type": [graph_nodes[m]["threat_type"] for m in members],
+                "location": [graph_nodes[m]["location"] for m in members],
+                "pagerank": [float(f'{graph_nodes[m]["pagerank"]:.4g}') for m in members],
+            },
+            "edges": {
+                "id": edge_ids,
+                "from": [graph_edges[e]["from"] for e in edge_ids],
+                "to": [graph_edges[e]["to"] for e in edge_ids],
+                "from_group": [node_group[graph_edges[e]["from"]] for e in edge_ids],
+                "to_group": [node_group[graph_edges[e]["to"]] for e in edge_ids],
+                "title": [graph_edges[e]["title"] for e in edge_ids],
+                "count": [graph_edges[e]["count"] for e in edge_ids],
+                "max_level": [graph_edges[e]["max_level"] for e in edge_ids],
+            },
+        }
+
+    # Remove shards for threat levels and clusters that no longer exist
+    for name in os.listdir(output_dir):
+        if name.startswith(('edges_', 'cluster_')) and name.endswith('.json'):
+            os.remove(os.path.join(output_dir, name))
+    for group_id in range(len(groups)):
+        write_json(os.path.join(output_dir, f'cluster_{group_id}.json'), cluster_shard(group_id))
+    write_json(os.path.join(output_dir, 'clusters.json'), cluster_view)
+    for level, shard in shards.items():
+        write_json(os.path.join(output_dir, f'edges_{level}.json'), shard)
+    write_json(os.path.join(output_dir, 'adjacency.json'), {
+        "offsets": offsets,
+        "neighbors": neighbors,
+        "edges": neighbor_edges,
+        "edge_levels": [edge["max_level"] for edge in graph_edges],
+    })
+    write_json(os.path.join(output_dir, 'nodes.json'), {
+        "version": store_version(conn),
+        "strings": strings,
+        "nodes": node_columns,
+        "shards": {str(level): len(shard["id"]) for level, shard in sorted(shards.items())},
+    })
+
+    return {
+        "relationships": len(data),
+        "nodes": len(graph_nodes),
+        "edges": len(graph_edges),
+        "shards": len(shards),
+        "clusters": len(groups),
+    }
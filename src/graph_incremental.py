@@ -0,0 +1,315 @@
+import json
+import math
+import os
+import re
+from collections import Counter, deque
+from graph_model import aggregate_relationships
+from graph_layout import NODE_SPACING
+from relationship_store import relationships_for_entities, store_version
+
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))  # Spreads new nodes around their neighbours without overlaps
+
+
+def intern(strings, string_ids, value):
+    """Return the string table index for a value (-1 for missing values), adding it if needed."""
+    if value is None:
+        return -1
+    if value not in string_ids:
+        string_ids[value] = len(strings)
+        strings.append(value)
+    return string_ids[value]
+
+
+def write_json(path, payload):
+    """
+    Write JSON without whitespace to keep the files small. The file is written next to its target and
+    swapped in, so a graph page fetching it while a delta is applied never reads a half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def place_new_nodes(new_ids, columns, adjacency_lists):
+    """
+    Give new nodes coordinates without moving the existing ones: a node next to already placed nodes
+    goes near their centre, and a component made only of new nodes starts to the right of the graph.
+    Community and cluster are taken from the most common among placed neighbours in the same pass.
+    """
+    xs, ys = columns["x"], columns["y"]
+    placed = set(range(len(xs))) - set(new_ids)
+    next_community = max(columns["community"], default=-1) + 1
+    group_sizes = Counter(columns["cluster"])
+    right = max(xs, default=0) + 4 * NODE_SPACING
+    top = min(ys, default=0)
+
+    def settle(node_id, anchors):
+        centre_x = sum(xs[a] for a in anchors) / len(anchors)
+        centre_y = sum(ys[a] for a in anchors) / len(anchors)
+        angle = node_id * GOLDEN_ANGLE
+        xs[node_id] = int(round(centre_x + NODE_SPACING * math.cos(angle)))
+        ys[node_id] = int(round(centre_y + NODE_SPACING * math.sin(angle)))
+        columns["community"][node_id] = Counter(columns["community"][a] for a in anchors).most_common(1)[0][0]
+        columns["cluster"][node_id] = Counter(columns["cluster"][a] for a in anchors).most_common(1)[0][0]
+        group_sizes[columns["cluster"][node_id]] += 1
+        placed.add(node_id)
+
+    pending = sorted(new_ids)
+    while pending:
+        # Breadth-first from the already placed part of the graph
+        queue = deque(n for n in pending if any(m in placed for m, _ in adjacency_lists[n]))
+        if not queue:
+            # Only new nodes left: seed a fresh component in its own community, in the smallest cluster
+            seed = pending[0]
+            xs[seed], ys[seed] = int(round(right)), int(round(top))
+            top += 4 * NODE_SPACING
+            columns["community"][seed] = next_community
+            next_community += 1
+            columns["cluster"][seed] = min(group_sizes, key=lambda g: (group_sizes[g], g)) if group_sizes else 0
+            group_sizes[columns["cluster"][seed]] += 1
+            placed.add(seed)
+            queue = deque(m for m, _ in adjacency_lists[seed] if m not in placed)
+        while queue:
+            node_id = queue.popleft()
+            if node_id in placed:
+                continue
+            settle(node_id, [m for m, _ in adjacency_lists[node_id] if m in placed])
+            queue.extend(m for m, _ in adjacency_lists[node_id] if m not in placed)
+        pending = [n for n in pending if n not in placed]
+
+
+def relabel_group(label, size):
+    """Update the member count in a cluster label ("Top entity (+N)" or "K small clusters (N entities)")."""
+    label = re.sub(r'\(\+\d+\)$', f'(+{size - 1})', label)
+    return re.sub(r'\(\d+ entities\)$', f'({size} entities)', label)
+
+
+def update_graph_data(conn, affected_pairs, output_dir):
+    """
+    Patch the graph_data files written by nodeGenerator2.0.py after apply_delta changed the relationships
+    of the given entity pairs. Only the entities and pair edges involved are re-aggregated (from their
+    records in the store), and only the edge shards and cluster shards containing them are rewritten,
+    along with nodes.json, adjacency.json and clusters.json.
+
+    Existing node and edge ids and coordinates are kept. New entities are placed next to their
+    neighbours and inherit their community and cluster; PageRank and betweenness of new entities
+    are left at the minimum until the next full rebuild.
+
+    Args:
+        conn: Connection returned by open_store, with the delta already applied.
+        affected_pairs (set): (Entity 1, Entity 2) pairs returned by apply_delta.
+        output_dir (str): The graph_data folder.
+    Returns:
+        list: Names of the files that were rewritten.
+    """
+    path = lambda name: os.path.join(output_dir, name)
+    node_file = read_json(path('nodes.json'))
+    adjacency = read_json(path('adjacency.json'))
+    cluster_view = read_json(path('clusters.json'))
+    strings = node_file["strings"]
+    string_ids = {value: i for i, value in enumerate(strings)}
+    columns = node_file["nodes"]
+    label_to_id = {label: i for i, label in enumerate(columns["label"])}
+
+    # Adjacency lists of every node as [(neighbour, edge id)], from the CSR arrays
+    offsets = adjacency["offsets"]
+    adjacency_lists = [
+        list(zip(adjacency["neighbors"][offsets[i]:offsets[i + 1]], adjacency["edges"][offsets[i]:offsets[i + 1]]))
+        for i in range(len(offsets) - 1)
+    ]
+    edge_levels = adjacency["edge_levels"]
+
+    # Re-aggregate everything incident to the affected entities; their own totals and all of their
+    # pair edges are complete because every one of their records is included
+    affected = {label for entity_pair in affected_pairs for label in entity_pair if label is not None}
+    sub_nodes, sub_edges = aggregate_relationships(relationships_for_entities(conn, affected))
+    sub_labels = [node["label"] for node in sub_nodes]
+
+    new_ids = []
+    for label in sub_labels:
+        if label not in label_to_id:
+            label_to_id[label] = len(columns["label"])
+            new_ids.append(label_to_id[label])
+            for name, values in columns.items():
+                values.append(label if name == "label" else 0)
+            columns["threat_type"][-1] = columns["location"][-1] = -1
+            adjacency_lists.append([])
+    affected_ids = {label_to_id[label] for label in affected if label in label_to_id}
+
+    def pair(a, b):
+        return (min(a, b), max(a, b))
+
+    # Only the pair edges named in the delta can have changed; other edges of the same entities are untouched
+    changed_pairs = {
+        pair(label_to_id[a], label_to_id[b]) for a, b in affected_pairs if a in label_to_id and b in label_to_id
+    }
+    old_edges = {
+        pair(n, m): e for n in affected_ids for m, e in adjacency_lists[n] if pair(n, m) in changed_pairs
+    }
+    new_edges = {}
+    for edge in sub_edges:
+        source, target = label_to_id[sub_labels[edge["from"]]], label_to_id[sub_labels[edge["to"]]]
+        key = pair(source, target)
+        if key in changed_pairs:
+            edge_id = old_edges.get(key)
+            if edge_id is None:
+                edge_id = len(edge_levels)
+                edge_levels.append(None)
+            new_edges[edge_id] = dict(edge, **{"from": source, "to": target})
+    removed = {key: e for key, e in old_edges.items() if e not in new_edges}
+    touched = set(new_edges) | set(removed.values())
+    old_levels = {e: edge_levels[e] for e in touched}
+
+    # Adjacency: new pairs get the highest edge ids, so appending keeps every list in edge id order
+    for edge_id, edge in new_edges.items():
+        if old_levels[edge_id] is None:
+            adjacency_lists[edge["from"]].append((edge["to"], edge_id))
+            if edge["to"] != edge["from"]:
+                adjacency_lists[edge["to"]].append((edge["from"], edge_id))
+        edge_levels[edge_id] = edge["max_level"]
+    for (a, b), edge_id in removed.items():
+        edge_levels[edge_id] = None
+        for node_id in {a, b}:
+            adjacency_lists[node_id] = [(m, e) for m, e in adjacency_lists[node_id] if e != edge_id]
+
+    # Node table: fresh aggregates for affected entities, positions and groups for new ones
+    for node in sub_nodes:
+        node_id = label_to_id[node["label"]]
+        if node_id not in affected_ids:
+            continue
+        columns["threat_level"][node_id] = node["threat_level"]
+        columns["mean_threat_level"][node_id] = round(node["mean_threat_level"], 2)
+        columns["relationship_count"][node_id] = node["relationship_count"]
+        columns["threat_type"][node_id] = intern(strings, string_ids, node["threat_type"])
+        columns["location"][node_id] = intern(strings, string_ids, node["location"])
+    for node_id in affected_ids - {label_to_id[label] for label in sub_labels}:
+        # All of its records were replaced: keep the id but clear the aggregates, as for a new row
+        for name in ("threat_level", "mean_threat_level", "relationship_count"):
+            columns[name][node_id] = 0
+        columns["threat_type"][node_id] = columns["location"][node_id] = -1
+    lowest_pagerank = min((p for i, p in enumerate(columns["pagerank"]) if i not in new_ids), default=0)
+    for node_id in new_ids:
+        columns["pagerank"][node_id] = lowest_pagerank
+        columns["betweenness"][node_id] = 0
+    place_new_nodes(new_ids, columns, adjacency_lists)
+
+    written = []
+
+    # Edge shards: only the threat levels an updated edge left or moved into
+    shard_counts = node_file["shards"]
+    for level in {l for l in old_levels.values() if l is not None} | {e["max_level"] for e in new_edges.values()}:
+        shard = read_json(path(f'edges_{level}.json'), {
+            "id": [], "from": [], "to": [], "title": [], "count": [], "mean_level": [], "types": []
+        })
+        rows = {
+            edge_id: [shard[name][i] for name in shard]
+            for i, edge_id in enumerate(shard["id"]) if edge_id not in touched
+        }
+        for edge_id, edge in new_edges.items():
+            if edge["max_level"] == level:
+                rows[edge_id] = [
+                    edge_id, edge["from"], edge["to"], edge["title"], edge["count"],
+                    round(edge["mean_level"], 2), [[intern(strings, string_ids, t), n] for t, n in edge["types"].items()]
+                ]
+        ordered = [rows[edge_id] for edge_id in sorted(rows)]
+        shard = {name: [row[i] for row in ordered] for i, name in enumerate(shard)}
+        if ordered:
+            write_json(path(f'edges_{level}.json'), shard)
+            shard_counts[str(level)] = len(ordered)
+        else:
+            if os.path.exists(path(f'edges_{level}.json')):
+                os.remove(path(f'edges_{level}.json'))
+            shard_counts.pop(str(level), None)
+        written.append(f'edges_{level}.json')
+    node_file["shards"] = {level: shard_counts[level] for level in sorted(shard_counts, key=int)}
+
+    # Cluster shards of every cluster holding an affected entity or an endpoint of an updated edge
+    group_of = columns["cluster"]
+    endpoints = affected_ids | set(new_ids) | {n for edge in new_edges.values() for n in (edge["from"], edge["to"])}
+    clusters = cluster_view["clusters"]
+    for group in sorted({group_of[n] for n in endpoints}):
+        # A missing shard (e.g. deleted by hand) is recreated with every entity of the cluster and
+        # the updated edges; its other edges come back with the next full rebuild
+        shard = read_json(path(f'cluster_{group}.json'), {
+            "nodes": {"id": [n for n, g in enumerate(group_of) if g == group]},
+            "edges": {name: [] for name in ("id", "from", "to", "from_group", "to_group", "title", "count", "max_level")},
+        })
+        members = sorted(set(shard["nodes"]["id"]) | {n for n in new_ids if group_of[n] == group})
+        shard["nodes"] = {
+            "id": members,
+            "label": [columns["label"][m] for m in members],
+            "x": [columns["x"][m] for m in members],
+            "y": [columns["y"][m] for m in members],
+            "threat_level": [columns["threat_level"][m] for m in members],
+            "threat_type": [strings[columns["threat_type"][m]] if columns["threat_type"][m] >= 0 else None for m in members],
+            "location": [strings[columns["location"][m]] if columns["location"][m] >= 0 else None for m in members],
+            "pagerank": [columns["pagerank"][m] for m in members],
+        }
+        edge_names = list(shard["edges"])
+        rows = {
+            edge_id: [shard["edges"][name][i] for name in edge_names]
+            for i, edge_id in enumerate(shard["edges"]["id"]) if edge_id not in touched
+        }
+        member_set = set(members)
+        for edge_id, edge in new_edges.items():
+            if edge["from"] in member_set or edge["to"] in member_set:
+                rows[edge_id] = [
+                    edge_id, edge["from"], edge["to"], group_of[edge["from"]], group_of[edge["to"]],
+                    edge["title"], edge["count"], edge["max_level"]
+                ]
+        ordered = [rows[edge_id] for edge_id in sorted(rows)]
+        shard["edges"] = {name: [row[i] for row in ordered] for i, name in enumerate(edge_names)}
+        write_json(path(f'cluster_{group}.json'), shard)
+        written.append(f'cluster_{group}.json')
+
+        size = len(members)
+        clusters["label"][group] = relabel_group(clusters["label"][group], size)
+        clusters["size"][group] = size
+        clusters["x"][group] = int(round(sum(columns["x"][m] for m in members) / size))
+        clusters["y"][group] = int(round(sum(columns["y"][m] for m in members) / size))
+        clusters["threat_level"][group] = max(columns["threat_level"][m] for m in members)
+
+        # Super-edges touching this cluster are rebuilt from its (complete) list of incident edges
+        super_edges = cluster_view["edges"]
+        kept = [i for i, (a, b) in enumerate(zip(super_edges["from"], super_edges["to"])) if group not in (a, b)]
+        rebuilt = {}
+        for row in ordered:
+            a, b = row[3], row[4]
+            if a != b:
+                key = pair(a, b)
+                count, level = rebuilt.get(key, (0, 0))
+                rebuilt[key] = (count + row[6], max(level, row[7]))
+        cluster_view["edges"] = {
+            "from": [super_edges["from"][i] for i in kept] + [a for a, _ in rebuilt],
+            "to": [super_edges["to"][i] for i in kept] + [b for _, b in rebuilt],
+            "count": [super_edges["count"][i] for i in kept] + [count for count, _ in rebuilt.values()],
+            "max_level": [super_edges["max_level"][i] for i in kept] + [level for _, level in rebuilt.values()],
+        }
+
+    cluster_view["total_nodes"] = len(columns["label"])
+    cluster_view["total_edges"] = sum(level is not None for level in edge_levels)
+    write_json(path('clusters.json'), cluster_view)
+
+    flat = [entry for entries in adjacency_lists for entry in entries]
+    offsets = [0]
+    for entries in adjacency_lists:
+        offsets.append(offsets[-1] + len(entries))
+    write_json(path('adjacency.json'), {
+        "offsets": offsets,
+        "neighbors": [m for m, _ in flat],
+        "edges": [e for _, e in flat],
+        "edge_levels": edge_levels,
+    })
+
+    node_file["version"] = store_version(conn)
+    write_json(path('nodes.json'), node_file)
+    written += ['clusters.json', 'adjacency.json', 'nodes.json']
+    return written
@@ -0,0 +1,208 @@
+import os
+from collections import deque
+import numpy as np
+from graph_model import aggregate_relationships
+from graph_incremental import read_json
+from graph_layout import compute_layout
+
+EGO_MAX_HOPS = 3
+EGO_MAX_NODES = 200  # Default cap on the size of a returned neighbourhood
+EGO_NODE_LIMIT = 1000  # Hard cap, whatever the client asks for
+
+
+def load_graph_ids(graph_dir, version):
+    """
+    Read the node and edge ids written to graph_data by nodeGenerator2.0.py, if the files were built
+    from (or patched up to) the given store version. A "--delta" run keeps existing ids and appends new
+    ones, so after a delta they no longer follow the order of a fresh aggregate_relationships.
+
+    Returns:
+        dict: "labels" (entity name of every node id) and "edges" ((low, high) node id pair -> edge id),
+        or None if graph_data is missing or was built from another version of the store.
+    """
+    node_file = read_json(os.path.join(graph_dir, 'nodes.json'), {})
+    adjacency = read_json(os.path.join(graph_dir, 'adjacency.json'))
+    if node_file.get("version") != version or adjacency is None:
+        return None
+    offsets = adjacency["offsets"]
+    edge_ids = {}
+    for node_id in range(len(offsets) - 1):
+        for i in range(offsets[node_id], offsets[node_id + 1]):
+            neighbor = adjacency["neighbors"][i]
+            edge_ids[(min(node_id, neighbor), max(node_id, neighbor))] = adjacency["edges"][i]
+    return {"labels": node_file["nodes"]["label"], "edges": edge_ids}
+
+
+def renumber(nodes, edges, graph_ids):
+    """
+    Move aggregated nodes and edges to the ids of graph_ids. Ids with nothing behind them (entities
+    left without records, removed edges) hold None; anything graph_ids does not know gets a fresh id.
+    """
+    label_to_id = {label: node_id for node_id, label in enumerate(graph_ids["labels"])}
+    for node in nodes:
+        label_to_id.setdefault(node["label"], len(label_to_id))
+    node_ids = [label_to_id[node["label"]] for node in nodes]
+    placed_nodes = [None] * len(label_to_id)
+    for node_id, node in zip(node_ids, nodes):
+        placed_nodes[node_id] = node
+
+    edge_ids = dict(graph_ids["edges"])
+    next_edge_id = max(edge_ids.values(), default=-1) + 1
+    placed_edges = {}
+    for edge in edges:
+        source, target = node_ids[edge["from"]], node_ids[edge["to"]]
+        key = (min(source, target), max(source, target))
+        if key not in edge_ids:
+            edge_ids[key] = next_edge_id
+            next_edge_id += 1
+        placed_edges[edge_ids[key]] = dict(edge, **{"from": source, "to": target})
+    return placed_nodes, [placed_edges.get(edge_id) for edge_id in range(next_edge_id)]
+
+
+def build_graph_index(records, graph_ids=None):
+    """
+    Build the in-memory adjacency index used to answer neighbourhood queries.
+    Node and edge ids follow graph_model.aggregate_relationships over the records, which is what a full
+    nodeGenerator2.0.py build writes; pass graph_ids (from load_graph_ids) to use the ids of graph_data
+    instead, so they also agree with the page after "--delta" runs.
+
+    Args:
+        records (list): Relationship records shaped like the cleaned JSON file.
+        graph_ids (dict): Optional node and edge ids from load_graph_ids.
+    Returns:
+        dict: nodes and edges from aggregate_relationships (lists indexed by id, None for unused ids),
+        a label -> node id map, and the adjacency in CSR form (offsets, neighbors, edge ids). Each node's
+        neighbours are ordered by descending edge threat level, so a capped neighbourhood keeps the most
+        threatening relationships.
+    """
+    nodes, edges = aggregate_relationships(records)
+    if graph_ids is not None:
+        nodes, edges = renumber(nodes, edges, graph_ids)
+    incident = [[] for _ in nodes]
+    for edge_id, edge in enumerate(edges):
+        if edge is None:
+            continue
+        source, target = edge["from"], edge["to"]
+        incident[source].append((target, edge_id))
+        if target != source:
+            incident[target].append((source, edge_id))
+
+    offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    neighbors = []
+    edge_ids = []
+    for node_id, entries in enumerate(incident):
+        entries.sort(key=lambda entry: -edges[entry[1]]["max_level"])
+        neighbors.extend(neighbor for neighbor, _ in entries)
+        edge_ids.extend(edge_id for _, edge_id in entries)
+        offsets[node_id + 1] = len(neighbors)
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "label_to_id": {node["label"]: node_id for node_id, node in enumerate(nodes) if node is not None},
+        "offsets": offsets,
+        "neighbors": np.array(neighbors, dtype=np.int64),
+        "edge_ids": np.array(edge_ids, dtype=np.int64),
+    }
+
+
+def edge_matches(edge, min_threat_level=None, max_threat_level=None, threat_type=None):
+    """Whether an aggregated edge passes the threat level range (on its highest level) and type filter."""
+    if min_threat_level is not None and edge["max_level"] < min_threat_level:
+        return False
+    if max_threat_level is not None and edge["max_level"] > max_threat_level:
+        return False
+    if threat_type is not None and threat_type not in edge["types"]:
+        return False
+    return True
+
+
+def ego_network(index, label, hops=1, min_threat_level=None, max_threat_level=None,
+                threat_type=None, max_nodes=EGO_MAX_NODES):
+    """
+    Return the k-hop neighbourhood of an entity as compact, column-oriented JSON-ready data.
+    Only edges passing the threat level / type filters are followed. The breadth-first search
+    stops once max_nodes entities have been collected, and the result is marked as truncated.
+
+    Args:
+        index (dict): Index from build_graph_index.
+        label (str): Entity at the centre of the neighbourhood.
+        hops (int): Number of hops to expand (clamped to 1..EGO_MAX_HOPS).
+        min_threat_level (int): Optional lower bound on an edge's highest threat level.
+        max_threat_level (int): Optional upper bound on an edge's highest threat level.
+        threat_type (str): Optional threat type the edge must include.
+        max_nodes (int): Cap on the number of entities returned (clamped to EGO_NODE_LIMIT).
+    Returns:
+        dict: center, hops, truncated, nodes (id, label, x, y, hop, threat_level, threat_type, location)
+        and edges (id, from, to, title, count, max_level) between the returned entities,
+        or None if the entity is unknown.
+    """
+    center = index["label_to_id"].get(label)
+    if center is None:
+        return None
+    hops = max(1, min(int(hops), EGO_MAX_HOPS))
+    max_nodes = max(1, min(int(max_nodes), EGO_NODE_LIMIT))
+    nodes, edges = index["nodes"], index["edges"]
+    offsets, neighbors, edge_ids = index["offsets"], index["neighbors"], index["edge_ids"]
+
+    def passes(edge_id):
+        return edge_matches(edges[edge_id], min_threat_level, max_threat_level, threat_type)
+
+    hop_of = {center: 0}
+    queue = deque([center])
+    truncated = False
+    while queue and not truncated:
+        node_id = queue.popleft()
+        if hop_of[node_id] == hops:
+            continue
+        for i in range(offsets[node_id], offsets[node_id + 1]):
+            neighbor = int(neighbors[i])
+            if neighbor in hop_of or not passes(edge_ids[i]):
+                continue
+            if len(hop_of) >= max_nodes:
+                truncated = True
+                break
+            hop_of[neighbor] = hop_of[node_id] + 1
+            queue.append(neighbor)
+
+    # Every filtered edge among the collected entities, not just the ones the search walked along
+    members = list(hop_of)
+    local_id = {node_id: i for i, node_id in enumerate(members)}
+    sub_edges = sorted({
+        int(edge_ids[i])
+        for node_id in members
+        for i in range(offsets[node_id], offsets[node_id + 1])
+        if int(neighbors[i]) in local_id and passes(edge_ids[i])
+    })
+
+    positions = compute_layout(
+        len(members),
+        [(local_id[edges[e]["from"]], local_id[edges[e]["to"]]) for e in sub_edges],
+        weights=[edges[e]["count"] for e in sub_edges]
+    )
+    # Centre the layout on the queried entity so the client can merge neighbourhoods around it
+    positions -= positions[0]
+
+    return {
+        "center": center,
+        "hops": hops,
+        "truncated": truncated,
+        "nodes": {
+            "id": members,
+            "label": [nodes[m]["label"] for m in members],
+            "x": [int(round(x)) for x in positions[:, 0]],
+            "y": [int(round(y)) for y in positions[:, 1]],
+            "hop": [hop_of[m] for m in members],
+            "threat_level": [nodes[m]["threat_level"] for m in members],
+            "threat_type": [nodes[m]["threat_type"] for m in members],
+            "location": [nodes[m]["location"] for m in members],
+        },
+        "edges": {
+            "id": sub_edges,
+            "from": [edges[e]["from"] for e in sub_edges],
+            "to": [edges[e]["to"] for e in sub_edges],
+            "title": [edges[e]["title"] for e in sub_edges],
+            "count": [edges[e]["count"] for e in sub_edges],
+            "max_level": [edges[e]["max_level"] for e in sub_edges],
+        },
+    }
@@ -0,0 +1,183 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, laplacian
+from scipy.sparse.linalg import eigsh
+from scipy.spatial import cKDTree
+
+NODE_SPACING = 60  # Roughly the distance (in vis.js pixels) between neighbouring nodes
+ITERATIONS = 60  # Fruchterman-Reingold iterations per component
+REPULSION_CHUNK = 1024  # Rows per block when computing repulsion, to bound memory
+DENSE_EIGEN_LIMIT = 500  # Components up to this size get their spectral start from a dense eigensolver
+# Larger components use approximate repulsion, linear in their size: exact from each node's nearest
+# neighbours, and from the rest of the component through the centroids of a coarse grid
+EXACT_REPULSION_LIMIT = 500
+NEAR_NEIGHBOURS = 16
+FAR_GRID = 16  # Cells per side of the far-field grid
+
+
+def build_adjacency(node_count, edges, weights=None):
+    """
+    Build a symmetric sparse adjacency matrix from (source id, target id) pairs.
+    Repeated pairs and weights add up, so heavily related entities pull closer together.
+    """
+    if not edges:
+        return sp.csr_matrix((node_count, node_count))
+    rows, cols = np.array(edges, dtype=np.int64).T
+    data = np.ones(len(rows)) if weights is None else np.asarray(weights, dtype=float)
+    matrix = sp.coo_matrix((data, (rows, cols)), shape=(node_count, node_count)).tocsr()
+    matrix = matrix + matrix.T
+    matrix.setdiag(0)
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def spectral_positions(adjacency, rng):
+    """Initial 2D positions from the two smallest non-trivial Laplacian eigenvectors."""
+    n = adjacency.shape[0]
+    if n < 4:
+        return rng.random((n, 2))
+    try:
+        lap = laplacian(adjacency, normed=True)
+        if n <= DENSE_EIGEN_LIMIT:
+            # Small components often have repeated eigenvalues, where ARPACK's answer can differ from
+            # run to run; the dense solver is exact, deterministic and fast at this size
+            _, vectors = np.linalg.eigh(lap.toarray())
+        else:
+            # A seeded start vector keeps ARPACK (and so the whole layout) deterministic between runs
+            _, vectors = eigsh(lap, k=3, sigma=-1e-3, which="LM", v0=rng.random(n))
+        return vectors[:, 1:3]
+    except Exception:
+        # eigsh can fail to converge on awkward components; fall back to random placement
+        return rng.random((n, 2))
+
+
+def exact_repulsion(pos, k):
+    """Repulsion between every pair of nodes, computed a block of rows at a time."""
+    displacement = np.zeros_like(pos)
+    for start in range(0, len(pos), REPULSION_CHUNK):
+        block = pos[start:start + REPULSION_CHUNK]
+        delta = block[:, None, :] - pos[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=2), 0.01)
+        displacement[start:start + REPULSION_CHUNK] += np.einsum("ijk,ij->ik", delta, k * k / distance ** 2)
+    return displacement
+
+
+def approximate_repulsion(pos, k):
+    """
+    Repulsion in O(n log n): exact from each node's NEAR_NEIGHBOURS nearest nodes (k-d tree), and from
+    every other grid cell as a single body of the cell's node count at its centroid.
+    """
+    n = len(pos)
+    _, neighbours = cKDTree(pos).query(pos, k=NEAR_NEIGHBOURS + 1)
+    delta = pos[:, None, :] - pos[neighbours]
+    distance = np.maximum(np.linalg.norm(delta, axis=2), 0.01)
+    # The query returns each node as its own nearest neighbour (zero delta, so no force)
+    displacement = np.einsum("ijk,ij->ik", delta, k * k / distance ** 2)
+
+    low, high = pos.min(axis=0), pos.max(axis=0)
+    cell_xy = np.minimum(((pos - low) / np.maximum(high - low, 1e-9) * FAR_GRID).astype(np.int64), FAR_GRID - 1)
+    cells, cell = np.unique(cell_xy[:, 0] * FAR_GRID + cell_xy[:, 1], return_inverse=True)
+    mass = np.bincount(cell, minlength=len(cells)).astype(float)
+    centroid = np.stack([np.bincount(cell, pos[:, axis], len(cells)) for axis in range(2)], axis=1) / mass[:, None]
+    for start in range(0, n, REPULSION_CHUNK):
+        block = slice(start, start + REPULSION_CHUNK)
+        delta = pos[block, None, :] - centroid[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=2), 0.01)
+        strength = mass[None, :] * k * k / distance ** 2
+        # A node's own cell is covered by its nearest neighbours
+        strength[np.arange(len(delta)), cell[block]] = 0.0
+        displacement[block] += np.einsum("ijk,ij->ik", delta, strength)
+    return displacement
+
+
+def fruchterman_reingold(adjacency, positions, iterations=ITERATIONS):
+    """
+    Force-directed layout: sparse attraction along edges, all-pairs repulsion for small components and
+    approximate (near neighbours plus grid) repulsion for large ones, so each iteration stays O(n log n).
+    Works in a unit box; callers rescale the result.
+    """
+    n = adjacency.shape[0]
+    pos = positions.astype(float)
+    pos -= pos.mean(axis=0)
+    span = np.abs(pos).max()
+    pos /= span if span > 0 else 1.0
+
+    k = np.sqrt(1.0 / n)
+    coo = sp.triu(adjacency, k=1).tocoo()
+    src, dst, weight = coo.row, coo.col, coo.data
+    temperature = 0.1
+
+    for _ in range(iterations):
+        displacement = exact_repulsion(pos, k) if n <= EXACT_REPULSION_LIMIT else approximate_repulsion(pos, k)
+
+        # Attraction only along the (sparse) edges
+        delta = pos[src] - pos[dst]
+        distance = np.maximum(np.linalg.norm(delta, axis=1), 0.01)
+        force = (delta * (weight * distance / k)[:, None])
+        np.add.at(displacement, src, -force)
+        np.add.at(displacement, dst, force)
+
+        length = np.maximum(np.linalg.norm(displacement, axis=1), 0.01)
+        pos += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= 0.1 / (iterations + 1)
+
+    return pos
+
+
+def pack_components(layouts):
+    """
+    Place per-component layouts side by side in rows (largest first) so they do not overlap.
+    Each layout is an (n, 2) array centred on the origin and already scaled to pixels.
+    """
+    radii = [max(np.abs(layout).max(), NODE_SPACING / 2) + NODE_SPACING for layout in layouts]
+    row_width = np.sqrt(sum((2 * r) ** 2 for r in radii))
+    placed = []
+    x = y = 0.0
+    row_height = 0.0
+    for layout, radius in zip(layouts, radii):
+        if x > 0 and x + 2 * radius > row_width:
+            x = 0.0
+            y += row_height
+            row_height = 0.0
+        placed.append(layout + np.array([x + radius, y + radius]))
+        x += 2 * radius
+        row_height = max(row_height, 2 * radius)
+    return placed
+
+
+def compute_layout(node_count, edges, weights=None, seed=42):
+    """
+    Compute fixed 2D coordinates for every node so the browser can render with physics disabled.
+
+    Args:
+        node_count (int): Number of nodes; node ids are 0..node_count-1.
+        edges (list): (source id, target id) pairs.
+        weights (list): Optional weight per edge (e.g. number of relationships); defaults to 1.
+        seed (int): Random seed so repeated runs produce the same picture.
+    Returns:
+        numpy.ndarray: (node_count, 2) array of x/y pixel coordinates.
+    """
+    rng = np.random.default_rng(seed)
+    adjacency = build_adjacency(node_count, edges, weights)
+    component_count, labels = connected_components(adjacency, directed=False)
+
+    members = [np.flatnonzero(labels == c) for c in range(component_count)]
+    members.sort(key=len, reverse=True)
+
+    layouts = []
+    for nodes in members:
+        if len(nodes) == 1:
+            layouts.append(np.zeros((1, 2)))
+            continue
+        sub = adjacency[nodes][:, nodes]
+        pos = fruchterman_reingold(sub, spectral_positions(sub, rng))
+        # Scale so the component's area grows with its size
+        pos -= pos.mean(axis=0)
+        span = np.abs(pos).max()
+        pos *= NODE_SPACING * np.sqrt(len(nodes)) / (span if span > 0 else 1.0)
+        layouts.append(pos)
+
+    positions = np.zeros((node_count, 2))
+    for nodes, layout in zip(members, pack_components(layouts)):
+        positions[nodes] = layout
+    return positions - positions.mean(axis=0)
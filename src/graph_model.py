@@ -0,0 +1,100 @@
+from collections import Counter
+
+DEFAULT_THREAT_LEVEL = 1
+
+
+def record_threat(record):
+    """Return (threat level, threat type) of a relationship record, with the generator's defaults."""
+    threat = record.get("Threat Assessment") or {}
+    level = threat.get("Threat Level")
+    return (level if level is not None else DEFAULT_THREAT_LEVEL), threat.get("Type")
+
+
+def most_common(counter):
+    """Most frequent key of a Counter (first seen wins ties), or None if it is empty."""
+    return counter.most_common(1)[0][0] if counter else None
+
+
+def aggregate_relationships(records):
+    """
+    Collapse relationship records into one node per entity and one weighted edge per entity pair.
+    (A, B) and (B, A) are the same pair; the edge keeps the orientation it was first seen in.
+
+    Args:
+        records (list): Relationship records shaped like the cleaned JSON file.
+    Returns:
+        tuple: (nodes, edges), both lists of dicts indexed by their integer id.
+            Node: label, threat_level (max over incident relationships), mean_threat_level,
+            relationship_count, threat_type (most common), location (most common), types (histogram).
+            Edge: from/to node ids, count, max_level, mean_level, types (histogram), title (summary of
+            the highest-threat record) and records (indices of the collapsed records).
+    """
+    node_index = {}
+    nodes = []
+    edge_index = {}
+    edges = []
+
+    def node_id(label):
+        if label not in node_index:
+            node_index[label] = len(nodes)
+            nodes.append({
+                "label": label,
+                "levels": [],
+                "types": Counter(),
+                "locations": Counter(),
+            })
+        return node_index[label]
+
+    for record_id, record in enumerate(records):
+        level, threat_type = record_threat(record)
+        source = node_id(record.get("Entity 1"))
+        target = node_id(record.get("Entity 2"))
+
+        endpoints = [(source, record.get("Origin Location 1"))]
+        if target != source:
+            endpoints.append((target, record.get("Origin Location 2")))
+        for nid, location in endpoints:
+            node = nodes[nid]
+            node["levels"].append(level)
+            if threat_type is not None:
+                node["types"][threat_type] += 1
+            if location is not None:
+                node["locations"][location] += 1
+
+        key = (min(source, target), max(source, target))
+        if key not in edge_index:
+            edge_index[key] = len(edges)
+            edges.append({
+                "from": source,
+                "to": target,
+                "levels": [],
+                "max_level": None,
+                "types": Counter(),
+                "title": None,
+                "records": [],
+            })
+        edge = edges[edge_index[key]]
+        if edge["max_level"] is None or level > edge["max_level"]:
+            edge["max_level"] = level
+            edge["title"] = record.get("Relationship Summary") or "Unknown relationship"
+        edge["levels"].append(level)
+        if threat_type is not None:
+            edge["types"][threat_type] += 1
+        edge["records"].append(record_id)
+
+    for node in nodes:
+        levels = node.pop("levels")
+        node["threat_level"] = max(levels)
+        node["mean_threat_level"] = sum(levels) / len(levels)
+        node["relationship_count"] = len(levels)
+        node["threat_type"] = most_common(node["types"])
+        node["location"] = most_common(node.pop("locations"))
+        node["types"] = dict(node["types"])
+
+    for edge in edges:
+        levels = edge.pop("levels")
+        edge["count"] = len(levels)
+        edge["mean_level"] = sum(levels) / len(levels)
+        edge["types"] = dict(edge["types"])
+
+    return nodes, edges
@@ -0,0 +1,266 @@
+import heapq
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+MAX_THREAT_LEVEL = 10
+LANDMARK_COUNT = 8  # Landmarks for the ALT heuristic; more landmarks give tighter bounds but cost memory
+MAX_PATHS = 10
+
+
+def edge_cost(edge):
+    """
+    Cost of walking along an aggregated edge when paths are weighted by threat.
+    Every hop costs at least 1 and more threatening relationships are cheaper, so the best path is the
+    shortest chain of the most threatening links.
+    """
+    return 1.0 + (MAX_THREAT_LEVEL - edge["max_level"]) / MAX_THREAT_LEVEL
+
+
+def select_landmarks(matrix, count, degrees):
+    """
+    Farthest-point landmark selection: start from the best-connected entity, then repeatedly add the
+    entity farthest from every landmark so far. Unreachable entities count as farthest, so landmarks
+    also spread over the larger components.
+    """
+    n = matrix.shape[0]
+    count = min(count, n)
+    if count == 0:
+        return [], np.zeros((0, n))
+    landmarks = [int(np.argmax(degrees))]
+    distances = dijkstra(matrix, directed=False, indices=landmarks)
+    while len(landmarks) < count:
+        # Distance to the nearest landmark is infinite for unreachable entities; ties go to the highest degree
+        nearest = distances.min(axis=0)
+        candidates = np.flatnonzero(nearest == nearest.max())
+        nxt = int(candidates[np.argmax(degrees[candidates])])
+        if nxt in landmarks:
+            break
+        landmarks.append(nxt)
+        distances = np.vstack([distances, dijkstra(matrix, directed=False, indices=nxt)])
+    return landmarks, distances
+
+
+def build_path_finder(index, landmark_count=LANDMARK_COUNT):
+    """
+    Precompute what path queries need on top of a graph_index.build_graph_index index: the threat
+    weighted cost of every adjacency entry, connected components (so disconnected pairs are rejected
+    immediately) and landmark distances for the ALT A* heuristic.
+    """
+    offsets, neighbors, edge_ids = index["offsets"], index["neighbors"], index["edge_ids"]
+    n = len(index["nodes"])
+    costs = np.array([edge_cost(index["edges"][e]) for e in edge_ids], dtype=float)
+    matrix = sp.csr_matrix((costs, neighbors, offsets), shape=(n, n))
+    _, components = connected_components(matrix, directed=False)
+    landmarks, landmark_distances = select_landmarks(matrix, landmark_count, np.diff(offsets))
+    return {
+        "index": index,
+        "costs": costs,
+        "components": components,
+        "landmarks": landmarks,
+        "landmark_distances": landmark_distances,
+    }
+
+
+def alt_heuristic(finder, target):
+    """Lower bound on the cost from every node to target, by the triangle inequality over the landmarks."""
+    distances = finder["landmark_distances"]
+    to_target = distances[:, target][:, None]
+    usable = np.isfinite(to_target[:, 0])
+    if not usable.any():
+        return np.zeros(distances.shape[1])
+    bounds = np.abs(distances[usable] - to_target[usable])
+    bounds[~np.isfinite(bounds)] = 0.0
+    return bounds.max(axis=0)
+
+
+def astar(finder, source, target, heuristic, banned_nodes=(), banned_edges=()):
+    """
+    A* over the threat-weighted adjacency with an ALT heuristic, skipping banned nodes and edge ids.
+    Returns (cost, node ids, edge ids), or None if target cannot be reached.
+    """
+    index = finder["index"]
+    offsets, neighbors, edge_ids = index["offsets"], index["neighbors"], index["edge_ids"]
+    costs = finder["costs"]
+    best = {source: 0.0}
+    previous = {source: None}
+    heap = [(heuristic[source], 0.0, source)]
+    while heap:
+        _, cost, node = heapq.heappop(heap)
+        if node == target:
+            break
+        if cost > best[node]:
+            continue
+        for i in range(offsets[node], offsets[node + 1]):
+            neighbor, edge_id = int(neighbors[i]), int(edge_ids[i])
+            if neighbor in banned_nodes or edge_id in banned_edges:
+                continue
+            new_cost = cost + costs[i]
+            if new_cost < best.get(neighbor, np.inf):
+                best[neighbor] = new_cost
+                previous[neighbor] = (node, edge_id)
+                heapq.heappush(heap, (new_cost + heuristic[neighbor], new_cost, neighbor))
+    if target not in previous:
+        return None
+
+    nodes, edges = [target], []
+    while previous[nodes[-1]] is not None:
+        node, edge_id = previous[nodes[-1]]
+        nodes.append(node)
+        edges.append(edge_id)
+    return best[target], nodes[::-1], edges[::-1]
+
+
+def bidirectional_bfs(finder, source, target, banned_nodes=(), banned_edges=()):
+    """
+    Fewest-hop path, expanding the smaller frontier from either end until the searches meet.
+    Returns (hop count, node ids, edge ids), or None if target cannot be reached.
+    """
+    if source == target:
+        return 0.0, [source], []
+    index = finder["index"]
+    offsets, neighbors, edge_ids = index["offsets"], index["neighbors"], index["edge_ids"]
+    parents = [{source: None}, {target: None}]
+    frontiers = [[source], [target]]
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen, other = parents[side], parents[1 - side]
+        next_frontier = []
+        meeting = None
+        for node in frontiers[side]:
+            for i in range(offsets[node], offsets[node + 1]):
+                neighbor, edge_id = int(neighbors[i]), int(edge_ids[i])
+                if neighbor in seen or neighbor in banned_nodes or edge_id in banned_edges:
+                    continue
+                seen[neighbor] = (node, edge_id)
+                if neighbor in other:
+                    meeting = neighbor
+                    break
+                next_frontier.append(neighbor)
+            if meeting is not None:
+                break
+        if meeting is not None:
+            half_paths = []
+            for walk in parents:
+                nodes, edges = [meeting], []
+                while walk[nodes[-1]] is not None:
+                    node, edge_id = walk[nodes[-1]]
+                    nodes.append(node)
+                    edges.append(edge_id)
+                half_paths.append((nodes, edges))
+            (source_nodes, source_edges), (target_nodes, target_edges) = half_paths
+            nodes = source_nodes[::-1] + target_nodes[1:]
+            edges = source_edges[::-1] + target_edges
+            return float(len(edges)), nodes, edges
+        frontiers[side] = next_frontier
+    return None
+
+
+def shortest_path(finder, source, target, weighted=True, banned_nodes=(), banned_edges=(), heuristic=None):
+    """Best path between two node ids: ALT A* when weighted by threat, bidirectional BFS by hop count otherwise."""
+    if weighted:
+        if heuristic is None:
+            heuristic = alt_heuristic(finder, target)
+        return astar(finder, source, target, heuristic, banned_nodes, banned_edges)
+    return bidirectional_bfs(finder, source, target, banned_nodes, banned_edges)
+
+
+def path_cost(finder, edges, weighted):
+    """Total cost of a list of edge ids under the same weighting as shortest_path."""
+    if not weighted:
+        return float(len(edges))
+    return float(sum(edge_cost(finder["index"]["edges"][e]) for e in edges))
+
+
+def k_shortest_paths(finder, source, target, k=1, weighted=True):
+    """
+    Up to k loopless paths between two node ids in increasing cost (Yen's algorithm).
+    Returns a list of (cost, node ids, edge ids).
+    """
+    if finder["components"][source] != finder["components"][target]:
+        return []
+    heuristic = alt_heuristic(finder, target) if weighted else None
+    first = shortest_path(finder, source, target, weighted, heuristic=heuristic)
+    if first is None:
+        return []
+    paths = [first]
+    candidates = []
+    seen = {tuple(first[1])}
+    while len(paths) < k:
+        _, last_nodes, last_edges = paths[-1]
+        for i in range(len(last_nodes) - 1):
+            spur, root_nodes, root_edges = last_nodes[i], last_nodes[:i + 1], last_edges[:i]
+            # Block the next edge of every accepted path sharing this root, and the root's own nodes
+            banned_edges = {
+                edges[i] for _, nodes, edges in paths
+                if len(edges) > i and nodes[:i + 1] == root_nodes
+            }
+            spur_path = shortest_path(finder, spur, target, weighted, set(root_nodes[:-1]), banned_edges, heuristic)
+            if spur_path is None:
+                continue
+            nodes = root_nodes[:-1] + spur_path[1]
+            if tuple(nodes) in seen:
+                continue
+            seen.add(tuple(nodes))
+            edges = root_edges + spur_path[2]
+            heapq.heappush(candidates, (path_cost(finder, edges, weighted), nodes, edges))
+        if not candidates:
+            break
+        paths.append(heapq.heappop(candidates))
+    return paths
+
+
+def find_paths(finder, source_label, target_label, k=1, weighted=True):
+    """
+    Find how two entities are connected.
+
+    Args:
+        finder (dict): Finder from build_path_finder.
+        source_label (str): First entity.
+        target_label (str): Second entity.
+        k (int): Number of alternative paths to return (clamped to 1..MAX_PATHS).
+        weighted (bool): Weight edges by threat level (edge_cost) instead of counting hops.
+    Returns:
+        list: Paths in increasing cost, each a dict with cost, hops, nodes, labels, edges and the
+        threat level of every edge; an empty list if the entities are not connected.
+        None if either entity is unknown.
+    """
+    index = finder["index"]
+    source = index["label_to_id"].get(source_label)
+    target = index["label_to_id"].get(target_label)
+    if source is None or target is None:
+        return None
+    k = max(1, min(int(k), MAX_PATHS))
+    return [
+        {
+            "cost": round(float(cost), 3),
+            "hops": len(edges),
+            "nodes": nodes,
+            "labels": [index["nodes"][n]["label"] for n in nodes],
+            "edges": edges,
+            "threat_levels": [index["edges"][e]["max_level"] for e in edges],
+        }
+        for cost, nodes, edges in k_shortest_paths(finder, source, target, k, weighted)
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+    from relationship_store import open_store, all_relationships
+    from graph_index import build_graph_index
+
+    parser = argparse.ArgumentParser(description="Find how two entities are connected in the relationship graph.")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("-k", type=int, default=3, help="number of alternative paths")
+    parser.add_argument("--hops", action="store_true", help="count hops instead of weighting by threat level")
+    args = parser.parse_args()
+
+    finder = build_path_finder(build_graph_index(all_relationships(open_store())))
+    result = find_paths(finder, args.source, args.target, args.k, weighted=not args.hops)
+    if result is None:
+        print("Unknown entity.")
+    elif not result:
+        print("These entities are not connected.")
+    for path in result or []:
+        print(f"cost {path['cost']}, {path['hops']} hops: " + " -> ".join(path["labels"]))
@@ -0,0 +1,29 @@
+# Production serving: run `gunicorn -c gunicorn.conf.py` from src/ (Linux/macOS).
+# The app is loaded once in the master process and the workers are forked from it, so every worker
+# shares the master's copy of the relationship data, graph indexes and prebuilt figures.
+import gc
+import multiprocessing
+import os
+
+wsgi_app = "dashboard:server"
+bind = os.environ.get("SENTINEL_BIND", "0.0.0.0:8050")
+workers = int(os.environ.get("SENTINEL_WORKERS", min(4, multiprocessing.cpu_count())))
+threads = int(os.environ.get("SENTINEL_THREADS", 4))
+worker_class = "gthread"
+preload_app = True
+timeout = 120
+# Recycle workers now and then so per-worker caches cannot grow without bound; forking again is cheap
+max_requests = 2000
+max_requests_jitter = 200
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the garbage collector's reach, so collections in the workers
+    # do not touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # SQLite connections must not be shared across a fork
+    import dashboard
+    dashboard.reopen_store()
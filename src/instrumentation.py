@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then left out
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(BASE_DIR, "..", "processed_data", "metrics")
+HISTORY_FILE = os.path.join(METRICS_DIR, "history.jsonl")
+
+LOG_LEVEL_ENV = "SENTINEL_LOG_LEVEL"  # e.g. DEBUG to see every skipped entity and raw model response
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Counters every stage reports, so runs can be compared column by column
+COUNTERS = ("items", "tokens_in", "tokens_out", "cache_hits", "cache_misses", "retries", "errors")
+
+# Metrics of the current process: stage name -> metrics, and function name -> call statistics
+STAGES = {}
+FUNCTIONS = {}
+
+
+def get_logger(name):
+    """
+    Return a logger for a pipeline script. The level comes from the SENTINEL_LOG_LEVEL environment
+    variable (INFO by default), so per-item messages logged at DEBUG cost nothing on normal runs.
+    """
+    root = logging.getLogger("sentinel")
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        level = os.environ.get(LOG_LEVEL_ENV, "INFO").upper()
+        root.setLevel(logging.getLevelNamesMapping().get(level, logging.INFO))
+        root.propagate = False
+        if level not in logging.getLevelNamesMapping():
+            root.warning("Unknown %s %r, logging at INFO", LOG_LEVEL_ENV, level)
+    return root.getChild(name)
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far in MB, or None where it cannot be measured."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stage_metrics(name):
+    """The metrics record of a stage, created on first use."""
+    if name not in STAGES:
+        STAGES[name] = {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_mb": None, **dict.fromkeys(COUNTERS, 0)}
+    return STAGES[name]
+
+
+def count(stage_name, counter, amount=1):
+    """Add to one of a stage's counters (items, tokens_in, tokens_out, cache_hits, ...)."""
+    metrics = stage_metrics(stage_name)
+    metrics[counter] = metrics.get(counter, 0) + amount
+
+
+@contextmanager
+def stage(name):
+    """
+    Measure a pipeline stage: wall and CPU time, and peak RSS when it ends. Counters are added
+    with count(name, ...) while it runs; throughput and cache hit rate are derived at the end.
+    """
+    metrics = stage_metrics(name)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield metrics
+    finally:
+        metrics["wall_seconds"] += time.perf_counter() - wall_start
+        metrics["cpu_seconds"] += time.process_time() - cpu_start
+        metrics["peak_rss_mb"] = peak_rss_mb()
+
+
+def timed(function):
+    """Decorator recording the number of calls and the total wall/CPU time of a hot function."""
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            calls = FUNCTIONS.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            calls["calls"] += 1
+            calls["wall_seconds"] += time.perf_counter() - wall_start
+            calls["cpu_seconds"] += time.process_time() - cpu_start
+    return wrapper
+
+
+def summarize():
+    """Snapshot of the metrics with derived rates, rounded for export."""
+    stages = {}
+    for name, metrics in STAGES.items():
+        summary = {key: round(value, 3) if isinstance(value, float) else value for key, value in metrics.items()}
+        summary["items_per_second"] = round(metrics["items"] / metrics["wall_seconds"], 3) if metrics["wall_seconds"] else None
+        lookups = metrics["cache_hits"] + metrics["cache_misses"]
+        summary["cache_hit_rate"] = round(metrics["cache_hits"] / lookups, 3) if lookups else None
+        stages[name] = summary
+    functions = {
+        name: {key: round(value, 3) if isinstance(value, float) else value for key, value in calls.items()}
+        for name, calls in FUNCTIONS.items()
+    }
+    return {"stages": stages, "functions": functions}
+
+
+def prometheus_text(run, summary):
+    """Render a metrics summary in the Prometheus text exposition format."""
+    lines = []
+    stage_keys = sorted({key for metrics in summary["stages"].values() for key in metrics})
+    for key in stage_keys:
+        samples = [(name, metrics[key]) for name, metrics in summary["stages"].items() if metrics.get(key) is not None]
+        if samples:
+            lines.append(f"# TYPE sentinel_stage_{key} gauge")
+            lines.extend(f'sentinel_stage_{key}{{run="{run}",stage="{name}"}} {value}' for name, value in samples)
+    for key in ("calls", "wall_seconds", "cpu_seconds") if summary["functions"] else ():
+        lines.append(f"# TYPE sentinel_function_{key} gauge")
+        lines.extend(
+            f'sentinel_function_{key}{{run="{run}",function="{name}"}} {calls[key]}'
+            for name, calls in summary["functions"].items()
+        )
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(run, metrics_dir=METRICS_DIR):
+    """
+    Write this process's metrics as <run>.json and <run>.prom in metrics_dir (latest run), and append
+    them to history.jsonl so runs can be compared.
+
+    Args:
+        run (str): Name of the script or run, e.g. "extract_entities".
+    Returns:
+        dict: The exported summary.
+    """
+    summary = {"run": run, "finished": time.strftime("%Y-%m-%dT%H:%M:%S"), **summarize()}
+    os.makedirs(metrics_dir, exist_ok=True)
+    with open(os.path.join(metrics_dir, f"{run}.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    with open(os.path.join(metrics_dir, f"{run}.prom"), "w", encoding="utf-8") as f:
+        f.write(prometheus_text(run, summary))
+    with open(os.path.join(metrics_dir, "history.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(summary) + "\n")
+    get_logger("metrics").info("Metrics for %s saved to %s", run, metrics_dir)
+    return summary
+
+
+def compare_runs(history_path=HISTORY_FILE, run=None):
+    """
+    Print each stage's metrics for the latest run next to the previous run of the same script.
+    """
+    with open(history_path, "r", encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    names = [run] if run else list(dict.fromkeys(entry["run"] for entry in runs))
+    for name in names:
+        matching = [entry for entry in runs if entry["run"] == name]
+        if not matching:
+            print(f"No runs recorded for {name}.")
+            continue
+        latest = matching[-1]
+        previous = matching[-2] if len(matching) > 1 else {"stages": {}}
+        print(f"{name} (latest {latest['finished']}, previous {previous.get('finished', '-')})")
+        for stage_name, metrics in latest["stages"].items():
+            before = previous["stages"].get(stage_name, {})
+            for key, value in metrics.items():
+                old = before.get(key)
+                if not value and not old:
+                    continue
+                change = f" ({(value - old) / old:+.1%})" if isinstance(old, (int, float)) and old else ""
+                print(f"  {stage_name:<28} {key:<18} {value:>12}  was {old if old is not None else '-':>12}{change}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the latest run of each pipeline script with the previous one.")
+    parser.add_argument("run", nargs="?", help="only this script (e.g. extract_entities)")
+    args = parser.parse_args()
+    if not os.path.exists(HISTORY_FILE):
+        sys.exit(f"No metrics recorded yet in {HISTORY_FILE}.")
+    compare_runs(run=args.run)
@@ -0,0 +1,52 @@
+import threading
+from instrumentation import get_logger, stage
+
+log = get_logger("models")
+
+# Process-wide registry: model name -> loader, and the models loaded so far
+LOADERS = {}
+MODELS = {}
+_lock = threading.Lock()
+
+
+def register(name, loader):
+    """
+    Register a zero-argument loader for a model. Nothing is loaded until the model is first used,
+    so modules can register their models at import time for free.
+    """
+    LOADERS[name] = loader
+
+
+def get_model(name):
+    """
+    Return a registered model, loading it on first use. Concurrent first calls load it only once.
+    Loading time and memory are recorded as the "load_<name>" stage.
+    """
+    model = MODELS.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        if name not in MODELS:
+            if name not in LOADERS:
+                raise KeyError(f"No model registered as '{name}'. Registered: {', '.join(LOADERS) or 'none'}")
+            log.info("Loading model %s...", name)
+            with stage(f"load_{name}"):
+                MODELS[name] = LOADERS[name]()
+            log.info("Model %s loaded.", name)
+        return MODELS[name]
+
+
+def warm_up(*names):
+    """Load the named models (all registered models if none are given) ahead of the first inference."""
+    for name in names or list(LOADERS):
+        get_model(name)
+
+
+def is_loaded(name):
+    return name in MODELS
+
+
+def unload(name):
+    """Drop a loaded model so its memory can be reclaimed; it is reloaded on next use."""
+    with _lock:
+        MODELS.pop(name, None)
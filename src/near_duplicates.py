@@ -0,0 +1,192 @@
+import json
+import os
+import re
+import zlib
+import numpy as np
+from instrumentation import get_logger, stage, count, export_metrics
+
+log = get_logger("near_duplicates")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEXT_DIRS = [
+    os.path.join(BASE_DIR, "..", "processed_data", "wikileaks_texts"),
+    os.path.join(BASE_DIR, "..", "processed_data", "news_texts"),
+]
+CLUSTERS_FILE = os.path.join(BASE_DIR, "..", "processed_data", "duplicate_clusters.json")
+
+SHINGLE_SIZE = 5  # Words per shingle
+NUM_PERM = 128  # MinHash signature length
+BANDS = 16  # LSH bands of NUM_PERM // BANDS rows: pairs above ~0.7 similarity almost always share a band
+SIMILARITY_THRESHOLD = 0.8  # Estimated Jaccard similarity of shingles for two documents to count as copies
+PRIME = 4294967291  # Largest prime below 2**32, so (a * x + b) fits in 64 bits
+SEED = 1
+SHINGLE_BLOCK = 4096
+
+
+def shingles(text):
+    """Hashed word shingles of a document, after lowercasing and collapsing punctuation and whitespace."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return np.unique(np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams)))
+
+
+def minhash_signatures(documents):
+    """
+    MinHash signature of every document: for each of NUM_PERM random hash functions, the minimum
+    hash over the document's shingles. Two signatures agree in a fraction of positions that estimates
+    the Jaccard similarity of the shingle sets.
+
+    Returns:
+        np.ndarray: (len(documents), NUM_PERM) uint64 signatures.
+    """
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+    b = rng.integers(0, PRIME, NUM_PERM, dtype=np.uint64)[:, None]
+    signatures = np.empty((len(documents), NUM_PERM), dtype=np.uint64)
+    for i, text in enumerate(documents):
+        hashes = shingles(text)
+        signature = np.full(NUM_PERM, PRIME, dtype=np.uint64)
+        # In blocks, so a long document does not need a NUM_PERM x shingles matrix at once
+        for start in range(0, len(hashes), SHINGLE_BLOCK):
+            block = hashes[None, start:start + SHINGLE_BLOCK]
+            np.minimum(signature, ((a * block + b) % PRIME).min(axis=1), out=signature)
+        signatures[i] = signature
+    return signatures
+
+
+def candidate_pairs(signatures):
+    """Pairs of documents whose signatures are identical in at least one LSH band."""
+    rows = NUM_PERM // BANDS
+    pairs = set()
+    for band in range(BANDS):
+        buckets = {}
+        for i, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+            buckets.setdefault(key, []).append(i)
+        for members in buckets.values():
+            pairs.update((members[x], members[y]) for x in range(len(members)) for y in range(x + 1, len(members)))
+    return pairs
+
+
+def find_duplicate_clusters(names, documents):
+    """
+    Group near-identical documents with MinHash and LSH banding. Candidate pairs are confirmed by
+    their estimated similarity and merged transitively, so a chain of reposts forms one cluster.
+
+    Args:
+        names (list): Document names (the text file names the pipeline uses as ids).
+        documents (list): Document texts, in the same order.
+    Returns:
+        list: Clusters of two or more documents, each {"representative", "members", "similarity"}.
+            The representative is the longest copy; members include it; similarity is the lowest
+            estimated similarity of a merged pair.
+    """
+    signatures = minhash_signatures(documents)
+    parent = list(range(len(names)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    merged = []
+    for i, j in candidate_pairs(signatures):
+        similarity = float(np.mean(signatures[i] == signatures[j]))
+        if similarity >= SIMILARITY_THRESHOLD:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[root_j] = root_i
+            merged.append((i, similarity))
+
+    groups = {}
+    for i in range(len(names)):
+        groups.setdefault(find(i), []).append(i)
+    pair_similarity = {}
+    for i, similarity in merged:
+        root = find(i)
+        pair_similarity[root] = min(similarity, pair_similarity.get(root, 1.0))
+
+    clusters = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        representative = max(members, key=lambda i: (len(documents[i]), names[i]))
+        clusters.append({
+            "representative": names[representative],
+            "members": sorted(names[i] for i in members),
+            "similarity": round(pair_similarity[root], 3),
+        })
+    return sorted(clusters, key=lambda cluster: cluster["representative"])
+
+
+def read_documents(text_dirs):
+    """Read the preprocessed "*_text.txt" files of the given directories (missing directories are skipped)."""
+    names, documents = [], []
+    for text_dir in text_dirs:
+        if not os.path.isdir(text_dir):
+            log.warning("Text directory not found: %s", text_dir)
+            continue
+        for name in sorted(os.listdir(text_dir)):
+            if name.endswith("_text.txt"):
+                with open(os.path.join(text_dir, name), "r", encoding="utf-8") as f:
+                    documents.append(f.read())
+                names.append(name)
+    return names, documents
+
+
+def build_duplicate_clusters(text_dirs=TEXT_DIRS, output_path=CLUSTERS_FILE):
+    """Cluster the preprocessed documents and save the clusters for the extraction scripts."""
+    names, documents = read_documents(text_dirs)
+    with stage("near_duplicates"):
+        clusters = find_duplicate_clusters(names, documents)
+        count("near_duplicates", "items", len(names))
+    duplicates = sum(len(cluster["members"]) - 1 for cluster in clusters)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "documents": len(names),
+            "duplicates": duplicates,
+            "parameters": {"shingle_size": SHINGLE_SIZE, "num_perm": NUM_PERM, "bands": BANDS,
+                           "similarity_threshold": SIMILARITY_THRESHOLD},
+            "clusters": clusters,
+        }, f, indent=4)
+    log.info("%d of %d documents are near-duplicates (%d clusters); saved to %s",
+             duplicates, len(names), len(clusters), output_path)
+    return clusters
+
+
+def load_duplicate_clusters(path=CLUSTERS_FILE):
+    """
+    Read the saved clusters as {representative: [other members]}. Without a clusters file every
+    document is processed on its own.
+    """
+    if not os.path.exists(path):
+        log.info("No near-duplicate clusters at %s; processing every document.", path)
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        clusters = json.load(f)["clusters"]
+    return {
+        cluster["representative"]: [name for name in cluster["members"] if name != cluster["representative"]]
+        for cluster in clusters
+    }
+
+
+def duplicate_of(clusters):
+    """Map each non-representative member to the representative processed in its place."""
+    return {member: representative for representative, members in clusters.items() for member in members}
+
+
+def expand_to_members(entities, clusters):
+    """Copy the entities found in each representative to the other members of its cluster."""
+    expanded = list(entities)
+    for entity in entities:
+        for member in clusters.get(entity["filename"], ()):
+            expanded.append({**entity, "filename": member})
+    return expanded
+
+
+if __name__ == "__main__":
+    build_duplicate_clusters()
+    export_metrics("near_duplicates")
@@ -0,0 +1,91 @@
+import numpy as np
+import scipy.sparse as sp
+
+HEATMAP_TOP_K = 60  # Entities per side of the drawn block
+HEATMAP_MAX_K = 150
+
+
+def build_pair_matrix(entity1, entity2, threat_levels):
+    """
+    Sparse, symmetric entity x entity matrices of the relationships: the highest threat level of each
+    pair and its number of relationships. Memory grows with the number of pairs, not entities squared.
+
+    Args:
+        entity1, entity2 (array-like): Entity names of every relationship (empty names already removed).
+        threat_levels (array-like): Threat level of every relationship (0 where missing).
+    Returns:
+        dict: "labels" (entity names by id), "index" (name -> id), "threat" and "count" (CSR matrices).
+    """
+    entity1, entity2 = np.asarray(entity1, dtype=object), np.asarray(entity2, dtype=object)
+    labels, codes = np.unique(np.concatenate([entity1, entity2]).astype(str), return_inverse=True)
+    n, size = len(entity1), len(labels)
+    rows, cols = codes[:n], codes[n:]
+    levels = np.asarray(threat_levels, dtype=float)
+
+    # One entry per unordered pair (self-pairs dropped), keeping the highest threat level
+    keep = rows != cols
+    low, high = np.minimum(rows, cols)[keep], np.maximum(rows, cols)[keep]
+    keys = low.astype(np.int64) * size + high
+    order = np.argsort(keys, kind="stable")
+    keys, levels = keys[order], levels[keep][order]
+    pair_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    highest = np.maximum.reduceat(levels, starts) if len(starts) else levels[:0]
+    pair_rows, pair_cols = pair_keys // size, pair_keys % size
+
+    def symmetric(values):
+        return sp.coo_matrix(
+            (np.concatenate([values, values]), (np.concatenate([pair_rows, pair_cols]), np.concatenate([pair_cols, pair_rows]))),
+            shape=(size, size)
+        ).tocsr()
+
+    return {
+        "labels": labels,
+        "index": {label: i for i, label in enumerate(labels)},
+        "threat": symmetric(highest),
+        "count": symmetric(counts.astype(float)),
+    }
+
+
+def select_block(pair_matrix, k=HEATMAP_TOP_K, min_threat_level=0, order="weighted_degree", communities=None, focus=None):
+    """
+    Pick the entities of the block to draw, counting only pairs at or above min_threat_level: the k entities
+    with the highest weighted degree (number of relationships), or with focus (entity names to drill into),
+    those entities followed by their most connected neighbours.
+
+    Args:
+        order (str): "weighted_degree" (busiest first) or "community" (grouped by community, so communities
+            show up as blocks along the diagonal, busiest first within each).
+        communities (np.ndarray): Community id of every entity id, needed for order="community".
+    Returns:
+        np.ndarray: Entity ids in display order.
+    """
+    kept = pair_matrix["count"]
+    if min_threat_level > 0:
+        kept = kept.multiply(pair_matrix["threat"] >= min_threat_level).tocsr()
+    focus_ids = [pair_matrix["index"][label] for label in focus or () if label in pair_matrix["index"]]
+    if focus_ids:
+        weights = np.asarray(kept[focus_ids].sum(axis=0)).ravel()
+        weights[focus_ids] = np.inf
+    else:
+        weights = np.asarray(kept.sum(axis=1)).ravel()
+    candidates = np.flatnonzero(weights > 0)
+    chosen = candidates[np.argsort(-weights[candidates], kind="stable")[:k]]
+    if order == "community" and communities is not None:
+        chosen = chosen[np.lexsort((-weights[chosen], communities[chosen]))]
+    return chosen
+
+
+def block_cells(pair_matrix, ids, min_threat_level=0):
+    """
+    The non-empty cells of the block over ids, at or above min_threat_level.
+
+    Returns:
+        tuple: (row positions, column positions, threat levels, relationship counts) as arrays.
+    """
+    threat = pair_matrix["threat"][ids][:, ids].tocoo()
+    keep = threat.data >= max(min_threat_level, np.finfo(float).tiny)
+    rows, cols, levels = threat.row[keep], threat.col[keep], threat.data[keep]
+    if not len(rows):
+        return rows, cols, levels, np.zeros(0)
+    counts = np.asarray(pair_matrix["count"][ids][:, ids][rows, cols]).ravel()
+    return rows, cols, levels, counts
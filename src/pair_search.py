@@ -0,0 +1,70 @@
+from bisect import bisect_left
+from collections import defaultdict
+
+
+def trigrams(text):
+    """Return the set of lowercase character trigrams in a string."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_label_index(labels):
+    """
+    Build a search index over a list of labels (e.g. "Entity 1 & Entity 2").
+    Labels should be ordered by preference, since results are returned in that order.
+
+    Returns:
+        dict: The labels, a trigram -> sorted label ids map for queries of 3+ characters,
+        and a sorted (word, label id) list for shorter word-prefix queries.
+    """
+    postings = defaultdict(list)
+    words = []
+    for label_id, label in enumerate(labels):
+        for gram in trigrams(label):
+            postings[gram].append(label_id)
+        for word in set(label.lower().split()):
+            words.append((word, label_id))
+    words.sort()
+    return {
+        "labels": list(labels),
+        "lowered": [label.lower() for label in labels],
+        "trigrams": dict(postings),
+        "words": words,
+        "word_keys": [word for word, _ in words],
+    }
+
+
+def search_labels(index, query, limit=50):
+    """
+    Return up to `limit` labels containing `query` (case-insensitive), in index order.
+    Queries of 3+ characters intersect trigram posting lists; shorter queries match word prefixes.
+    """
+    query = query.strip().lower()
+    if not query:
+        return index["labels"][:limit]
+
+    if len(query) < 3:
+        # Binary search for the range of words starting with the query
+        start = bisect_left(index["word_keys"], query)
+        end = bisect_left(index["word_keys"], query[:-1] + chr(ord(query[-1]) + 1))
+        label_ids = {label_id for _, label_id in index["words"][start:end]}
+        return [index["labels"][i] for i in sorted(label_ids)[:limit]]
+
+    grams = sorted(trigrams(query), key=lambda g: len(index["trigrams"].get(g, ())))
+    candidates = index["trigrams"].get(grams[0])
+    if not candidates:
+        return []
+    candidates = set(candidates)
+    for gram in grams[1:]:
+        candidates.intersection_update(index["trigrams"].get(gram, ()))
+        if not candidates:
+            return []
+
+    # Trigrams can match out of order, so confirm the substring on the few survivors
+    results = []
+    for label_id in sorted(candidates):
+        if query in index["lowered"][label_id]:
+            results.append(index["labels"][label_id])
+            if len(results) >= limit:
+                break
+    return results
@@ -0,0 +1,311 @@
+import json
+import math
+import os
+import re
+import numpy as np
+from instrumentation import get_logger
+
+log = get_logger("pair_triage")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RELATIONSHIPS_FILE = os.path.join(BASE_DIR, "..", "processed_data", "cleaned_extracted_relationships.json")
+ENTITIES_FILE = os.path.join(BASE_DIR, "..", "processed_data", "cleaned_filtered_entities.json")
+TRIAGE_MODEL_FILE = os.path.join(BASE_DIR, "..", "processed_data", "triage_model.json")
+NEWS_TEXTS_DIR = os.path.join(BASE_DIR, "..", "processed_data", "news_texts")
+WIKILEAKS_TEXTS_DIR = os.path.join(BASE_DIR, "..", "processed_data", "wikileaks_texts")
+
+# A pair is worth an LLM call when the answer is a confident relationship above the lowest threat level
+MIN_THREAT_LEVEL = 2
+MIN_CONFIDENCE = 80
+TARGET_RECALL = 0.95  # Default threshold: the highest one that keeps this share of worthwhile pairs
+HOLDOUT_SHARE = 0.2
+L2_PENALTY = 1.0
+SEED = 1
+TRADEOFF_QUANTILES = (0.0, 0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+THREAT_TERMS = re.compile(
+    r"\b(attack|terror\w*|bomb\w*|weapon\w*|arms|missile\w*|nuclear|explosive\w*|militan\w*|insurgen\w*|"
+    r"extremis\w*|kill\w*|kidnap\w*|hostage\w*|smuggl\w*|traffick\w*|drug\w*|fraud\w*|corrupt\w*|brib\w*|"
+    r"launder\w*|sanction\w*|cyber\w*|hack\w*|espionage|spy\w*|illegal\w*|arrest\w*|military|armed|violen\w*)\b",
+    re.IGNORECASE
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+FEATURES = (
+    "text_words", "sentences", "same_sentence", "mention_distance", "mentions_1", "mentions_2",
+    "entity_words", "nested_names", "both_org", "both_per", "ner_score", "threat_terms", "threat_density",
+)
+
+
+def mention_positions(words, entity):
+    """Word offsets where the entity's name starts in a lowercased word list."""
+    name = entity.lower().split()
+    if not name:
+        return []
+    return [i for i in range(len(words) - len(name) + 1) if words[i:i + len(name)] == name]
+
+
+def pair_features(entity1, entity2, text, entity_info=None):
+    """
+    Cheap features of a candidate pair and the text that would be sent to the LLM: how long the text is,
+    whether and how closely the two names co-occur, their NER labels and scores, and how much threat
+    vocabulary the text contains.
+
+    Args:
+        entity_info (dict): Entity text -> {"label", "score"} from the NER output, if available.
+    Returns:
+        list: One value per name in FEATURES.
+    """
+    entity_info = entity_info or {}
+    words = re.findall(r"\w+", text.lower())
+    positions_1 = mention_positions(words, " ".join(re.findall(r"\w+", entity1)))
+    positions_2 = mention_positions(words, " ".join(re.findall(r"\w+", entity2)))
+    if positions_1 and positions_2:
+        distance = min(abs(a - b) for a in positions_1 for b in positions_2)
+    else:
+        distance = len(words) + 1
+    pattern_1 = re.compile(rf"\b{re.escape(entity1)}\b", re.IGNORECASE)
+    pattern_2 = re.compile(rf"\b{re.escape(entity2)}\b", re.IGNORECASE)
+    sentences = [s for s in SENTENCE_END.split(text) if s.strip()]
+    same_sentence = any(pattern_1.search(s) and pattern_2.search(s) for s in sentences)
+    info_1, info_2 = entity_info.get(entity1, {}), entity_info.get(entity2, {})
+    labels = {info_1.get("label"), info_2.get("label")}
+    scores = [info["score"] for info in (info_1, info_2) if "score" in info]
+    threat_terms = len(THREAT_TERMS.findall(text))
+    return [
+        math.log1p(len(words)),
+        math.log1p(len(sentences)),
+        float(same_sentence),
+        math.log1p(distance),
+        math.log1p(len(positions_1)),
+        math.log1p(len(positions_2)),
+        math.log1p(len(entity1.split()) + len(entity2.split())),
+        float(entity1.lower() in entity2.lower() or entity2.lower() in entity1.lower()),
+        float(labels == {"ORG"}),
+        float(labels == {"PER"}),
+        float(np.mean(scores)) if scores else 0.0,
+        math.log1p(threat_terms),
+        threat_terms / max(len(words), 1),
+    ]
+
+
+def entity_info_from(entities):
+    """Entity text -> {"label", "score"} (highest score kept) from NER output records."""
+    info = {}
+    for entity in entities:
+        if entity["text"] not in info or entity["score"] > info[entity["text"]]["score"]:
+            info[entity["text"]] = {"label": entity["label"], "score": entity["score"]}
+    return info
+
+
+def is_worthwhile(record):
+    """Training label: did the LLM return a confident relationship above the lowest threat level?"""
+    threat_level = (record.get("Threat Assessment") or {}).get("Threat Level")
+    confidence = re.match(r"\d+", str(record.get("Confidence Score") or ""))
+    return (
+        isinstance(threat_level, (int, float)) and threat_level >= MIN_THREAT_LEVEL
+        and confidence is not None and int(confidence.group()) >= MIN_CONFIDENCE
+    )
+
+
+def read_source_text(filename, cache):
+    """A preprocessed document's text (news or wikileaks, as the extractors pick them), or None if missing."""
+    if filename not in cache:
+        path = os.path.join(NEWS_TEXTS_DIR if filename.startswith("news_row") else WIKILEAKS_TEXTS_DIR, filename)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cache[filename] = f.read()
+        except FileNotFoundError:
+            cache[filename] = None
+    return cache[filename]
+
+
+def pair_texts(records, entities):
+    """
+    Rebuild the text the extractor sent to the LLM for each record: extract_relevant_sentences over the
+    first document the NER output places both entities in, which is the document the extractor paired
+    them from. None where the entities share no document or its text is not available.
+    """
+    # Imported here: the extractors import this module, and nltk is only needed for training
+    from extract_relationships_Local import extract_relevant_sentences
+    documents = {}
+    for entity in entities:
+        documents.setdefault(entity["text"], []).append(entity["filename"])
+    cache = {}
+    texts = []
+    for record in records:
+        shared = set(documents.get(record["Entity 2"], ()))
+        filename = next((name for name in documents.get(record["Entity 1"], ()) if name in shared), None)
+        source = read_source_text(filename, cache) if filename else None
+        text = extract_relevant_sentences(source, record["Entity 1"], record["Entity 2"]) if source else ""
+        texts.append(text if text.strip() else None)
+    return texts
+
+
+def training_data(records, entities):
+    """
+    Features and labels from earlier LLM answers, computed on the same text the model scores at
+    extraction time (see pair_texts). Records whose source text cannot be rebuilt fall back to their
+    "Relevant Context", a shorter LLM snippet with a different feature distribution.
+
+    Returns:
+        tuple: (features, labels, number of records that used the fallback).
+    """
+    rows = [r for r in records if r.get("Entity 1") and r.get("Entity 2") and r.get("Relevant Context")]
+    texts = pair_texts(rows, entities)
+    fallback = sum(text is None for text in texts)
+    entity_info = entity_info_from(entities)
+    X = np.array([
+        pair_features(r["Entity 1"], r["Entity 2"], text or r["Relevant Context"], entity_info)
+        for r, text in zip(rows, texts)
+    ])
+    y = np.array([is_worthwhile(r) for r in rows], dtype=float)
+    return X, y, fallback
+
+
+def fit_logistic(X, y, penalty=L2_PENALTY):
+    """L2-regularised logistic regression on standardised features. Returns (mean, std, weights, bias)."""
+    # Imported here: the extractors import this module only to score pairs, and scipy.optimize is slow to import
+    from scipy.optimize import minimize
+    mean, std = X.mean(axis=0), X.std(axis=0)
+    std[std == 0] = 1.0
+    Z = (X - mean) / std
+
+    def loss(params):
+        w, b = params[:-1], params[-1]
+        margin = Z @ w + b
+        probability = 1 / (1 + np.exp(-margin))
+        value = np.sum(np.logaddexp(0, margin) - y * margin) + 0.5 * penalty * w @ w
+        gradient = np.append(Z.T @ (probability - y) + penalty * w, np.sum(probability - y))
+        return value, gradient
+
+    result = minimize(loss, np.zeros(Z.shape[1] + 1), jac=True, method="L-BFGS-B")
+    return mean, std, result.x[:-1], result.x[-1]
+
+
+def predict(model, X):
+    Z = (np.asarray(X) - model["mean"]) / model["std"]
+    return 1 / (1 + np.exp(-(Z @ model["weights"] + model["bias"])))
+
+
+def tradeoff(scores, y, thresholds):
+    """
+    For each threshold, the share of pairs sent to the LLM (cost), the share of worthwhile pairs kept
+    (recall) and the share of sent pairs that are worthwhile (precision).
+    """
+    rows = []
+    for threshold in thresholds:
+        sent = scores >= threshold
+        rows.append({
+            "threshold": round(float(threshold), 3),
+            "llm_calls": round(float(sent.mean()), 3),
+            "recall": round(float((sent & (y == 1)).sum() / max((y == 1).sum(), 1)), 3),
+            "precision": round(float((sent & (y == 1)).sum() / max(sent.sum(), 1)), 3),
+        })
+    return rows
+
+
+def roc_auc(scores, y):
+    ranks = np.argsort(np.argsort(scores)) + 1
+    positives = y == 1
+    n_pos, n_neg = positives.sum(), (~positives).sum()
+    if not n_pos or not n_neg:
+        return None
+    return float((ranks[positives].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def train_triage(records, entities, target_recall=TARGET_RECALL, threshold=None):
+    """
+    Train the triage model on a random split of the records and pick the threshold on the held-out part.
+
+    Args:
+        records (list): Cleaned relationship records (earlier LLM answers).
+        entities (list): NER output records, for the source documents and the label and score features.
+        target_recall (float): Keep at least this share of worthwhile held-out pairs.
+        threshold (float): Use this threshold instead of deriving one from target_recall.
+    Returns:
+        dict: The model, with its held-out recall/cost report.
+    """
+    X, y, fallback = training_data(records, entities)
+    if fallback:
+        log.warning("No source text for %d of %d pairs (are processed_data/news_texts and wikileaks_texts there?); "
+                    "their Relevant Context was used instead, so the held-out recall is less reliable.", fallback, len(y))
+    order = np.random.default_rng(SEED).permutation(len(y))
+    holdout, train = order[:int(len(y) * HOLDOUT_SHARE)], order[int(len(y) * HOLDOUT_SHARE):]
+    mean, std, weights, bias = fit_logistic(X[train], y[train])
+    model = {"features": list(FEATURES), "mean": mean, "std": std, "weights": weights, "bias": float(bias)}
+
+    scores = predict(model, X[holdout])
+    if threshold is None:
+        # Highest threshold whose held-out recall still reaches the target
+        positive_scores = np.sort(scores[y[holdout] == 1])
+        threshold = float(positive_scores[int(math.floor((1 - target_recall) * len(positive_scores)))]) if len(positive_scores) else 0.0
+    model["threshold"] = threshold
+    auc = roc_auc(scores, y[holdout])
+    model["report"] = {
+        "training_pairs": int(len(train)),
+        "context_fallback_pairs": int(fallback),
+        "holdout_pairs": int(len(holdout)),
+        "worthwhile_share": round(float(y.mean()), 3),
+        "auc": round(auc, 3) if auc is not None else None,
+        "chosen": tradeoff(scores, y[holdout], [threshold])[0],
+        # Thresholds at score quantiles, so the rows step through 100%, 95%, 90%, ... of pairs sent
+        "tradeoff": tradeoff(scores, y[holdout], np.quantile(scores, TRADEOFF_QUANTILES)),
+    }
+    return model
+
+
+def save_triage_model(model, path=TRIAGE_MODEL_FILE):
+    serializable = {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in model.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(serializable, f, indent=2)
+
+
+def load_triage_model(path=TRIAGE_MODEL_FILE):
+    """Read the triage model, or return None (every pair goes to the LLM) if none has been trained."""
+    if not os.path.exists(path):
+        log.info("No pair triage model at %s; every pair goes to the LLM.", path)
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        model = json.load(f)
+    if model["features"] != list(FEATURES):
+        log.warning("Pair triage model at %s was trained on other features; retrain it with pair_triage.py.", path)
+        return None
+    for key in ("mean", "std", "weights"):
+        model[key] = np.array(model[key])
+    return model
+
+
+def worth_extracting(model, entity1, entity2, text, entity_info=None):
+    """True if the pair should go to the LLM: no model, or a score at or above the model's threshold."""
+    if model is None:
+        return True
+    return float(predict(model, [pair_features(entity1, entity2, text, entity_info)])[0]) >= model["threshold"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the pair triage model and report its recall/cost trade-off.")
+    parser.add_argument("--target-recall", type=float, default=TARGET_RECALL,
+                        help="share of worthwhile pairs that must still reach the LLM")
+    parser.add_argument("--threshold", type=float, help="use this score threshold instead")
+    args = parser.parse_args()
+
+    with open(RELATIONSHIPS_FILE, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    with open(ENTITIES_FILE, "r", encoding="utf-8") as f:
+        entities = json.load(f)
+    model = train_triage(records, entities, args.target_recall, args.threshold)
+    save_triage_model(model)
+
+    report = model["report"]
+    print(f"Trained on {report['training_pairs']} pairs, evaluated on {report['holdout_pairs']} held-out pairs "
+          f"({report['worthwhile_share']:.0%} worthwhile, AUC {report['auc']}).")
+    if report["context_fallback_pairs"]:
+        print(f"{report['context_fallback_pairs']} pairs had no source text and were scored on their Relevant Context.")
+    print(f"{'threshold':>9} {'LLM calls':>10} {'recall':>7} {'precision':>10}")
+    for row in report["tradeoff"] + [report["chosen"]]:
+        marker = "  <- saved" if row is report["chosen"] else ""
+        print(f"{row['threshold']:>9.3f} {row['llm_calls']:>10.1%} {row['recall']:>7.1%} {row['precision']:>10.1%}{marker}")
+    print(f"Model saved to {TRIAGE_MODEL_FILE}")
@@ -0,0 +1,375 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BASE_DIR)
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+STATE_FILE = os.path.join(ROOT_DIR, "processed_data", "pipeline_state.json")
+
+
+def src(name):
+    return os.path.join(BASE_DIR, name)
+
+
+def data(name):
+    return os.path.join(ROOT_DIR, "data", name)
+
+
+def processed(name):
+    return os.path.join(ROOT_DIR, "processed_data", name)
+
+
+# Each stage runs one of the existing scripts from the directory its relative paths expect.
+# The script and the local modules it imports (found by local_imports) are hashed with the inputs,
+# so code changes also trigger a rerun. A stage depends on every stage producing one of its inputs.
+STAGES = [
+    {
+        "name": "preprocess_pdfs",
+        "script": src("preprocess.py"), "args": ["pdfs"], "cwd": BASE_DIR,
+        "inputs": [data("pdfs")],
+        "outputs": [processed("pdf_texts")],
+    },
+    {
+        "name": "preprocess_wikileaks",
+        "script": src("preprocess.py"), "args": ["wikileaks"], "cwd": BASE_DIR,
+        "inputs": [data("wikileaks_parsed.xlsx")],
+        "outputs": [processed("wikileaks_texts")],
+    },
+    {
+        "name": "preprocess_news",
+        "script": src("preprocess.py"), "args": ["news"], "cwd": BASE_DIR,
+        "inputs": [data("news_excerpts_parsed.xlsx")],
+        "outputs": [processed("news_texts")],
+    },
+    {
+        "name": "near_duplicates",
+        "script": src("near_duplicates.py"), "cwd": BASE_DIR,
+        "inputs": [processed("wikileaks_texts"), processed("news_texts")],
+        "outputs": [processed("duplicate_clusters.json")],
+    },
+    {
+        "name": "extract_entities",
+        "script": src("extract_entities.py"), "cwd": BASE_DIR,
+        "inputs": [processed("wikileaks_texts"), processed("news_texts"), processed("duplicate_clusters.json")],
+        "outputs": [processed("combined_entities.json")],
+    },
+    {
+        "name": "clean_entities",
+        "script": src("clean_entities.py"), "cwd": BASE_DIR,
+        "inputs": [processed("combined_entities.json")],
+        "outputs": [processed("cleaned_filtered_entities.json")],
+    },
+    {
+        "name": "extract_relationships",
+        "script": src("extract_relationships_API.py"), "cwd": BASE_DIR,
+        "inputs": [processed("cleaned_filtered_entities.json"), processed("wikileaks_texts"), processed("news_texts"),
+                   processed("duplicate_clusters.json")],
+        "outputs": [processed("extracted_relationships.json")],
+        "fresh_outputs": True,  # The script appends to an existing output file
+    },
+    {
+        "name": "standardize_json",
+        "script": src("standardize_json.py"), "cwd": BASE_DIR,
+        "inputs": [processed("extracted_relationships.json")],
+        "outputs": [processed("cleaned_extracted_relationships.json")],
+    },
+    {
+        "name": "pair_triage",
+        "script": src("pair_triage.py"), "cwd": BASE_DIR,
+        "inputs": [processed("cleaned_extracted_relationships.json"), processed("cleaned_filtered_entities.json"),
+                   processed("wikileaks_texts"), processed("news_texts")],
+        "outputs": [processed("triage_model.json")],
+    },
+    {
+        "name": "relationship_store",
+        "script": src("relationship_store.py"), "cwd": BASE_DIR,
+        "inputs": [processed("cleaned_extracted_relationships.json"), processed("relationship_deltas.jsonl")],
+        "outputs": [processed("relationships.db")],
+    },
+    {
+        "name": "graph_analytics",
+        "script": src("graph_analytics.py"), "cwd": BASE_DIR,
+        "inputs": [processed("relationships.db")],
+        "outputs": [processed("graph_analytics.json")],
+    },
+    {
+        "name": "graph_data",
+        "script": os.path.join(ASSETS_DIR, "nodeGenerator2.0.py"), "cwd": ASSETS_DIR,
+        # nodeGenerator2.0.py reads the analytics cache, so it waits for graph_analytics to write it
+        "inputs": [processed("relationships.db"), processed("graph_analytics.json")],
+        "outputs": [os.path.join(ASSETS_DIR, "graph_data")],
+    },
+    {
+        "name": "geocode",
+        "script": src("geocode.py"), "cwd": BASE_DIR,
+        "inputs": [processed("relationships.db"), src("gazetteer.csv")],
+        "outputs": [processed("geocode_cache.json")],
+    },
+    {
+        "name": "search_index",
+        "script": src("text_search.py"), "cwd": BASE_DIR,
+        "inputs": [processed("relationships.db")],
+        "outputs": [processed("search_index")],
+    },
+]
+
+# Inputs that may legitimately be absent (the delta log only exists once deltas have been applied)
+OPTIONAL_INPUTS = {processed("relationship_deltas.jsonl")}
+
+
+def local_imports(script):
+    """
+    Paths of the src/ modules a script imports, directly or through other src/ modules (imports inside
+    functions included), so changing any of them changes the stage's input hash.
+    """
+    found = []
+    pending = [script]
+    seen = {os.path.abspath(script)}
+    while pending:
+        with open(pending.pop(), "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                path = os.path.abspath(src(name.split(".")[0] + ".py"))
+                if path not in seen and os.path.isfile(path):
+                    seen.add(path)
+                    found.append(path)
+                    pending.append(path)
+    return sorted(found)
+
+
+def stage_dependencies(stages):
+    """Map each stage name to the names of the stages producing its inputs."""
+    producers = {output: stage["name"] for stage in stages for output in stage["outputs"]}
+    return {
+        stage["name"]: sorted({producers[path] for path in stage["inputs"] if path in producers} - {stage["name"]})
+        for stage in stages
+    }
+
+
+def file_digest(path, file_hashes):
+    """
+    SHA-1 of a file's content. Digests are remembered by (size, mtime) in file_hashes, so only files
+    that were touched since the last run are read again.
+    """
+    stat = os.stat(path)
+    key = f"{stat.st_size}:{stat.st_mtime_ns}"
+    cached = file_hashes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    file_hashes[path] = [key, digest.hexdigest()]
+    return file_hashes[path][1]
+
+
+def content_hash(paths, file_hashes):
+    """
+    Combined content hash of files and directories (walked in a stable order).
+    Returns None if any required path is missing.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    digest.update(os.path.relpath(file_path, ROOT_DIR).encode("utf-8"))
+                    digest.update(file_digest(file_path, file_hashes).encode("ascii"))
+        elif os.path.isfile(path):
+            digest.update(os.path.relpath(path, ROOT_DIR).encode("utf-8"))
+            digest.update(file_digest(path, file_hashes).encode("ascii"))
+        elif path in OPTIONAL_INPUTS:
+            digest.update(f"missing:{os.path.relpath(path, ROOT_DIR)}".encode("utf-8"))
+        else:
+            return None
+    return digest.hexdigest()
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def plan_stage(stage, state, force=False):
+    """
+    Decide what to do with a stage whose dependencies have finished.
+
+    Returns:
+        tuple: (action, input hash) where action is "run", "skip" (inputs unchanged and outputs present),
+        "adopt" (first run and the outputs already exist: recorded as up to date rather than redoing slow
+        model and API stages; use force to rebuild them), "keep" (inputs unavailable but earlier outputs exist, e.g. raw data not checked out) or
+        "missing" (inputs unavailable and nothing to fall back on; stages downstream may still have
+        their own earlier outputs to keep).
+    """
+    input_hash = content_hash([stage["script"]] + local_imports(stage["script"]) + stage["inputs"], state["files"])
+    outputs_exist = all(os.path.exists(path) for path in stage["outputs"])
+    if input_hash is None:
+        return ("keep" if outputs_exist else "missing"), None
+    recorded = state["stages"].get(stage["name"])
+    if not force and outputs_exist:
+        if recorded is None:
+            return "adopt", input_hash
+        if recorded["inputs"] == input_hash:
+            return "skip", input_hash
+    return "run", input_hash
+
+
+def run_stage(stage):
+    """
+    Run a stage's script in its own process and return its exit code and duration.
+    Stages marked fresh_outputs start without their previous output files, which are put back if the run fails.
+    """
+    moved = []
+    if stage.get("fresh_outputs"):
+        for path in stage["outputs"]:
+            if os.path.isfile(path):
+                os.replace(path, path + ".prev")
+                moved.append(path)
+    start = time.time()
+    result = subprocess.run([sys.executable, stage["script"]] + stage.get("args", []), cwd=stage["cwd"])
+    for path in moved:
+        if result.returncode == 0:
+            os.remove(path + ".prev")
+        else:
+            os.replace(path + ".prev", path)
+    return result.returncode, time.time() - start
+
+
+def select_stages(stages, dependencies, targets):
+    """The target stages and everything upstream of them (all stages when no targets are given)."""
+    if not targets:
+        return [stage["name"] for stage in stages]
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(dependencies[name])
+    return [stage["name"] for stage in stages if stage["name"] in selected]
+
+
+def run_pipeline(targets=(), force=(), jobs=4, dry_run=False, stages=STAGES, state_path=STATE_FILE):
+    """
+    Bring the pipeline outputs up to date with the minimum recomputation.
+    Stages run as soon as all their dependencies have finished, up to `jobs` at a time. A stage is skipped
+    when the content hash of its script, the local modules it imports and its inputs matches the last successful run and its outputs exist,
+    so a rerun that reproduces identical outputs also lets everything downstream be skipped.
+
+    Args:
+        targets (iterable): Stage names to bring up to date (with their upstream stages); all when empty.
+        force (iterable): Stage names to rerun even if unchanged ("all" for every stage).
+        jobs (int): Maximum number of stages running concurrently.
+        dry_run (bool): Only report what would run. Stages after one that would run are reported as "run".
+    Returns:
+        dict: stage name -> outcome ("ran", "skipped", "adopted", "kept", "unavailable", "failed", "blocked", "would run").
+    """
+    by_name = {stage["name"]: stage for stage in stages}
+    dependencies = stage_dependencies(stages)
+    unknown = (set(targets) | set(force)) - set(by_name) - {"all"}
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}. Stages: {', '.join(by_name)}")
+    selected = select_stages(stages, dependencies, targets)
+    state = load_state(state_path)
+    outcomes = {}
+
+    def ready(name):
+        return name not in outcomes and all(dep in outcomes or dep not in selected for dep in dependencies[name])
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        running = {}
+        while len(outcomes) < len(selected):
+            for name in [name for name in selected if ready(name) and name not in (n for n, _ in running.values())]:
+                stage = by_name[name]
+                if any(outcomes.get(dep) in ("failed", "blocked") for dep in dependencies[name]):
+                    outcomes[name] = "blocked"
+                    print(f"[{name}] blocked by a failed upstream stage")
+                    continue
+                if dry_run and any(outcomes.get(dep) == "would run" for dep in dependencies[name]):
+                    outcomes[name] = "would run"
+                    continue
+                action, input_hash = plan_stage(stage, state, "all" in force or name in force)
+                if action == "skip":
+                    outcomes[name] = "skipped"
+                    print(f"[{name}] up to date")
+                elif action == "adopt":
+                    outcomes[name] = "adopted"
+                    if not dry_run:
+                        state["stages"][name] = {"inputs": input_hash, "finished": time.time()}
+                    print(f"[{name}] existing outputs recorded as up to date")
+                elif action == "keep":
+                    outcomes[name] = "kept"
+                    print(f"[{name}] inputs unavailable, keeping existing outputs")
+                elif action == "missing":
+                    outcomes[name] = "unavailable"
+                    print(f"[{name}] inputs missing: {', '.join(p for p in stage['inputs'] if not os.path.exists(p))}")
+                elif dry_run:
+                    outcomes[name] = "would run"
+                else:
+                    print(f"[{name}] running {os.path.basename(stage['script'])} {' '.join(stage.get('args', []))}")
+                    running[executor.submit(run_stage, stage)] = (name, input_hash)
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, input_hash = running.pop(future)
+                returncode, elapsed = future.result()
+                if returncode == 0:
+                    outcomes[name] = "ran"
+                    state["stages"][name] = {"inputs": input_hash, "finished": time.time(), "seconds": round(elapsed, 2)}
+                    print(f"[{name}] done in {elapsed:.1f}s")
+                else:
+                    outcomes[name] = "failed"
+                    state["stages"].pop(name, None)
+                    print(f"[{name}] failed with exit code {returncode}")
+                save_state(state, state_path)
+
+    if not dry_run:
+        save_state(state, state_path)
+    return outcomes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bring the processed data, graph files and caches up to date, rerunning only stages whose inputs changed."
+    )
+    parser.add_argument("targets", nargs="*", help=f"stages to update with their upstream stages (default: all). "
+                                                   f"Stages: {', '.join(stage['name'] for stage in STAGES)}")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help='rerun these stages even if unchanged ("all" for every stage)')
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="maximum number of stages running at once")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="only show which stages would run")
+    args = parser.parse_args()
+
+    try:
+        outcomes = run_pipeline(args.targets, args.force, args.jobs, args.dry_run)
+    except ValueError as e:
+        parser.error(str(e))
+    print(", ".join(f"{name}: {outcome}" for name, outcome in outcomes.items()))
+    sys.exit(1 if "failed" in outcomes.values() else 0)
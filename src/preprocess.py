@@ -1,6 +1,10 @@
 import os
+import sys
 import pdfplumber
 import pandas as pd
+from instrumentation import get_logger, stage, count, export_metrics
+
+log = get_logger("preprocess")
 
 # Extract text from each PDF file
 def extract_text_from_pdfs(pdf_dir, output_dir):
@@ -8,7 +12,7 @@ def extract_text_from_pdfs(pdf_dir, output_dir):
     os.makedirs(output_dir, exist_ok=True)
     for pdf_file in os.listdir(pdf_dir):
         if pdf_file.endswith(".pdf"):
-            print(f"Processing PDF: {pdf_file}")
+            log.debug("Processing PDF: %s", pdf_file)
             pdf_path = os.path.join(pdf_dir, pdf_file)
             output_file = os.path.join(output_dir, f"{os.path.splitext(pdf_file)[0]}_text.txt")
             with pdfplumber.open(pdf_path) as pdf:
@@ -18,7 +22,8 @@ def extract_text_from_pdfs(pdf_dir, output_dir):
             # Save the text
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write("\n".join(text))
-    print("PDF text extraction completed.")
+            count("pdfs", "items")
+    log.info("PDF text extraction completed.")
 
 def extract_text_from_wikileaks_grouped(wikileaks_file, output_dir):
     """Group rows by unique labels in the 'PDF Path' column and extract combined text."""
@@ -42,7 +47,7 @@ def extract_text_from_wikileaks_grouped(wikileaks_file, output_dir):
 
     # Process each group
     for label, group in grouped:
-        print(f"Processing group for label: {label}")
+        log.debug("Processing group for label: %s", label)
 
         # Combine all text from the 'Text' column for the current group
         combined_text = " ".join(group[content_column].dropna())
@@ -51,8 +56,9 @@ def extract_text_from_wikileaks_grouped(wikileaks_file, output_dir):
         output_file = os.path.join(output_dir, f"{label}_text.txt")
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(combined_text)
+        count("wikileaks", "items")
 
-    print("Wikileaks text extraction completed.")
+    log.info("Wikileaks text extraction completed.")
 
 # Extract text from each row in the News Excel file
 def extract_text_from_news(news_file, output_dir):
@@ -69,13 +75,14 @@ def extract_text_from_news(news_file, output_dir):
 
     # Process each row
     for index, row in df.iterrows():
-        print(f"Processing News row {index}")
+        log.debug("Processing News row %s", index)
         text = row[content_column]  # Get the text content
         if pd.notna(text):  # Check if the text is not null
             output_file = os.path.join(output_dir, f"news_row_{index}_text.txt")
             with open(output_file, 'w', encoding='utf-8') as f:
                 f.write(text)
-    print("News text extraction completed.")
+        count("news", "items")
+    log.info("News text extraction completed.")
 
 # Main function to run all preprocessing steps
 if __name__ == "__main__":
@@ -89,7 +96,16 @@ if __name__ == "__main__":
     wikileaks_text_dir = "../processed_data/wikileaks_texts"
     news_text_dir = "../processed_data/news_texts"
 
-    # Process each source
-    extract_text_from_pdfs(pdf_dir, pdf_text_dir)
-    extract_text_from_wikileaks_grouped(wikileaks_file, wikileaks_text_dir)
-    extract_text_from_news(news_file, news_text_dir)
+    # Process each source, or only the ones named on the command line (pdfs, wikileaks, news)
+    sources = sys.argv[1:] or ["pdfs", "wikileaks", "news"]
+    if "pdfs" in sources:
+        with stage("pdfs"):
+            extract_text_from_pdfs(pdf_dir, pdf_text_dir)
+    if "wikileaks" in sources:
+        with stage("wikileaks"):
+            extract_text_from_wikileaks_grouped(wikileaks_file, wikileaks_text_dir)
+    if "news" in sources:
+        with stage("news"):
+            extract_text_from_news(news_file, news_text_dir)
+    # One metrics file per source when the pipeline runs them in parallel
+    export_metrics("_".join(["preprocess"] + sys.argv[1:]))
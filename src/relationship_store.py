@@ -0,0 +1,327 @@
+import json
+import os
+import sqlite3
+import pandas as pd
+
+# Paths are resolved from this file so the store can be used from src/ and src/assets/
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RELATIONSHIPS_FILE = os.path.join(BASE_DIR, "..", "processed_data", "cleaned_extracted_relationships.json")
+STORE_FILE = os.path.join(BASE_DIR, "..", "processed_data", "relationships.db")
+# Append-only log of records added or changed by apply_delta, replayed on top of the JSON file on rebuild
+DELTA_LOG_FILE = os.path.join(BASE_DIR, "..", "processed_data", "relationship_deltas.jsonl")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS relationships (
+    id INTEGER PRIMARY KEY,
+    entity1 TEXT,
+    entity2 TEXT,
+    summary TEXT,
+    confidence TEXT,
+    context TEXT,
+    threat_level INTEGER,
+    threat_type TEXT,
+    threat_explanation TEXT,
+    impact_level INTEGER,
+    impact_explanation TEXT,
+    location1 TEXT,
+    location2 TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entity1 ON relationships (entity1, threat_level);
+CREATE INDEX IF NOT EXISTS idx_entity2 ON relationships (entity2, threat_level);
+CREATE INDEX IF NOT EXISTS idx_pair ON relationships (entity1, entity2);
+CREATE INDEX IF NOT EXISTS idx_threat_level ON relationships (threat_level);
+CREATE INDEX IF NOT EXISTS idx_threat_type ON relationships (threat_type, threat_level);
+CREATE INDEX IF NOT EXISTS idx_location1 ON relationships (location1);
+CREATE INDEX IF NOT EXISTS idx_location2 ON relationships (location2);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Flat dataframe column names used by the dashboard, keyed by store column
+FRAME_COLUMNS = {
+    "entity1": "Entity 1",
+    "entity2": "Entity 2",
+    "summary": "Relationship Summary",
+    "confidence": "Confidence Score",
+    "context": "Relevant Context",
+    "threat_level": "Threat Level",
+    "threat_type": "Threat Type",
+    "threat_explanation": "Threat Explanation",
+    "impact_level": "Impact Level",
+    "impact_explanation": "Impact Explanation",
+    "location1": "Origin Location 1",
+    "location2": "Origin Location 2",
+}
+
+COLUMNS = (
+    "id", "entity1", "entity2", "summary", "confidence", "context", "threat_level", "threat_type",
+    "threat_explanation", "impact_level", "impact_explanation", "location1", "location2"
+)
+
+
+def record_to_row(record_id, record):
+    """Flatten a relationship record into a tuple matching COLUMNS."""
+    threat = record.get("Threat Assessment") or {}
+    return (
+        record_id,
+        record.get("Entity 1"),
+        record.get("Entity 2"),
+        record.get("Relationship Summary"),
+        record.get("Confidence Score"),
+        record.get("Relevant Context"),
+        threat.get("Threat Level"),
+        threat.get("Type"),
+        threat.get("Explanation"),
+        threat.get("Impact level on Singapore"),
+        threat.get("Explanation (Singapore)"),
+        record.get("Origin Location 1"),
+        record.get("Origin Location 2"),
+    )
+
+
+def row_to_record(row):
+    """Rebuild the nested relationship record (same shape as the JSON file) from a store row."""
+    return {
+        "Entity 1": row["entity1"],
+        "Entity 2": row["entity2"],
+        "Relationship Summary": row["summary"],
+        "Confidence Score": row["confidence"],
+        "Relevant Context": row["context"],
+        "Threat Assessment": {
+            "Type": row["threat_type"],
+            "Explanation": row["threat_explanation"],
+            "Impact level on Singapore": row["impact_level"],
+            "Explanation (Singapore)": row["impact_explanation"],
+            "Threat Level": row["threat_level"],
+        },
+        "Origin Location 1": row["location1"],
+        "Origin Location 2": row["location2"],
+    }
+
+
+def source_signature(json_path, delta_path=DELTA_LOG_FILE):
+    """Return a string identifying the current version of the source JSON file and the delta log."""
+    stat = os.stat(json_path)
+    signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+    if os.path.exists(delta_path):
+        delta_stat = os.stat(delta_path)
+        signature += f"+{delta_stat.st_size}:{delta_stat.st_mtime_ns}"
+    return signature
+
+
+def read_delta_log(delta_path=DELTA_LOG_FILE):
+    """
+    Return the (record id, record) entries of the delta log in the order they were applied.
+    The id is None for appended records; they are given ids after the JSON file's records on replay.
+    """
+    if not os.path.exists(delta_path):
+        return []
+    with open(delta_path, "r", encoding="utf-8") as f:
+        return [(entry.get("id"), entry["record"]) for entry in map(json.loads, f) if entry]
+
+
+def replay_ids(deltas, first_id):
+    """
+    Give every delta entry its id: replacements keep theirs, appended records take the next free id
+    after first_id (the number of records in the JSON file), so a JSON file that has grown since the
+    delta was applied keeps its new records.
+    """
+    next_id = first_id
+    for record_id, record in deltas:
+        if record_id is None:
+            record_id = next_id
+        next_id = max(next_id, record_id + 1)
+        yield record_id, record
+
+
+def upsert_sql():
+    return f"INSERT OR REPLACE INTO relationships ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+def build_store(json_path=RELATIONSHIPS_FILE, db_path=STORE_FILE, delta_path=DELTA_LOG_FILE):
+    """
+    Build the indexed SQLite store from the cleaned relationships JSON file, then replay the delta log.
+    Any existing store at db_path is replaced.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    deltas = read_delta_log(delta_path)
+
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(upsert_sql(), (record_to_row(i, record) for i, record in enumerate(data)))
+        conn.executemany(upsert_sql(), (record_to_row(i, record) for i, record in replay_ids(deltas, len(data))))
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('source', ?)", (source_signature(json_path, delta_path),)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Swap the finished store in so readers never see a half-built file
+    os.replace(tmp_path, db_path)
+    print(f"Relationship store built with {len(data)} records and {len(deltas)} delta records: {db_path}")
+    return db_path
+
+
+def is_stale(json_path=RELATIONSHIPS_FILE, db_path=STORE_FILE, delta_path=DELTA_LOG_FILE):
+    """Check whether the store is missing or was built from an older version of the JSON file or delta log."""
+    if not os.path.exists(db_path):
+        return True
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    except sqlite3.DatabaseError:
+        return True
+    finally:
+        conn.close()
+    return row is None or row[0] != source_signature(json_path, delta_path)
+
+
+def open_store(json_path=RELATIONSHIPS_FILE, db_path=STORE_FILE, delta_path=DELTA_LOG_FILE):
+    """
+    Open the relationship store, (re)building it first if the JSON file or delta log has changed.
+    The connection can be shared by the Dash callback threads.
+    """
+    if is_stale(json_path, db_path, delta_path):
+        build_store(json_path, db_path, delta_path)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def store_version(conn):
+    """Return the source signature the store was built from, for keying derived caches."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    return row[0] if row else ""
+
+
+def query_relationships(conn, entity=None, pair=None, min_threat_level=None, max_threat_level=None,
+                        threat_type=None, location=None):
+    """
+    Return relationship records matching all of the given filters, in source file order.
+
+    Args:
+        conn: Connection returned by open_store.
+        entity (str): Entity appearing as either Entity 1 or Entity 2.
+        pair (tuple): (Entity 1, Entity 2) pair, matched in that order.
+        min_threat_level (int): Lowest threat level to include.
+        max_threat_level (int): Highest threat level to include.
+        threat_type (str): Threat type to match.
+        location (str): Origin location of either entity.
+    Returns:
+        list: Relationship records shaped like the cleaned JSON file.
+    """
+    clauses = []
+    params = []
+    if entity is not None:
+        clauses.append("(entity1 = ? OR entity2 = ?)")
+        params += [entity, entity]
+    if pair is not None:
+        clauses.append("entity1 = ? AND entity2 = ?")
+        params += list(pair)
+    if min_threat_level is not None:
+        clauses.append("threat_level >= ?")
+        params.append(min_threat_level)
+    if max_threat_level is not None:
+        clauses.append("threat_level <= ?")
+        params.append(max_threat_level)
+    if threat_type is not None:
+        clauses.append("threat_type = ?")
+        params.append(threat_type)
+    if location is not None:
+        clauses.append("(location1 = ? OR location2 = ?)")
+        params += [location, location]
+
+    sql = "SELECT * FROM relationships"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id"
+    return [row_to_record(row) for row in conn.execute(sql, params)]
+
+
+def relationships_for_entities(conn, entities, chunk_size=400):
+    """
+    Return every record in which any of the given entities appears, in source file order.
+    Used to re-aggregate just the part of the graph a delta touched.
+    """
+    entities = list(entities)
+    rows = {}
+    for start in range(0, len(entities), chunk_size):
+        chunk = entities[start:start + chunk_size]
+        marks = ", ".join("?" * len(chunk))
+        for row in conn.execute(
+            f"SELECT * FROM relationships WHERE entity1 IN ({marks}) OR entity2 IN ({marks})", chunk + chunk
+        ):
+            rows[row["id"]] = row
+    return [row_to_record(rows[record_id]) for record_id in sorted(rows)]
+
+
+def apply_delta(conn, records, json_path=RELATIONSHIPS_FILE, delta_path=DELTA_LOG_FILE):
+    """
+    Add or update relationship records in place, without rebuilding the store.
+    A record carrying a "Record ID" (its position in the cleaned JSON file, or an id returned by an
+    earlier delta) replaces that record; any other record is appended with the next free id.
+    The records are also appended to the delta log so a later rebuild keeps them. Appended records are
+    logged without their id and placed after the JSON file's records on rebuild, so ids handed out to
+    appended records only stay valid until the JSON file changes.
+
+    Args:
+        conn: Connection returned by open_store.
+        records (list): Relationship records shaped like the cleaned JSON file.
+    Returns:
+        set: (Entity 1, Entity 2) pairs whose relationships changed, including those of replaced records.
+    """
+    affected = set()
+    entries = []
+    logged = []
+    next_id = (conn.execute("SELECT MAX(id) FROM relationships").fetchone()[0] or -1) + 1
+    for record in records:
+        record = dict(record)
+        record_id = record.pop("Record ID", None)
+        logged.append((record_id, record))
+        if record_id is None:
+            record_id = next_id
+            next_id += 1
+        else:
+            old = conn.execute("SELECT entity1, entity2 FROM relationships WHERE id = ?", (record_id,)).fetchone()
+            if old is not None:
+                affected.add(tuple(old))
+            next_id = max(next_id, record_id + 1)
+        affected.add((record.get("Entity 1"), record.get("Entity 2")))
+        entries.append((record_id, record))
+
+    with open(delta_path, "a", encoding="utf-8") as f:
+        for record_id, record in logged:
+            f.write(json.dumps({"id": record_id, "record": record}, ensure_ascii=False) + "\n")
+    conn.executemany(upsert_sql(), (record_to_row(record_id, record) for record_id, record in entries))
+    conn.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (source_signature(json_path, delta_path),)
+    )
+    conn.commit()
+    return affected
+
+
+def all_relationships(conn):
+    """Return every relationship record in source file order."""
+    return query_relationships(conn)
+
+
+def load_relationships_frame(conn):
+    """
+    Read every relationship as one flat dataframe (one row per record, source file order)
+    with a single columnar query instead of walking the nested JSON records.
+    """
+    frame = pd.read_sql_query(f"SELECT {', '.join(FRAME_COLUMNS)} FROM relationships ORDER BY id", conn)
+    return frame.rename(columns=FRAME_COLUMNS)
+
+
+if __name__ == "__main__":
+    build_store()
@@ -0,0 +1,97 @@
+import gzip
+import hashlib
+import os
+import time
+from flask import Response, jsonify, request
+from instrumentation import peak_rss_mb
+
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 6
+COMPRESSIBLE_TYPES = {"application/json", "text/html", "text/css", "application/javascript", "text/javascript"}
+# Dash routes whose JSON (the layout with its prebuilt figures, and the callback graph) is the same for
+# every request until the data changes: serialized and compressed once per worker, then revalidated by ETag
+STATIC_JSON_ROUTES = ("/_dash-layout", "/_dash-dependencies")
+API_PREFIX = "/api/"
+
+STARTED = time.time()
+
+
+def accepts_gzip():
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def compress(response):
+    """Gzip a text response in place when the client accepts it and it is big enough to be worth it."""
+    if (response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES or not accepts_gzip()):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, COMPRESS_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def install_serving(server, data_version, health_check):
+    """
+    Add response compression, HTTP caching and a /healthz endpoint to the dashboard's Flask server.
+
+    Args:
+        server: The Flask server of the Dash app.
+        data_version (str): Version of the data being served, part of every ETag.
+        health_check (callable): Returns a dict of details for /healthz; raising marks the worker unhealthy.
+    """
+    static_json = {}  # path -> (etag, mimetype, body, gzipped body)
+
+    @server.before_request
+    def serve_static_json():
+        if request.method != "GET" or request.path not in static_json:
+            return None
+        etag, mimetype, body, gzipped = static_json[request.path]
+        use_gzip = accepts_gzip()
+        response = Response(gzipped if use_gzip else body, mimetype=mimetype)
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        response.set_etag(etag)
+        # Always revalidate, so a redeploy with new data is picked up; unchanged pages get a 304
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+    @server.after_request
+    def cache_and_compress(response):
+        if request.method == "GET" and response.status_code == 200 and not response.direct_passthrough:
+            if request.path in STATIC_JSON_ROUTES and request.path not in static_json:
+                body = response.get_data()
+                etag = hashlib.sha1(data_version.encode("utf-8") + body).hexdigest()
+                static_json[request.path] = (etag, response.mimetype, body, gzip.compress(body, COMPRESS_LEVEL))
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = "no-cache"
+            elif request.path.startswith(API_PREFIX) and "ETag" not in response.headers:
+                # Revalidated on every request, since streamed relationships change the answers while the
+                # dashboard runs; the content ETag still turns repeated identical answers into 304s
+                response.add_etag()
+                response.headers["Cache-Control"] = "no-cache"
+                response = response.make_conditional(request)
+        return compress(response)
+
+    @server.route("/healthz")
+    def healthz():
+        try:
+            details = health_check()
+        except Exception as e:
+            response = jsonify({"status": "error", "error": str(e), "pid": os.getpid()})
+            response.status_code = 503
+        else:
+            response = jsonify({
+                "status": "ok",
+                "pid": os.getpid(),
+                "uptime_seconds": round(time.time() - STARTED, 1),
+                "peak_rss_mb": peak_rss_mb(),
+                "data_version": data_version,
+                **details,
+            })
+        response.headers["Cache-Control"] = "no-store"
+        return response
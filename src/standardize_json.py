@@ -1,4 +1,7 @@
 import json
+from instrumentation import get_logger, stage, count, export_metrics
+
+log = get_logger("standardize_json")
 
 def clean_values(record):
     """
@@ -30,21 +33,25 @@ def clean_json_data(input_file, output_file):
             data = json.load(f)
 
         # Clean each entry in the data
-        for entry in data:
-            clean_values(entry)
+        with stage("standardize_json"):
+            for entry in data:
+                clean_values(entry)
+            count("standardize_json", "items", len(data))
 
         # Write the cleaned data to the output JSON file
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
 
-        print(f"Cleaned JSON file saved to: {output_file}")
+        log.info("Cleaned JSON file saved to: %s", output_file)
 
     except Exception as e:
-        print(f"Error processing file: {e}")
+        log.error("Error processing file: %s", e)
 
-# File paths
-input_file = "../processed_data/extracted_relationships.json"
-output_file = "../processed_data/cleaned_extracted_relationships.json"
+if __name__ == "__main__":
+    # File paths
+    input_file = "../processed_data/extracted_relationships.json"
+    output_file = "../processed_data/cleaned_extracted_relationships.json"
 
-# Run the cleaning script
-clean_json_data(input_file, output_file)
+    # Run the cleaning script
+    clean_json_data(input_file, output_file)
+    export_metrics("standardize_json")
@@ -0,0 +1,226 @@
+import argparse
+import os
+import shutil
+import time
+from collections import defaultdict
+import pandas as pd
+from instrumentation import get_logger, stage, count, export_metrics
+from relationship_store import open_store, apply_delta, store_version
+from graph_incremental import read_json, update_graph_data
+from text_search import read_index, update_index, save_index, SEARCH_INDEX_DIR
+from near_duplicates import find_duplicate_clusters
+from clean_entities import clean_entities, filter_redundant_entities
+from standardize_json import clean_values
+from extract_entities import extract_entities_bert
+from model_registry import warm_up
+from pair_triage import load_triage_model, entity_info_from, worth_extracting
+
+log = get_logger("stream_ingest")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SPOOL_DIR = os.path.join(BASE_DIR, "..", "processed_data", "spool")
+GRAPH_DATA_DIR = os.path.join(BASE_DIR, "assets", "graph_data")
+
+SPOOL_EXTENSIONS = (".txt", ".csv", ".xlsx")
+NEWS_TEXT_COLUMN = "Text"  # Same column preprocess.py reads from the news Excel file
+BATCH_SIZE = 20  # Spool files per micro-batch
+POLL_SECONDS = 2.0
+SETTLE_SECONDS = 1.0  # A file must be this old before it is picked up, so half-written files are left alone
+
+# Fields every relationship must have to be added to the store (the local model can return partial answers)
+REQUIRED_FIELDS = ("Entity 1", "Entity 2", "Relationship Summary")
+
+
+def relationship_backend(local=False):
+    """The relationship extraction script to use: the OpenAI one, or the local model with local=True."""
+    if local:
+        import extract_relationships_Local as backend
+        warm_up("relationship_llm")
+    else:
+        import extract_relationships_API as backend
+    return backend
+
+
+def ready_files(spool_dir, limit):
+    """Spool files that have finished being written, oldest first, at most limit of them."""
+    now = time.time()
+    files = [
+        os.path.join(spool_dir, name) for name in os.listdir(spool_dir)
+        if name.endswith(SPOOL_EXTENSIONS) and os.path.isfile(os.path.join(spool_dir, name))
+    ]
+    files = [path for path in files if now - os.path.getmtime(path) >= SETTLE_SECONDS]
+    return sorted(files, key=os.path.getmtime)[:limit]
+
+
+def read_spool_file(path):
+    """
+    Turn a spool file into documents: a .txt file is one document, and each non-empty "Text" cell
+    of a .csv or .xlsx file (news rows, as in the news Excel file) is one.
+
+    Returns:
+        list: (name, text) pairs, named like the preprocessed news files.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if path.endswith(".txt"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [(f"news_row_{stem}_text.txt", f.read())]
+    df = pd.read_csv(path) if path.endswith(".csv") else pd.read_excel(path)
+    if NEWS_TEXT_COLUMN not in df.columns:
+        raise KeyError(f"Column '{NEWS_TEXT_COLUMN}' not found in {path}.")
+    return [
+        (f"news_row_{stem}_{index}_text.txt", text)
+        for index, text in df[NEWS_TEXT_COLUMN].items() if pd.notna(text) and str(text).strip()
+    ]
+
+
+def extract_batch_relationships(documents, entities, backend, triage=None):
+    """
+    Run relationship extraction on every entity pair of every document, as extract_relationships_API.py does,
+    skipping the pairs the triage model rejects.
+    """
+    texts = dict(documents)
+    entity_info = entity_info_from(entities)
+    grouped_entities = defaultdict(list)
+    for entity in entities:
+        grouped_entities[entity["filename"]].append(entity["text"])
+    records = []
+    for filename, entity_list in grouped_entities.items():
+        entity_pairs = [(e1, e2) for i, e1 in enumerate(entity_list) for e2 in entity_list[i + 1:] if e1 != e2]
+        for entity1, entity2 in entity_pairs:
+            relevant_text = backend.extract_relevant_sentences(texts[filename], entity1, entity2)
+            if not relevant_text.strip():
+                continue
+            if not worth_extracting(triage, entity1, entity2, relevant_text, entity_info):
+                count("stream_relationships", "triage_skipped")
+                continue
+            result = backend.extract_relationship(entity1, entity2, relevant_text)
+            if "Error" in result or any(not result.get(field) for field in REQUIRED_FIELDS):
+                count("stream_relationships", "errors")
+                continue
+            records.append(result)
+    return records
+
+
+def ingest_batch(paths, conn, backend, triage=None, graph_dir=GRAPH_DATA_DIR, index_dir=SEARCH_INDEX_DIR):
+    """
+    Take one micro-batch of spool files through the whole pipeline and append the results: text
+    extraction, NER, entity cleaning, relationship extraction and standardization, then the relationship
+    store (through apply_delta, so full rebuilds keep the records), the graph_data files and the search index.
+    The texts are not added to processed_data/news_texts, so a later batch run does not extract them again;
+    the spool files themselves are kept in spool/done.
+
+    Returns:
+        dict: Counts for the batch and its end-to-end latency in seconds.
+    """
+    start = time.perf_counter()
+    with stage("stream_text"):
+        documents = [document for path in paths for document in read_spool_file(path)]
+        # Reposts within the batch go through the models once
+        clusters = find_duplicate_clusters([name for name, _ in documents], [text for _, text in documents]) if documents else []
+        skipped = {member for cluster in clusters for member in cluster["members"] if member != cluster["representative"]}
+        count("stream_text", "items", len(documents))
+
+    with stage("stream_ner"):
+        entities = [entity for name, text in documents if name not in skipped for entity in extract_entities_bert(text, name)]
+        count("stream_ner", "items", len(documents) - len(skipped))
+
+    with stage("stream_clean"):
+        # Per document, so an entity already seen elsewhere in the batch still pairs up within its own text
+        by_document = defaultdict(list)
+        for entity in entities:
+            by_document[entity["filename"]].append(entity)
+        entities = [
+            entity for document_entities in by_document.values()
+            for entity in filter_redundant_entities(clean_entities(document_entities))[0]
+        ]
+        count("stream_clean", "items", len(entities))
+
+    with stage("stream_relationships"):
+        records = extract_batch_relationships(documents, entities, backend, triage)
+        for record in records:
+            clean_values(record)
+        count("stream_relationships", "items", len(records))
+
+    graph_files = []
+    if records:
+        with stage("stream_store"):
+            # graph_data can only be patched if it was generated from the store as it is before this batch
+            graph_up_to_date = read_json(os.path.join(graph_dir, "nodes.json"), {}).get("version") == store_version(conn)
+            affected = apply_delta(conn, records)
+            count("stream_store", "items", len(records))
+        with stage("stream_graph"):
+            if graph_up_to_date:
+                graph_files = update_graph_data(conn, affected, graph_dir)
+            else:
+                log.warning("%s was not generated from the current store; run nodeGenerator2.0.py to rebuild it.", graph_dir)
+        with stage("stream_search"):
+            index = read_index(index_dir)
+            if update_index(index, conn):
+                save_index(index, index_dir)
+
+    return {
+        "files": len(paths),
+        "documents": len(documents),
+        "duplicates": len(skipped),
+        "entities": len(entities),
+        "relationships": len(records),
+        "graph_files": len(graph_files),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def finish(path, spool_dir, outcome):
+    """Move a processed spool file to spool/done or spool/failed."""
+    target_dir = os.path.join(spool_dir, outcome)
+    os.makedirs(target_dir, exist_ok=True)
+    shutil.move(path, os.path.join(target_dir, os.path.basename(path)))
+
+
+def watch(spool_dir=SPOOL_DIR, batch_size=BATCH_SIZE, poll_seconds=POLL_SECONDS, local=False, once=False):
+    """
+    Poll the spool directory and ingest new files in micro-batches until interrupted
+    (or until the spool is empty with once=True).
+    """
+    os.makedirs(spool_dir, exist_ok=True)
+    warm_up("ner")
+    backend = relationship_backend(local)
+    triage = load_triage_model()
+    conn = open_store()
+    log.info("Watching %s for %s files (batches of up to %d).", spool_dir, ", ".join(SPOOL_EXTENSIONS), batch_size)
+    try:
+        while True:
+            paths = ready_files(spool_dir, batch_size)
+            if not paths:
+                if once:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            try:
+                summary = ingest_batch(paths, conn, backend, triage)
+            except Exception:
+                log.exception("Batch of %d files failed; moved to %s", len(paths), os.path.join(spool_dir, "failed"))
+                count("stream_batches", "errors")
+                outcome = "failed"
+            else:
+                log.info("Ingested %(files)d files: %(documents)d documents (%(duplicates)d duplicates), "
+                         "%(entities)d entities, %(relationships)d relationships, %(graph_files)d graph files "
+                         "updated in %(seconds).2fs", summary)
+                count("stream_batches", "items")
+                outcome = "done"
+            for path in paths:
+                finish(path, spool_dir, outcome)
+    except KeyboardInterrupt:
+        log.info("Stopped.")
+    finally:
+        export_metrics("stream_ingest")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest news files dropped into a spool directory in micro-batches.")
+    parser.add_argument("--spool", default=SPOOL_DIR, help="directory to watch for .txt, .csv and .xlsx files")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="files per micro-batch")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between checks of an empty spool")
+    parser.add_argument("--local", action="store_true", help="extract relationships with the local model instead of the API")
+    parser.add_argument("--once", action="store_true", help="stop when the spool is empty")
+    args = parser.parse_args()
+    watch(args.spool, args.batch_size, args.poll, args.local, args.once)
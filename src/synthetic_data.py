@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROCESSED_DIR = os.path.join(BASE_DIR, "..", "processed_data")
+
+# The shipped dataset is scale 1: its size and distributions are what the generator reproduces
+SOURCE_ENTITIES = os.path.join(PROCESSED_DIR, "combined_entities.json")
+SOURCE_RELATIONSHIPS = os.path.join(PROCESSED_DIR, "cleaned_extracted_relationships.json")
+
+POPULARITY_EXPONENT = 0.6  # Zipf exponent of how often an entity is mentioned; a few recur, most are rare
+MIN_SCORE = 0.80  # clean_entities' default score threshold
+NAME_SUFFIXES = ("Group", "Holdings", "International", "Network", "Foundation", "Trading", "Partners", "Services")
+
+
+def load_profile(entities_path=SOURCE_ENTITIES, relationships_path=SOURCE_RELATIONSHIPS):
+    """Read the distributions of the shipped data that synthetic corpora are drawn from."""
+    with open(entities_path, "r", encoding="utf-8") as f:
+        entities = json.load(f)
+    with open(relationships_path, "r", encoding="utf-8") as f:
+        relationships = json.load(f)
+    per_file = {}
+    labels = {}
+    for entity in entities:
+        per_file[entity["filename"]] = per_file.get(entity["filename"], 0) + 1
+        labels.setdefault(entity["text"], entity["label"])
+    return {
+        "documents": len(per_file),
+        "news_share": sum(name.startswith("news_row") for name in per_file) / len(per_file),
+        "entities_per_document": np.array(list(per_file.values())),
+        "names": list(labels),
+        "labels": labels,
+        "scores": np.array([entity["score"] for entity in entities]),
+        "relationships": [r for r in relationships if r.get("Entity 1") and r.get("Entity 2") and r.get("Relevant Context")],
+        "relationship_count": len(relationships),
+    }
+
+
+def entity_pool(profile, size, rng):
+    """
+    size distinct entity names: the shipped names first, then new ones made by recombining their words
+    (and a suffix when that is not enough), so names keep realistic lengths and acronym patterns.
+    """
+    names = list(profile["names"][:size])
+    seen = set(names)
+    words = [name.split() for name in profile["names"] if name.split()]
+    while len(names) < size:
+        first, second = words[rng.integers(len(words))], words[rng.integers(len(words))]
+        name = " ".join(first[:1] + second[1:] or second)
+        if name in seen:
+            name = f"{name} {NAME_SUFFIXES[rng.integers(len(NAME_SUFFIXES))]} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    labels = [profile["labels"].get(name) or ("ORG" if rng.random() < 0.56 else "PER") for name in names]
+    return names, labels
+
+
+def substitute(text, replacements):
+    """Replace the template record's entity names with the synthetic ones."""
+    for old, new in replacements.items():
+        if old and text:
+            text = re.sub(re.escape(old), lambda _: new, text)
+    return text
+
+
+def fill_template(template, entity1, entity2):
+    """A relationship record shaped like the template, about entity1 and entity2 instead."""
+    replacements = {template["Entity 1"]: entity1, template["Entity 2"]: entity2}
+    record = json.loads(json.dumps(template))
+    record["Entity 1"], record["Entity 2"] = entity1, entity2
+    for key in ("Relationship Summary", "Relevant Context"):
+        record[key] = substitute(record.get(key), replacements)
+    assessment = record.get("Threat Assessment") or {}
+    for key in ("Explanation", "Explanation (Singapore)"):
+        if isinstance(assessment.get(key), str):
+            assessment[key] = substitute(assessment[key], replacements)
+    return record
+
+
+def raw_values(value):
+    """Undo standardize_json: missing values back to the "Unknown" the LLM returns."""
+    if isinstance(value, dict):
+        return {key: raw_values(item) for key, item in value.items()}
+    return "Unknown" if value is None else value
+
+
+def generate_corpus(output_dir, scale=1.0, seed=0, profile=None):
+    """
+    Write a synthetic processed_data folder scale times the size of the shipped one: news_texts/ and
+    wikileaks_texts/ documents, combined_entities.json (NER output), cleaned_filtered_entities.json,
+    extracted_relationships.json (raw LLM answers) and cleaned_extracted_relationships.json.
+
+    Entities per document, NER labels and scores, the news/wikileaks split and every relationship field
+    (threat levels and types, locations, text lengths) follow the shipped data; entity mentions follow a
+    Zipf distribution so some entities recur across many documents. Document texts are built from
+    relationship contexts about the document's own entities, so the pairs co-occur in sentences.
+
+    Args:
+        output_dir (str): The processed_data folder to create.
+        scale (float): Size relative to the shipped dataset (1 = about 1,500 documents and 4,200 relationships).
+        seed (int): Random seed; the same seed and scale give the same corpus.
+    Returns:
+        dict: Counts of what was written.
+    """
+    rng = np.random.default_rng(seed)
+    profile = profile or load_profile()
+    templates = profile["relationships"]
+    n_documents = max(1, int(round(profile["documents"] * scale)))
+    names, labels = entity_pool(profile, max(2, int(round(len(profile["names"]) * scale))), rng)
+    popularity = 1.0 / np.arange(1, len(names) + 1) ** POPULARITY_EXPONENT
+    popularity /= popularity.sum()
+    # Popular entities should not all be the shipped names, which come first in the pool
+    popularity = popularity[rng.permutation(len(names))]
+    cumulative = np.cumsum(popularity)
+
+    news_dir = os.path.join(output_dir, "news_texts")
+    wikileaks_dir = os.path.join(output_dir, "wikileaks_texts")
+    os.makedirs(news_dir, exist_ok=True)
+    os.makedirs(wikileaks_dir, exist_ok=True)
+
+    combined, cleaned, cleaned_names, documents = [], [], set(), []
+    for i in range(n_documents):
+        size = max(2, int(rng.choice(profile["entities_per_document"])))
+        # Weighted draws through the cumulative distribution (rng.choice with p is O(pool) per call);
+        # repeats are dropped, so a document can end up with fewer entities than drawn, as after NER dedup
+        draws = np.minimum(np.searchsorted(cumulative, rng.random(size)), len(names) - 1)
+        members = np.array(list(dict.fromkeys(draws.tolist())))
+        if len(members) < 2:
+            members = np.array([members[0], (members[0] + 1) % len(names)])
+        is_news = rng.random() < profile["news_share"]
+        filename = f"news_row_{i}_text.txt" if is_news else f"{i}.pdf_text.txt"
+        # One context sentence group per entity, pairing it with the next entity of the document
+        text = " ".join(
+            fill_template(templates[rng.integers(len(templates))], names[a], names[b])["Relevant Context"]
+            for a, b in zip(members, np.roll(members, -1))
+        )
+        with open(os.path.join(news_dir if is_news else wikileaks_dir, filename), "w", encoding="utf-8") as f:
+            f.write(text)
+        for member in members:
+            entity = {"text": names[member], "label": labels[member],
+                      "score": float(rng.choice(profile["scores"])), "filename": filename}
+            combined.append(entity)
+            # Cheap stand-in for clean_entities: first confident mention of each name
+            if (entity["score"] >= MIN_SCORE and entity["text"] not in cleaned_names
+                    and not (entity["label"] == "PER" and " " not in entity["text"])):
+                cleaned_names.add(entity["text"])
+                cleaned.append(dict(entity))
+        documents.append(members)
+
+    # Relationships come from entity pairs of the same document, more often from documents with more entities
+    n_relationships = max(1, int(round(profile["relationship_count"] * scale)))
+    weights = np.array([len(members) * (len(members) - 1) for members in documents], dtype=float)
+    picks = rng.choice(len(documents), size=n_relationships, p=weights / weights.sum())
+    relationships = []
+    for document in picks:
+        a, b = rng.choice(documents[document], size=2, replace=False)
+        relationships.append(fill_template(templates[rng.integers(len(templates))], names[a], names[b]))
+
+    outputs = {
+        "combined_entities.json": combined,
+        "cleaned_filtered_entities.json": cleaned,
+        "extracted_relationships.json": [raw_values(record) for record in relationships],
+        "cleaned_extracted_relationships.json": relationships,
+    }
+    for name, payload in outputs.items():
+        with open(os.path.join(output_dir, name), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+    return {"documents": n_documents, "entities": len(combined), "distinct_entities": len(cleaned_names),
+            "relationships": n_relationships}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic processed_data folder for benchmarks.")
+    parser.add_argument("output_dir", help="folder to write (e.g. /tmp/sentinel_10x/processed_data)")
+    parser.add_argument("--scale", type=float, default=1.0, help="size relative to the shipped dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate_corpus(args.output_dir, args.scale, args.seed))
@@ -0,0 +1,401 @@
+import json
+import os
+import re
+import zlib
+import numpy as np
+import scipy.sparse as sp
+from relationship_store import BASE_DIR, open_store, store_version
+from model_registry import register, get_model
+
+SEARCH_INDEX_DIR = os.path.join(BASE_DIR, "..", "processed_data", "search_index")
+
+# Store columns that are searched; the summary is counted twice so a match there outranks one in the context
+SEARCH_FIELDS = ("summary", "summary", "context", "threat_explanation", "impact_explanation")
+BM25_K1 = 1.2
+BM25_B = 0.75
+COMPACT_RATIO = 0.25  # Drop replaced documents from the index once they make up this share of it
+MAX_RESULTS = 100
+
+# Optional semantic search: only used when sentence-transformers and hnswlib are installed
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+RRF_K = 60  # Reciprocal rank fusion constant for combining keyword and semantic rankings
+
+STOPWORDS = set("""
+a an and are as at be been but by for from had has have he her his in into is it its of on or that the their them
+they this to was were which who will with not no s
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def document_rows(conn):
+    """Yield (id, searchable text, threat level, threat type) for every record in the store."""
+    sql = f"SELECT id, {', '.join(dict.fromkeys(SEARCH_FIELDS))}, threat_level, threat_type FROM relationships ORDER BY id"
+    for row in conn.execute(sql):
+        text = " ".join(row[field] or "" for field in SEARCH_FIELDS)
+        yield row["id"], text, row["threat_level"], row["threat_type"]
+
+
+def empty_index():
+    return {
+        "version": None,
+        "vocabulary": {},
+        "record_ids": np.zeros(0, dtype=np.int64),
+        "hashes": np.zeros(0, dtype=np.int64),
+        "alive": np.zeros(0, dtype=bool),
+        "threat_levels": np.zeros(0, dtype=np.int64),
+        "threat_types": [],
+        # Term frequencies, terms x documents
+        "tf": sp.csr_matrix((0, 0), dtype=np.float32),
+        "vectors": None,
+    }
+
+
+def add_documents(index, documents):
+    """
+    Append documents (id, text, threat level, threat type) as new columns of the term frequency matrix.
+    Older versions of the same records must already be marked dead.
+    """
+    if not documents:
+        return
+    vocabulary = index["vocabulary"]
+    rows, cols = [], []
+    first = index["tf"].shape[1]
+    for offset, (_, text, _, _) in enumerate(documents):
+        for token in tokenize(text):
+            rows.append(vocabulary.setdefault(token, len(vocabulary)))
+            cols.append(first + offset)
+    shape = (len(vocabulary), first + len(documents))
+    block = sp.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, np.array(cols, dtype=np.int64) - first)),
+        shape=(shape[0], len(documents))
+    )
+    tf = index["tf"]
+    tf.resize((shape[0], first))
+    index["tf"] = sp.hstack([tf, block], format="csr")
+    index["record_ids"] = np.concatenate([index["record_ids"], [doc[0] for doc in documents]]).astype(np.int64)
+    index["hashes"] = np.concatenate([index["hashes"], [zlib.crc32(doc[1].encode("utf-8")) for doc in documents]]).astype(np.int64)
+    index["alive"] = np.concatenate([index["alive"], np.ones(len(documents), dtype=bool)])
+    index["threat_levels"] = np.concatenate([index["threat_levels"], [doc[2] or 0 for doc in documents]]).astype(np.int64)
+    index["threat_types"] = index["threat_types"] + [doc[3] for doc in documents]
+
+
+def compact(index):
+    """Drop the columns of replaced documents."""
+    keep = np.flatnonzero(index["alive"])
+    index["tf"] = index["tf"][:, keep].tocsr()
+    for key in ("record_ids", "hashes", "alive", "threat_levels"):
+        index[key] = index[key][keep]
+    index["threat_types"] = [index["threat_types"][i] for i in keep]
+
+
+def update_index(index, conn):
+    """
+    Bring an index up to date with the store, tokenizing only records that are new or whose text changed
+    (records replaced through relationship_store.apply_delta). Replaced documents are marked dead and
+    re-added; the index is compacted once dead documents pass COMPACT_RATIO.
+
+    Returns:
+        int: Number of documents (re)indexed (every document when the semantic vectors were built from scratch).
+    """
+    version = store_version(conn)
+    # Semantic search installed after the index was built (or its vectors file lost): embed every document
+    build_vectors = index["vectors"] is None and semantic_available()
+    if index["version"] == version and not build_vectors:
+        return 0
+    position = {int(record_id): i for i, record_id in enumerate(index["record_ids"]) if index["alive"][i]}
+    changed = []
+    current = []
+    for record_id, text, threat_level, threat_type in document_rows(conn):
+        if build_vectors:
+            current.append((record_id, text, threat_level, threat_type))
+        i = position.pop(record_id, None)
+        if i is not None and index["hashes"][i] == zlib.crc32(text.encode("utf-8")):
+            continue
+        if i is not None:
+            index["alive"][i] = False
+        changed.append((record_id, text, threat_level, threat_type))
+    # Records no longer in the store
+    for i in position.values():
+        index["alive"][i] = False
+
+    add_documents(index, changed)
+    if len(index["alive"]) and (~index["alive"]).mean() > COMPACT_RATIO:
+        compact(index)
+    if build_vectors:
+        update_vectors(index, current)
+    elif index["vectors"] is not None:
+        update_vectors(index, changed)
+    index["version"] = version
+    index.pop("weights", None)
+    index.pop("type_array", None)
+    return len(current) if build_vectors else len(changed)
+
+
+def bm25_weights(index):
+    """
+    Precompute the BM25 weight of every (term, document) posting, so a query is just a sum of rows.
+    Dead documents get zero weight and do not count towards document frequencies or lengths.
+    """
+    if "weights" in index:
+        return index["weights"]
+    tf = index["tf"].tocsr()
+    alive = index["alive"].astype(np.float32)
+    doc_lengths = np.asarray(tf.sum(axis=0)).ravel() * alive
+    alive_count = max(alive.sum(), 1.0)
+    average_length = max(doc_lengths.sum() / alive_count, 1.0)
+
+    cols = tf.indices
+    live = alive[cols]
+    df = np.bincount(np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr)), weights=live, minlength=tf.shape[0])
+    idf = np.log(1.0 + (alive_count - df + 0.5) / (df + 0.5)).astype(np.float32)
+    rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+    norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_lengths[cols] / average_length)
+    data = idf[rows] * tf.data * (BM25_K1 + 1.0) / (tf.data + norm) * live
+    index["weights"] = sp.csr_matrix((data.astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+    return index["weights"]
+
+
+def filter_mask(index, min_threat_level=None, threat_type=None):
+    mask = index["alive"].copy()
+    if min_threat_level is not None:
+        mask &= index["threat_levels"] >= min_threat_level
+    if threat_type is not None:
+        if "type_array" not in index:
+            index["type_array"] = np.array(index["threat_types"], dtype=object)
+        mask &= index["type_array"] == threat_type
+    return mask
+
+
+def bm25_search(index, query, limit=10, mask=None):
+    """Top documents for a keyword query by BM25. Returns (document positions, scores), best first."""
+    term_ids = [index["vocabulary"][token] for token in tokenize(query) if token in index["vocabulary"]]
+    if not term_ids or not len(index["record_ids"]):
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    # Repeated query terms are counted once per occurrence, as in the rows of a sparse sum
+    scores = np.asarray(bm25_weights(index)[term_ids].sum(axis=0)).ravel()
+    if mask is not None:
+        scores = np.where(mask, scores, 0.0)
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > limit:
+        candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order, scores[order]
+
+
+def semantic_available():
+    try:
+        import hnswlib  # noqa: F401
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_encoder():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+
+register("sentence_encoder", load_encoder)
+
+
+def update_vectors(index, documents):
+    """Add sentence embeddings of new or changed documents to the HNSW index (keyed by record id)."""
+    import hnswlib
+    encoder = get_model("sentence_encoder")
+    vectors = index["vectors"]
+    if vectors is None:
+        vectors = hnswlib.Index(space="cosine", dim=encoder.get_sentence_embedding_dimension())
+        vectors.init_index(max_elements=max(1024, len(documents)), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        index["vectors"] = vectors
+    if not documents:
+        return
+    if vectors.get_current_count() + len(documents) > vectors.get_max_elements():
+        vectors.resize_index(2 * (vectors.get_current_count() + len(documents)))
+    embeddings = encoder.encode([doc[1] for doc in documents], batch_size=64, normalize_embeddings=True)
+    # Adding an id that is already present overwrites its old vector
+    vectors.add_items(embeddings, [doc[0] for doc in documents])
+
+
+def semantic_search(index, query, limit=10, mask=None):
+    """Nearest documents by sentence embedding. Returns document positions, best first."""
+    vectors = index["vectors"]
+    if vectors is None or not vectors.get_current_count():
+        return np.zeros(0, dtype=np.int64)
+    embedding = get_model("sentence_encoder").encode([query], normalize_embeddings=True)
+    vectors.set_ef(max(HNSW_EF_SEARCH, limit))
+    position = {int(record_id): i for i, record_id in enumerate(index["record_ids"]) if index["alive"][i]}
+    labels, _ = vectors.knn_query(embedding, k=min(limit * 4 if mask is not None else limit, vectors.get_current_count()))
+    hits = [position[int(label)] for label in labels[0] if int(label) in position]
+    if mask is not None:
+        hits = [i for i in hits if mask[i]]
+    return np.array(hits[:limit], dtype=np.int64)
+
+
+def search(index, query, limit=10, min_threat_level=None, threat_type=None, semantic=True):
+    """
+    Search relationship summaries, contexts and threat explanations.
+    Keyword (BM25) results are fused with semantic nearest neighbours by reciprocal rank when the
+    optional embedding index is available.
+
+    Args:
+        index (dict): Index from load_index / build_index.
+        query (str): Free-text query.
+        limit (int): Number of results (clamped to MAX_RESULTS).
+        min_threat_level (int): Only records at or above this threat level.
+        threat_type (str): Only records of this threat type.
+        semantic (bool): Use the embedding index if it exists.
+    Returns:
+        list: (record id, score) pairs, best first.
+    """
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    mask = filter_mask(index, min_threat_level, threat_type) if min_threat_level is not None or threat_type else None
+    keyword_hits, keyword_scores = bm25_search(index, query, limit, mask)
+    if not semantic or index["vectors"] is None:
+        return [(int(index["record_ids"][i]), round(float(s), 4)) for i, s in zip(keyword_hits, keyword_scores)]
+
+    fused = {}
+    for ranking in (keyword_hits, semantic_search(index, query, limit, mask)):
+        for rank, i in enumerate(ranking):
+            fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (RRF_K + rank + 1)
+    best = sorted(fused.items(), key=lambda item: -item[1])[:limit]
+    return [(int(index["record_ids"][i]), round(score, 4)) for i, score in best]
+
+
+def replace_file(path, write):
+    """Write a file through write(tmp_path) next to its target, then swap it in."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_index(index, index_dir=SEARCH_INDEX_DIR):
+    """
+    Save the index as index.npz (term frequencies and documents), meta.json (vocabulary and threat types)
+    and, with semantic search, a vectors file named after the version. Each file is swapped in whole and
+    carries the index version; read_index only accepts a set of files with matching versions.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    version = index["version"] or ""
+    tf = index["tf"].tocsr()
+
+    def write_arrays(path):
+        # Through a file object, since np.savez would add ".npz" to the temporary name
+        with open(path, "wb") as f:
+            np.savez(
+                f, version=np.array(version),
+                tf_data=tf.data, tf_indices=tf.indices, tf_indptr=tf.indptr, tf_shape=np.array(tf.shape),
+                record_ids=index["record_ids"], hashes=index["hashes"], alive=index["alive"],
+                threat_levels=index["threat_levels"]
+            )
+
+    replace_file(os.path.join(index_dir, "index.npz"), write_arrays)
+    vectors_name = None
+    if index["vectors"] is not None:
+        vectors_name = f"vectors_{zlib.crc32(version.encode('utf-8')):08x}.hnsw"
+        replace_file(os.path.join(index_dir, vectors_name), index["vectors"].save_index)
+
+    def write_meta(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "vocabulary": list(index["vocabulary"]),
+                       "threat_types": index["threat_types"], "vectors": vectors_name}, f, ensure_ascii=False)
+
+    replace_file(os.path.join(index_dir, "meta.json"), write_meta)
+    # Vectors of earlier versions, and the files of the old layout
+    for name in os.listdir(index_dir):
+        if name != vectors_name and (name.endswith(".hnsw") or name in ("tf.npz", "documents.npz")):
+            try:
+                os.remove(os.path.join(index_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def read_index(index_dir=SEARCH_INDEX_DIR, attempts=3):
+    """
+    Read a saved index, or return an empty one if there is none. A reader that catches a writer between
+    files (meta.json and index.npz of different versions) tries again, then starts from an empty index.
+    """
+    meta_path = os.path.join(index_dir, "meta.json")
+    index_path = os.path.join(index_dir, "index.npz")
+    for _ in range(attempts):
+        if not os.path.exists(meta_path) or not os.path.exists(index_path):
+            return empty_index()
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(index_path) as saved:
+            saved = dict(saved)
+        if str(saved["version"]) == meta["version"]:
+            break
+    else:
+        return empty_index()
+    index = {
+        "version": meta["version"],
+        "vocabulary": {term: i for i, term in enumerate(meta["vocabulary"])},
+        "tf": sp.csr_matrix((saved["tf_data"], saved["tf_indices"], saved["tf_indptr"]), shape=tuple(saved["tf_shape"])),
+        "threat_types": meta["threat_types"],
+        "vectors": None,
+        **{key: saved[key] for key in ("record_ids", "hashes", "alive", "threat_levels")},
+    }
+    vectors_path = os.path.join(index_dir, meta["vectors"]) if meta.get("vectors") else None
+    if vectors_path and semantic_available():
+        import hnswlib
+        vectors = hnswlib.Index(space="cosine", dim=get_model("sentence_encoder").get_sentence_embedding_dimension())
+        try:
+            vectors.load_index(vectors_path)
+        except RuntimeError:
+            # Removed by a newer save since meta.json was read; update_index embeds every document again
+            pass
+        else:
+            index["vectors"] = vectors
+    return index
+
+
+def load_index(conn=None, index_dir=SEARCH_INDEX_DIR, save=True):
+    """
+    Return the search index for the current relationship store: the saved index, updated in place
+    with any records added or changed since it was saved.
+
+    Args:
+        save (bool): Write the updated index back. Readers that run alongside a writer (the dashboard
+            workers, next to stream_ingest.py) pass False and keep their update in memory.
+    """
+    conn = conn or open_store()
+    index = read_index(index_dir)
+    if update_index(index, conn) and save:
+        save_index(index, index_dir)
+    bm25_weights(index)
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Search relationship summaries, contexts and threat explanations.")
+    parser.add_argument("query", nargs="?", help="text to search for (omit to just build the index)")
+    parser.add_argument("-k", type=int, default=10, help="number of results")
+    parser.add_argument("--min-threat-level", type=int)
+    parser.add_argument("--keyword-only", action="store_true", help="skip the semantic index")
+    args = parser.parse_args()
+
+    conn = open_store()
+    start = time.perf_counter()
+    index = load_index(conn)
+    print(f"Index of {int(index['alive'].sum())} relationships, {len(index['vocabulary'])} terms "
+          f"({'with' if index['vectors'] is not None else 'without'} semantic vectors) in {time.perf_counter() - start:.2f}s")
+    if args.query:
+        start = time.perf_counter()
+        hits = search(index, args.query, args.k, args.min_threat_level, semantic=not args.keyword_only)
+        print(f"{len(hits)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for record_id, score in hits:
+            row = conn.execute("SELECT entity1, entity2, summary FROM relationships WHERE id = ?", (record_id,)).fetchone()
+            print(f"{score:8.3f}  {row['entity1']} & {row['entity2']}: {row['summary']}")
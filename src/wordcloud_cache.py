@@ -0,0 +1,154 @@
+import base64
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from wordcloud import WordCloud
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "..", "processed_data", "wordcloud_cache")
+
+MEMORY_CACHE_SIZE = 128  # Rendered PNGs kept in memory (~100 KB each)
+# PNGs kept on disk; the least recently used go first, so renders for older data versions age out
+DISK_CACHE_SIZE = 2000
+RENDER_WORKERS = 2  # Background threads doing the actual WordCloud rendering
+
+_memory_cache = OrderedDict()
+_in_flight = {}
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="wordcloud")
+
+
+def cache_key(entity_1, entity_2, version=""):
+    """Return a filesystem-safe key for an entity pair and data version."""
+    return hashlib.sha1(f"{version}\x00{entity_1}\x00{entity_2}".encode("utf-8")).hexdigest()
+
+
+def render_wordcloud(text, entity_1, entity_2):
+    """
+    Render the word cloud PNG for a pair's text, with the entity names themselves removed.
+    Returns None if no text is left to draw.
+    """
+    text = re.sub(r'\b' + re.escape(entity_1) + r'\b', '', text)
+    text = re.sub(r'\b' + re.escape(entity_2) + r'\b', '', text)
+    if not text.strip():
+        return None
+
+    wordcloud = WordCloud(width=800, height=400, background_color='black', colormap='viridis').generate(text)
+    img = io.BytesIO()
+    wordcloud.to_image().save(img, format='PNG')
+    return img.getvalue()
+
+
+def _remember(key, png):
+    """Store a rendered PNG in the bounded in-memory LRU cache."""
+    with _lock:
+        _memory_cache[key] = png
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _prune_disk_cache():
+    """Delete the least recently used PNGs beyond DISK_CACHE_SIZE."""
+    entries = []
+    for entry in os.scandir(CACHE_DIR):
+        if entry.name.endswith(".png"):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+    if len(entries) <= DISK_CACHE_SIZE:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - DISK_CACHE_SIZE]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _render_and_store(key, entity_1, entity_2, load_text):
+    """Load, render and cache a pair's word cloud (runs on the render pool)."""
+    disk_path = os.path.join(CACHE_DIR, f"{key}.png")
+    try:
+        with open(disk_path, "rb") as f:
+            png = f.read()
+        # Mark it recently used, so pruning keeps it
+        os.utime(disk_path)
+    except FileNotFoundError:
+        text = load_text(entity_1, entity_2)
+        png = render_wordcloud(text, entity_1, entity_2) if text.strip() else None
+        if png is not None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png)
+            os.replace(tmp_path, disk_path)
+            _prune_disk_cache()
+    _remember(key, png)
+    return png
+
+
+def submit(entity_1, entity_2, load_text, version=""):
+    """
+    Schedule a pair's word cloud on the render pool and return its future.
+    Returns None if the pair is already in the memory cache. Concurrent requests
+    for the same pair share a single render.
+    """
+    key = cache_key(entity_1, entity_2, version)
+    with _lock:
+        if key in _memory_cache:
+            return None
+        future = _in_flight.get(key)
+        if future is None:
+            future = _executor.submit(_render_and_store, key, entity_1, entity_2, load_text)
+            _in_flight[key] = future
+            future.add_done_callback(lambda _: _forget_in_flight(key))
+    return future
+
+
+def _forget_in_flight(key):
+    with _lock:
+        _in_flight.pop(key, None)
+
+
+def get_wordcloud_png(entity_1, entity_2, load_text, version=""):
+    """
+    Return the PNG bytes for a pair's word cloud (None if the pair has no text).
+    Memory hits return immediately; misses fall back to the disk cache and then to rendering.
+
+    Args:
+        entity_1 (str): First entity of the pair.
+        entity_2 (str): Second entity of the pair.
+        load_text (callable): load_text(entity_1, entity_2) -> str, only called on a cache miss.
+        version (str): Data version, so cached images are not reused after the data changes.
+    """
+    key = cache_key(entity_1, entity_2, version)
+    with _lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+    future = submit(entity_1, entity_2, load_text, version)
+    if future is None:
+        with _lock:
+            return _memory_cache.get(key)
+    return future.result()
+
+
+def get_wordcloud_b64(entity_1, entity_2, load_text, version=""):
+    """Same as get_wordcloud_png, base64-encoded for an <img> data URI."""
+    png = get_wordcloud_png(entity_1, entity_2, load_text, version)
+    if png is None:
+        return None
+    return base64.b64encode(png).decode('utf-8')
+
+
+def prerender(pairs, load_text, version=""):
+    """Queue background renders for the given (entity_1, entity_2) pairs, e.g. the most common ones."""
+    for entity_1, entity_2 in pairs:
+        submit(entity_1, entity_2, load_text, version)
+    print(f"Queued {len(pairs)} word clouds for background pre-rendering.")
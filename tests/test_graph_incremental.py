@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from relationship_store import open_store, apply_delta, all_relationships, store_version
+from graph_export import write_graph_data
+from graph_incremental import update_graph_data
+from graph_index import build_graph_index, load_graph_ids
+
+
+def relationship(entity1, entity2, level, threat_type="Economic", location1="Singapore", location2=None):
+    return {"Entity 1": entity1, "Entity 2": entity2, "Relationship Summary": f"{entity1} and {entity2} ({level})",
+            "Origin Location 1": location1, "Origin Location 2": location2,
+            "Threat Assessment": {"Threat Level": level, "Type": threat_type}}
+
+
+RECORDS = [
+    relationship("A", "B", 3, location2="Malaysia"),
+    relationship("B", "C", 5, "Cyber"),
+    relationship("C", "D", 2),
+    relationship("E", "F", 4, "Political", "Indonesia"),
+    relationship("A", "A", 6),
+    relationship("D", "B", 1, "Cyber"),
+]
+
+DELTA = [
+    dict(relationship("G", "H", 4, "Political"), **{"Record ID": 3}),  # E and F lose their only record
+    relationship("A", "C", 7, "Cyber"),  # New pair between existing entities
+    relationship("B", "A", 8, "Political"),  # Existing pair, higher threat level
+    relationship("D", "NEW", 2, location1="Thailand"),  # New entity next to an existing one
+]
+
+
+def read(output_dir, name):
+    with open(os.path.join(output_dir, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def graph_view(output_dir):
+    """The graph_data files keyed by entity names instead of ids, for comparing two builds."""
+    node_file = read(output_dir, "nodes.json")
+    strings, columns = node_file["strings"], node_file["nodes"]
+    labels = columns["label"]
+    lookup = lambda index: strings[index] if index >= 0 else None
+    nodes = {
+        label: (columns["threat_level"][i], columns["mean_threat_level"][i], columns["relationship_count"][i],
+                lookup(columns["threat_type"][i]), lookup(columns["location"][i]))
+        for i, label in enumerate(labels) if columns["relationship_count"][i]
+    }
+    edges = {}
+    for level, count in node_file["shards"].items():
+        shard = read(output_dir, f"edges_{level}.json")
+        assert len(shard["id"]) == count
+        for i in range(count):
+            key = tuple(sorted((labels[shard["from"][i]], labels[shard["to"][i]])))
+            types = sorted((strings[t], n) for t, n in shard["types"][i])
+            edges[key] = (int(level), shard["title"][i], shard["count"][i], shard["mean_level"][i], types)
+
+    adjacency = read(output_dir, "adjacency.json")
+    offsets = adjacency["offsets"]
+    linked = {
+        tuple(sorted((labels[node_id], labels[adjacency["neighbors"][i]])))
+        for node_id in range(len(labels)) for i in range(offsets[node_id], offsets[node_id + 1])
+    }
+    assert linked == set(edges)
+    return nodes, edges
+
+
+def build(tmp_path):
+    json_path, db_path, delta_path = (str(tmp_path / name) for name in ("relationships.json", "store.db", "deltas.jsonl"))
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(RECORDS, f)
+    conn = open_store(json_path, db_path, delta_path)
+    output_dir = str(tmp_path / "graph_data")
+    write_graph_data(conn, output_dir, str(tmp_path / "analytics.json"))
+    affected = apply_delta(conn, DELTA, json_path, delta_path)
+    return conn, output_dir, affected
+
+
+def test_delta_update_matches_full_rebuild(tmp_path):
+    conn, output_dir, affected = build(tmp_path)
+    update_graph_data(conn, affected, output_dir)
+    rebuilt_dir = str(tmp_path / "rebuilt")
+    write_graph_data(conn, rebuilt_dir, str(tmp_path / "analytics_rebuilt.json"))
+
+    assert graph_view(output_dir) == graph_view(rebuilt_dir)
+    assert read(output_dir, "nodes.json")["version"] == store_version(conn)
+
+    # Entities left without records keep their id, with no aggregates and no edges
+    columns = read(output_dir, "nodes.json")["nodes"]
+    for label in ("E", "F"):
+        i = columns["label"].index(label)
+        assert (columns["threat_level"][i], columns["mean_threat_level"][i], columns["relationship_count"][i]) == (0, 0, 0)
+        assert columns["threat_type"][i] == columns["location"][i] == -1
+    conn.close()
+
+
+def test_delta_update_recreates_missing_cluster_shards(tmp_path):
+    conn, output_dir, affected = build(tmp_path)
+    for name in os.listdir(output_dir):
+        if name.startswith("cluster_"):
+            os.remove(os.path.join(output_dir, name))
+    written = update_graph_data(conn, affected, output_dir)
+    conn.close()
+
+    columns = read(output_dir, "nodes.json")["nodes"]
+    group = columns["cluster"][columns["label"].index("NEW")]
+    assert f"cluster_{group}.json" in written
+    assert "NEW" in read(output_dir, f"cluster_{group}.json")["nodes"]["label"]
+
+
+def test_graph_index_uses_graph_data_ids_after_a_delta(tmp_path):
+    conn, output_dir, affected = build(tmp_path)
+    update_graph_data(conn, affected, output_dir)
+    index = build_graph_index(all_relationships(conn), load_graph_ids(output_dir, store_version(conn)))
+    conn.close()
+
+    node_file = read(output_dir, "nodes.json")
+    labels = node_file["nodes"]["label"]
+    assert all(labels[node_id] == label for label, node_id in index["label_to_id"].items())
+    assert set(index["label_to_id"]) == set(labels) - {"E", "F"}
+    for level in node_file["shards"]:
+        shard = read(output_dir, f"edges_{level}.json")
+        for edge_id, source, target in zip(shard["id"], shard["from"], shard["to"]):
+            edge = index["edges"][edge_id]
+            assert {edge["from"], edge["to"]} == {source, target}
+            assert edge["max_level"] == int(level)
+
+    # A graph_data folder built from another store version is not used
+    assert load_graph_ids(output_dir, "stale") is None
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from graph_index import build_graph_index
+from graph_paths import build_path_finder, find_paths
+
+
+def relationship(entity1, entity2, level):
+    return {"Entity 1": entity1, "Entity 2": entity2, "Relationship Summary": f"{entity1} and {entity2}",
+            "Threat Assessment": {"Threat Level": level, "Type": "Economic"}}
+
+
+# A-B-D is the shortest chain; A-C-D is as short but through more threatening links; X is unconnected
+RECORDS = [
+    relationship("A", "B", 1),
+    relationship("B", "D", 1),
+    relationship("A", "C", 9),
+    relationship("C", "D", 9),
+    relationship("X", "Y", 5),
+]
+
+
+def test_weighted_paths_prefer_threatening_links():
+    finder = build_path_finder(build_graph_index(RECORDS))
+    paths = find_paths(finder, "A", "D", k=2)
+    assert [path["labels"] for path in paths] == [["A", "C", "D"], ["A", "B", "D"]]
+    assert paths[0]["threat_levels"] == [9, 9]
+    assert paths[0]["cost"] < paths[1]["cost"]
+
+
+def test_unconnected_and_unknown_entities():
+    finder = build_path_finder(build_graph_index(RECORDS))
+    assert find_paths(finder, "A", "X") == []
+    assert find_paths(finder, "A", "NOBODY") is None
+
+
+def test_paths_on_an_index_with_unused_ids():
+    # graph_data ids from an earlier build: E and the A-E edge no longer have records
+    graph_ids = {"labels": ["A", "E", "B", "D", "C", "X", "Y"], "edges": {(0, 1): 0, (0, 2): 1}}
+    index = build_graph_index(RECORDS, graph_ids)
+    assert index["nodes"][1] is None and index["edges"][0] is None
+    paths = find_paths(build_path_finder(index), "A", "D", k=2, weighted=False)
+    assert sorted(path["labels"][1] for path in paths) == ["B", "C"]
+    assert all(path["hops"] == 2 for path in paths)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from near_duplicates import find_duplicate_clusters, duplicate_of, expand_to_members
+
+STORY = ("The finance ministry said on Monday that the two banks had agreed to merge their regional operations, "
+         "creating the largest lender in the region by assets, subject to approval by the competition regulator "
+         "which is expected to review the deal over the next six months before any shares change hands.")
+OTHER = ("Heavy rain flooded several districts overnight and the transport authority suspended ferry services "
+         "while emergency crews pumped water from underground car parks and cleared fallen trees from the roads.")
+
+
+def test_reposts_cluster_with_the_longest_copy_as_representative():
+    names = ["a.txt", "b.txt", "c.txt", "d.txt"]
+    documents = [STORY, STORY.upper() + " Reporting by staff.", OTHER, STORY.replace(",", "")]
+    clusters = find_duplicate_clusters(names, documents)
+    assert len(clusters) == 1
+    assert clusters[0]["members"] == ["a.txt", "b.txt", "d.txt"]
+    assert clusters[0]["representative"] == "b.txt"
+    assert clusters[0]["similarity"] >= 0.8
+
+
+def test_unrelated_documents_do_not_cluster():
+    assert find_duplicate_clusters(["a.txt", "b.txt"], [STORY, OTHER]) == []
+
+
+def test_representative_entities_are_copied_to_members():
+    clusters = {"a.txt": ["b.txt"]}
+    assert duplicate_of(clusters) == {"b.txt": "a.txt"}
+    entities = [{"filename": "a.txt", "Entity": "X"}, {"filename": "c.txt", "Entity": "Y"}]
+    assert expand_to_members(entities, clusters) == entities + [{"filename": "b.txt", "Entity": "X"}]
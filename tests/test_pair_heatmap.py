@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pair_heatmap import build_pair_matrix, select_block, block_cells
+
+
+def pair_matrix():
+    return build_pair_matrix(["A", "A", "B", "C"], ["B", "B", "C", "D"], [2, 5, 3, 1])
+
+
+def test_block_cells_keeps_highest_level_and_counts_pairs():
+    matrix = pair_matrix()
+    ids = select_block(matrix)
+    rows, cols, levels, counts = block_cells(matrix, ids)
+    names = matrix["labels"][ids]
+    cells = {(names[r], names[c]): (level, count) for r, c, level, count in zip(rows, cols, levels, counts)}
+    assert cells[("A", "B")] == (5, 2)
+    assert cells[("B", "C")] == (3, 1)
+
+
+def test_block_cells_empty_block_returns_empty_arrays():
+    matrix = pair_matrix()
+    ids = select_block(matrix, min_threat_level=9)
+    rows, cols, levels, counts = block_cells(matrix, ids, min_threat_level=9)
+    assert len(ids) == 0
+    for values in (rows, cols, levels, counts):
+        assert isinstance(values, np.ndarray) and values.dtype != object and len(values) == 0
+
+
+def test_block_cells_focus_above_threshold_returns_empty_arrays():
+    # The focused entity is kept in the block even though none of its pairs reach the threshold
+    matrix = pair_matrix()
+    ids = select_block(matrix, min_threat_level=4, focus=["D"])
+    rows, cols, levels, counts = block_cells(matrix, ids, min_threat_level=4)
+    assert list(matrix["labels"][ids]) == ["D"]
+    assert len(rows) == len(cols) == len(levels) == len(counts) == 0
+    assert counts.dtype != object
@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pair_search import build_label_index, search_labels
+
+LABELS = ["Alpha Corp & Beta Ltd", "Beta Ltd & Gamma Bank", "Delta Group & Alpha Corp", "Epsilon & Zeta"]
+
+
+def test_substring_queries_match_in_index_order():
+    index = build_label_index(LABELS)
+    assert search_labels(index, "alpha") == ["Alpha Corp & Beta Ltd", "Delta Group & Alpha Corp"]
+    assert search_labels(index, "A LTD & G") == ["Beta Ltd & Gamma Bank"]
+    assert search_labels(index, "omega") == []
+
+
+def test_short_queries_match_word_prefixes():
+    index = build_label_index(LABELS)
+    assert search_labels(index, "ga") == ["Beta Ltd & Gamma Bank"]
+    assert search_labels(index, "ze") == ["Epsilon & Zeta"]
+
+
+def test_empty_query_and_limit():
+    index = build_label_index(LABELS)
+    assert search_labels(index, "  ", limit=2) == LABELS[:2]
+    assert search_labels(index, "beta", limit=1) == ["Alpha Corp & Beta Ltd"]
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pair_triage import (FEATURES, pair_features, fit_logistic, predict, tradeoff, roc_auc, is_worthwhile,
+                         save_triage_model, load_triage_model, worth_extracting)
+
+
+def test_pair_features_capture_co_occurrence():
+    text = "Acme Corp smuggled weapons to the Red Group. Later the weather was fine."
+    together = dict(zip(FEATURES, pair_features("Acme Corp", "Red Group", text)))
+    apart = dict(zip(FEATURES, pair_features("Acme Corp", "Blue Group", text)))
+    assert together["same_sentence"] == 1.0 and apart["same_sentence"] == 0.0
+    assert together["mention_distance"] < apart["mention_distance"]
+    assert together["threat_terms"] > 0
+
+
+def test_is_worthwhile_needs_threat_and_confidence():
+    assert is_worthwhile({"Threat Assessment": {"Threat Level": 5}, "Confidence Score": "90%"})
+    assert not is_worthwhile({"Threat Assessment": {"Threat Level": 1}, "Confidence Score": "90%"})
+    assert not is_worthwhile({"Threat Assessment": {"Threat Level": 5}, "Confidence Score": "50"})
+    assert not is_worthwhile({"Threat Assessment": None})
+
+
+def test_model_separates_classes_and_round_trips(tmp_path):
+    rng = np.random.default_rng(0)
+    y = np.repeat([0.0, 1.0], 50)
+    X = rng.normal(size=(100, len(FEATURES)))
+    X[:, 2] += 3 * y
+    mean, std, weights, bias = fit_logistic(X, y)
+    model = {"features": list(FEATURES), "mean": mean, "std": std, "weights": weights, "bias": float(bias), "threshold": 0.5}
+    scores = predict(model, X)
+    assert roc_auc(scores, y) > 0.9
+    assert tradeoff(scores, y, [0.0])[0] == {"threshold": 0.0, "llm_calls": 1.0, "recall": 1.0, "precision": 0.5}
+
+    path = str(tmp_path / "triage_model.json")
+    save_triage_model(model, path)
+    loaded = load_triage_model(path)
+    assert np.allclose(predict(loaded, X), scores)
+
+
+def test_without_a_model_every_pair_goes_to_the_llm(tmp_path):
+    assert load_triage_model(str(tmp_path / "missing.json")) is None
+    assert worth_extracting(None, "A", "B", "")
@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pipeline import run_pipeline
+
+UPPER = "import sys\nopen(sys.argv[2], 'w').write(open(sys.argv[1]).read().upper())\n"
+LENGTH = "import sys\nopen(sys.argv[2], 'w').write(str(len(open(sys.argv[1]).read())))\n"
+FAIL = "import sys\nsys.exit(3)\n"
+
+
+def make_stages(tmp_path, second_script=LENGTH):
+    paths = {name: str(tmp_path / name) for name in ("in.txt", "mid.txt", "out.txt", "upper.py", "second.py")}
+    with open(paths["upper.py"], "w") as f:
+        f.write(UPPER)
+    with open(paths["second.py"], "w") as f:
+        f.write(second_script)
+    stages = [
+        {"name": "upper", "script": paths["upper.py"], "args": [paths["in.txt"], paths["mid.txt"]], "cwd": str(tmp_path),
+         "inputs": [paths["in.txt"]], "outputs": [paths["mid.txt"]]},
+        {"name": "length", "script": paths["second.py"], "args": [paths["mid.txt"], paths["out.txt"]], "cwd": str(tmp_path),
+         "inputs": [paths["mid.txt"]], "outputs": [paths["out.txt"]]},
+    ]
+    return stages, paths
+
+
+def run(stages, tmp_path, **kwargs):
+    return run_pipeline(stages=stages, state_path=str(tmp_path / "state.json"), **kwargs)
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    stages, paths = make_stages(tmp_path)
+    with open(paths["in.txt"], "w") as f:
+        f.write("abc")
+    assert run(stages, tmp_path) == {"upper": "ran", "length": "ran"}
+    assert open(paths["out.txt"]).read() == "3"
+    assert run(stages, tmp_path) == {"upper": "skipped", "length": "skipped"}
+
+    # A changed input that reproduces the same intermediate output stops there
+    with open(paths["in.txt"], "w") as f:
+        f.write("ABC")
+    assert run(stages, tmp_path) == {"upper": "ran", "length": "skipped"}
+    assert run(stages, tmp_path, force=["length"]) == {"upper": "skipped", "length": "ran"}
+
+
+def test_dry_run_and_failures(tmp_path):
+    stages, paths = make_stages(tmp_path, second_script=FAIL)
+    with open(paths["in.txt"], "w") as f:
+        f.write("abc")
+    assert run(stages, tmp_path, dry_run=True) == {"upper": "would run", "length": "would run"}
+    assert not os.path.exists(paths["mid.txt"])
+    assert run(stages, tmp_path) == {"upper": "ran", "length": "failed"}
+    assert run(stages, tmp_path, targets=["length"]) == {"upper": "skipped", "length": "failed"}
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from relationship_store import open_store, apply_delta, all_relationships
+
+
+def relationship(entity1, entity2):
+    return {"Entity 1": entity1, "Entity 2": entity2, "Relationship Summary": f"{entity1} and {entity2}",
+            "Threat Assessment": {"Threat Level": 3, "Type": "Economic"}}
+
+
+def write_json(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+
+def test_rebuild_keeps_json_records_added_after_a_delta(tmp_path):
+    json_path, db_path, delta_path = str(tmp_path / "relationships.json"), str(tmp_path / "store.db"), str(tmp_path / "deltas.jsonl")
+    records = [relationship("A", "B"), relationship("C", "D")]
+    write_json(json_path, records)
+    conn = open_store(json_path, db_path, delta_path)
+    apply_delta(conn, [relationship("DELTA", "E")], json_path, delta_path)
+    conn.close()
+
+    # The JSON file grows after the delta; the rebuild must keep both the new rows and the delta record
+    write_json(json_path, records + [relationship("BATCH_X", "F"), relationship("BATCH_Y", "G")])
+    conn = open_store(json_path, db_path, delta_path)
+    entities = [record["Entity 1"] for record in all_relationships(conn)]
+    conn.close()
+    assert entities == ["A", "C", "BATCH_X", "BATCH_Y", "DELTA"]
+
+
+def test_rebuild_replays_replacements_by_record_id(tmp_path):
+    json_path, db_path, delta_path = str(tmp_path / "relationships.json"), str(tmp_path / "store.db"), str(tmp_path / "deltas.jsonl")
+    write_json(json_path, [relationship("A", "B"), relationship("C", "D")])
+    conn = open_store(json_path, db_path, delta_path)
+    apply_delta(conn, [dict(relationship("A", "Z"), **{"Record ID": 0})], json_path, delta_path)
+    conn.close()
+
+    os.remove(db_path)
+    conn = open_store(json_path, db_path, delta_path)
+    pairs = [(record["Entity 1"], record["Entity 2"]) for record in all_relationships(conn)]
+    conn.close()
+    assert pairs == [("A", "Z"), ("C", "D")]
@@ -0,0 +1,53 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from relationship_store import open_store, apply_delta
+from text_search import load_index, search
+
+
+def relationship(entity1, entity2, summary, level, threat_type="Economic"):
+    return {"Entity 1": entity1, "Entity 2": entity2, "Relationship Summary": summary,
+            "Threat Assessment": {"Threat Level": level, "Type": threat_type}}
+
+
+RECORDS = [
+    relationship("A", "B", "Shell companies moved funds through offshore accounts", 7, "Financial"),
+    relationship("C", "D", "Joint naval exercise near the strait", 4, "Military"),
+    relationship("E", "F", "Offshore drilling licence awarded after a tender", 2),
+]
+
+
+def open_test_store(tmp_path):
+    json_path, db_path, delta_path = (str(tmp_path / name) for name in ("relationships.json", "store.db", "deltas.jsonl"))
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(RECORDS, f)
+    return open_store(json_path, db_path, delta_path), json_path, delta_path
+
+
+def test_keyword_search_ranks_and_filters(tmp_path):
+    conn, _, _ = open_test_store(tmp_path)
+    index = load_index(conn, str(tmp_path / "index"))
+    conn.close()
+    assert [record_id for record_id, _ in search(index, "offshore funds", semantic=False)] == [0, 2]
+    assert [record_id for record_id, _ in search(index, "offshore", min_threat_level=5, semantic=False)] == [0]
+    assert [record_id for record_id, _ in search(index, "offshore", threat_type="Economic", semantic=False)] == [2]
+    assert search(index, "submarine", semantic=False) == []
+
+
+def test_saved_index_follows_replaced_records(tmp_path):
+    conn, json_path, delta_path = open_test_store(tmp_path)
+    index_dir = str(tmp_path / "index")
+    load_index(conn, index_dir)
+    apply_delta(conn, [dict(relationship("C", "D", "Submarine cables cut near the strait", 8), **{"Record ID": 1})],
+                json_path, delta_path)
+    index = load_index(conn, index_dir)
+    assert [record_id for record_id, _ in search(index, "submarine", semantic=False)] == [1]
+    assert search(index, "naval exercise", semantic=False) == []
+
+    # The updated index was saved: a fresh load finds the new text without reindexing anything
+    reloaded = load_index(conn, index_dir)
+    conn.close()
+    assert [record_id for record_id, _ in search(reloaded, "submarine", semantic=False)] == [1]